@@ -26,7 +26,8 @@ def quick_start():
     print(f'Launches per year: {cfgMC["repeatLaunches"].shape[0] if cfgMC["repeatLaunches"].size > 0 else 0}')
     print('Starting main_mc...')
     
-    nS, nD, nN, nB, deorbitlist_r, satellites_over_time, derelicts_over_time, debris_over_time, rocket_bodies_over_time = main_mc(cfgMC, seed)
+    (nS, nD, nN, nB, deorbitlist_r, satellites_over_time, derelicts_over_time, debris_over_time, rocket_bodies_over_time,
+     expected_coll, expected_coll_shell, expected_coll_species) = main_mc(cfgMC, seed)
     
     ratio = nS / (nS + nD + nN + nB)
     print('Quick Start under no launch scenario done!')
@@ -0,0 +1,212 @@
+"""
+Parallel Monte Carlo ensemble runner
+Runs main_mc for a list of seeds on a process pool; the initial population
+and the density tables are published once through shared memory
+"""
+
+import io
+import os
+import re
+import sys
+import contextlib
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import parent_process, resource_tracker, shared_memory, util
+
+sys.path.append(str(Path(__file__).parent.parent.parent / 'supporting_functions'))
+sys.path.append(str(Path(__file__).parent))
+
+from main_mc import Simulation
+
+# Large read-only arrays of the configuration that are published through
+# shared memory instead of being pickled to every worker: top-level cfg keys,
+# plus every array stored in cfg['param'] (density tables)
+SHARED_CFG_KEYS = ('mat_sats',)
+
+# Configuration of the current worker process (set once by _init_worker)
+_worker_cfg = None
+_worker_blocks = []
+_worker_verbose = False
+
+def share_config(cfg):
+    """
+    Publish the large arrays of a configuration through shared memory
+
+    Parameters:
+    -----------
+    cfg : dict
+        Configuration dictionary (see setup_MCconfig)
+
+    Returns:
+    --------
+    cfg_stub : dict
+        Copy of cfg without the shared arrays (cheap to pickle)
+    specs : dict
+        (section, key) -> array descriptor used by attach_config
+    blocks : list of SharedMemory
+        Shared memory blocks owned by the caller; close and unlink them once
+        all workers are done
+    """
+    cfg_stub = dict(cfg)
+    # Large data not used by main_mc
+    cfg_stub['a_all'] = {}
+    cfg_stub['ap_all'] = {}
+    cfg_stub['aa_all'] = {}
+    param = dict(cfg_stub.get('param', {}))
+    cfg_stub['param'] = param
+
+    specs = {}
+    blocks = []
+    try:
+        for key in SHARED_CFG_KEYS:
+            if key in cfg_stub:
+                specs[('cfg', key)] = _share_array(cfg_stub.pop(key), blocks)
+        for key in list(param):
+            if isinstance(param[key], np.ndarray):
+                specs[('param', key)] = _share_array(param.pop(key), blocks)
+    except Exception:
+        _release(blocks)
+        raise
+    return cfg_stub, specs, blocks
+
+def attach_config(cfg_stub, specs, blocks):
+    """
+    Rebuild a configuration from share_config output
+
+    Shared arrays are attached as read-only views; the attached blocks are
+    appended to ``blocks`` and must stay referenced while the views are used.
+    """
+    cfg = dict(cfg_stub)
+    param = dict(cfg.get('param', {}))
+    cfg['param'] = param
+    for (section, key), spec in specs.items():
+        arr = _attach_array(spec, blocks)
+        if section == 'cfg':
+            cfg[key] = arr
+        else:
+            param[key] = arr
+    return cfg
+
+def seed_filename(filename_save, seed):
+    """Per-seed output file name (replaces the _rand<seed> tag of setup_MCconfig)"""
+    if re.search(r'_rand\d+', filename_save):
+        return re.sub(r'_rand\d+', f'_rand{seed}', filename_save)
+    stem, ext = os.path.splitext(filename_save)
+    return f'{stem}_rand{seed}{ext}'
+
+def run_ensemble(cfg, seeds, max_workers=None, verbose=False, mp_context=None):
+    """
+    Run main_mc for several seeds in parallel
+
+    The configuration is prepared once by the caller (setup_MCconfig); its
+    initial population and density tables are copied into shared memory a
+    single time and every worker process maps them instead of reloading the
+    IC and density files.
+
+    Parameters:
+    -----------
+    cfg : dict
+        Configuration dictionary (see setup_MCconfig)
+    seeds : iterable of int
+        Random seeds, one run per seed
+    max_workers : int, optional
+        Number of worker processes (defaults to the number of CPUs)
+    verbose : bool
+        Forward the per-step status lines of the workers to stdout
+    mp_context : multiprocessing context, optional
+        Start method of the worker processes
+
+    Yields:
+    -------
+    seed : int
+        Seed of a finished run
+    result : tuple
+        main_mc output of that run, in completion order
+    """
+    seeds = list(seeds)
+    if len(seeds) == 0:
+        return
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(seeds)))
+
+    cfg_stub, specs, blocks = share_config(cfg)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context,
+                                 initializer=_init_worker,
+                                 initargs=(cfg_stub, specs, verbose)) as pool:
+            futures = {pool.submit(_run_seed, seed): seed for seed in seeds}
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+    finally:
+        _release(blocks)
+
+def _share_array(arr, blocks):
+    # Broadcast axes (stride 0, e.g. the JB2008 altitude and time grids) are
+    # shared with length 1 and broadcast again on attach
+    shape = arr.shape
+    arr = arr[tuple(slice(0, 1) if stride == 0 else slice(None) for stride in arr.strides)]
+    arr = np.ascontiguousarray(arr)
+    if arr.nbytes == 0:
+        # SharedMemory cannot hold zero bytes; empty arrays are pickled
+        return ('array', np.broadcast_to(arr, shape))
+    shm = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+    blocks.append(shm)
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    return ('shm', shm.name, arr.shape, arr.dtype.str, shape, os.getpid())
+
+def _attach_array(spec, blocks):
+    if spec[0] == 'array':
+        return spec[1]
+    _, name, stored_shape, dtype, shape, owner = spec
+    if sys.version_info >= (3, 13):
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == 'posix' and not _shares_tracker(owner):
+            # Not ours to clean up: the resource tracker of this process
+            # would unlink the segment when the process exits
+            resource_tracker.unregister(shm._name, 'shared_memory')
+    blocks.append(shm)
+    arr = np.ndarray(stored_shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    arr.flags.writeable = False
+    return arr if arr.shape == tuple(shape) else np.broadcast_to(arr, shape)
+
+def _shares_tracker(owner):
+    """Whether this process uses the resource tracker of process owner"""
+    # Processes started by multiprocessing inherit the tracker of their parent
+    parent = parent_process()
+    return os.getpid() == owner or (parent is not None and parent.pid == owner)
+
+def _release(blocks):
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
+    blocks.clear()
+
+def _init_worker(cfg_stub, specs, verbose):
+    global _worker_cfg, _worker_verbose
+    _worker_cfg = attach_config(cfg_stub, specs, _worker_blocks)
+    _worker_verbose = verbose
+    # Runs when the worker exits (atexit is skipped by forked processes)
+    util.Finalize(None, _close_worker, exitpriority=10)
+
+def _close_worker():
+    global _worker_cfg
+    _worker_cfg = None  # drop the views before closing their blocks
+    for shm in _worker_blocks:
+        shm.close()
+    _worker_blocks.clear()
+
+def _run_seed(seed):
+    cfg = dict(_worker_cfg)
+    cfg['filename_save'] = seed_filename(cfg['filename_save'], seed)
+    if _worker_verbose:
+        return Simulation(cfg, seed).run()
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Simulation(cfg, seed).run()
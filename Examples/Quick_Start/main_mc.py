@@ -3,7 +3,9 @@ Python version of main_mc.m
 """
 
 import numpy as np
+import os
 import sys
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 from astropy.time import Time
@@ -11,415 +13,972 @@ from astropy.time import Time
 sys.path.append(str(Path(__file__).parent.parent.parent / 'supporting_functions'))
 
 from getidx import *
-from categorizeObj import categorizeObj
-from prop_mit_vec import prop_mit_vec
-from orbcontrol_vec import orbcontrol_vec
-from cube_vec_v3 import cube_vec_v3
+from categorizeObj import categorizeObj, species_index, SPECIES_LABELS
+from prop_mit_vec import prop_mit_vec_cols, prop_mean_anomaly_cols, mean_oe2rv
+from prop_sgp4_vec import prop_sgp4_vec_cols, sgp4_mean_oe2rv
+from orbcontrol_vec import orbcontrol_vec_cols
+from cube_vec_v3 import cube_vec_v3, merge_pairs, effective_sample_size
 from collision_prob_vec import collision_prob_vec
 from fillin_atmosphere import fillin_atmosphere
-from frag_exp_SBM_vec import frag_exp_SBM_vec
-from frag_col_SBM_vec import frag_col_SBM_vec
+from frag_SBM_batch import frag_exp_SBM_batch, frag_col_SBM_batch
 from Fast_MC2SSEM_population import Fast_MC2SSEM_population
 from generate_random_launch import generate_random_launch
+from population_store import PopulationStore, POP_FIELDS
+from altitude_bands import AltitudeBands
+from decay_schedule import DecaySchedule
+from conjunction_screen import conjunction_screen_window
+from sats_info_sink import open_sink
 
-def main_mc(MCconfig, RNGseed=None):
+# Version tag of the checkpoint file layout
+CHECKPOINT_VERSION = 4
+
+# SimState time series stored in checkpoints
+CHECKPOINT_SERIES = ('numObjects', 'count_coll', 'count_expl', 'count_debris_coll', 'count_debris_expl',
+                     'satellites_over_time', 'derelicts_over_time', 'debris_over_time',
+                     'rocket_bodies_over_time', 'S_MC', 'D_MC', 'N_MC', 'deorbitlist_r', 'pair_ess',
+                     'expected_coll', 'expected_coll_shell', 'expected_coll_species')
+
+class SimState:
     """
-    Main Monte Carlo simulation function
+    Mutable state of one Monte Carlo run
+    
+    Holds everything that changes while a run advances: the population, the
+    random number generator, the run's own copy of the parameter dictionary
+    and the per-timestep accumulators. Nothing is shared between runs, so
+    several simulations can be advanced concurrently (e.g. one per thread).
     
     Parameters:
     -----------
-    MCconfig : dict
-        Configuration dictionary
-    RNGseed : int, optional
-        Random seed for reproducibility
-        
-    Returns:
-    --------
-    nS : int
-        Number of satellites
-    nD : int
-        Number of derelicts
-    nN : int
-        Number of debris
-    nB : int
-        Number of rocket bodies
-    deorbitlist_r : array-like
-        Final satellite matrix
+    pop : PopulationStore
+        Population storage
+    rng : numpy.random.RandomState
+        Random number generator of the run
+    param : dict
+        Parameter dictionary of the run (maxID and jd are updated in place)
+    n_time : int
+        Number of timesteps
+    n_shells : int
+        Number of SSEM altitude shells
+    save_output_file : int
+        Output mode (3 and 4 keep only the latest sats_info)
+    sink : NpyShardSink or HDF5Sink, optional
+        Output sink receiving the per-timestep sats_info instead of keeping
+        them in memory
     """
     
-    # Declare global variables
-    global mat_sats, time0, tsince, n_time, launch_model, repeatLaunches, launchMC_step
-    global additional_launches, ind_launch, ind_launch_add, use_sgp4, skipCollisions
-    global max_frag, CUBE_RES, collision_alt_limit, density_profile, param
-    global orbtol, PMD, step_control, P_frag, P_frag_cutoff, alph, alph_a
-    global save_output_file, filename_save, paramSSEM
-    
-    # Initialize RNG seed
-    if RNGseed is not None:
-        np.random.seed(RNGseed)
-        print(f'main_mc specified with seed {RNGseed}')
-    elif 'seed' in MCconfig:
-        np.random.seed(MCconfig['seed'])
-        print(f'main_mc specified with config seed {MCconfig["seed"]}')
-    
-    # Load configuration
-    if isinstance(MCconfig, str):
-        # TODO: Handle string config loading
-        raise NotImplementedError("String config loading not implemented yet")
-    
-    # Extract configuration parameters - do this first to get mat_sats
-    loadCFG(MCconfig)
-    
-    # Initialize parameters
-    if 'paramSSEM' in MCconfig:
-        param['paramSSEM'] = MCconfig['paramSSEM']
-    
-    if 'sample_params' in MCconfig:
-        param['sample_params'] = MCconfig['sample_params']
-    else:
-        param['sample_params'] = 0
-    
-    # Remove large data embedded in cfg (for saving)
-    MCconfig['a_all'] = {}
-    MCconfig['ap_all'] = {}
-    MCconfig['aa_all'] = {}
-    MCconfig['launchMC_step'] = {}
-    
-    # Assign constants to param structure
-    param['req'] = radiusearthkm
-    param['mu'] = mu_const
-    param['j2'] = j2
-    param['max_frag'] = max_frag
-    paramSSEM['species'] = [1, 1, 1, 0, 0, 0]  # species: [S,D,N,Su,B,U]
-    
-    # Density profile
-    param['density_profile'] = density_profile
-    
-    # Preallocate arrays
-    n_sats = mat_sats.shape[0]
-    
-    # Initialize counters
-    numObjects = np.zeros(n_time)
-    numObjects[0] = n_sats
-    count_coll = np.zeros(n_time, dtype=np.uint8)
-    count_expl = np.zeros(n_time, dtype=np.uint8)
-    count_debris_coll = np.zeros(n_time, dtype=np.uint8)
-    count_debris_expl = np.zeros(n_time, dtype=np.uint8)
-    
-    # Initialize species count tracking arrays
-    satellites_over_time = np.zeros(n_time)
-    derelicts_over_time = np.zeros(n_time)
-    debris_over_time = np.zeros(n_time)
-    rocket_bodies_over_time = np.zeros(n_time)
-    
-    # Initialize tracking arrays
-    if save_output_file in [3, 4]:
-        sats_info = [None] * 3
-    else:
-        sats_info = [[None] * 3 for _ in range(n_time)]
-    
-    frag_info = [[None] * 4 for _ in range(n_time)]
-    frag_info5 = [None] * n_time
+    def __init__(self, pop, rng, param, n_time, n_shells, save_output_file=0, sink=None):
+        self.pop = pop
+        self.rng = rng
+        self.param = param
+        self.sink = sink
+        self.n = 0  # index of the last completed timestep
+        
+        # Initialize counters
+        self.numObjects = np.zeros(n_time)
+        self.numObjects[0] = len(pop)
+        self.count_coll = np.zeros(n_time, dtype=np.uint8)
+        self.count_expl = np.zeros(n_time, dtype=np.uint8)
+        self.count_debris_coll = np.zeros(n_time, dtype=np.uint32)
+        self.count_debris_expl = np.zeros(n_time, dtype=np.uint32)
+        self.pair_ess = np.full(n_time, np.nan)  # effective number of candidate pairs
+        
+        # Expected number of collisions per step: total, per SSEM shell and per
+        # species pair (upper triangle, indices of SPECIES_LABELS)
+        n_species = len(SPECIES_LABELS)
+        self.expected_coll = np.zeros(n_time)
+        self.expected_coll_shell = np.zeros((n_time, n_shells))
+        self.expected_coll_species = np.zeros((n_time, n_species, n_species))
+        
+        # Initialize species count tracking arrays
+        self.satellites_over_time = np.zeros(n_time)
+        self.derelicts_over_time = np.zeros(n_time)
+        self.debris_over_time = np.zeros(n_time)
+        self.rocket_bodies_over_time = np.zeros(n_time)
+        
+        # Initialize tracking arrays
+        if save_output_file in [3, 4]:
+            self.sats_info = [None] * 3
+        elif sink is not None:
+            self.sats_info = None  # streamed to the sink
+        else:
+            self.sats_info = [[None] * 3 for _ in range(n_time)]
+        self.frag_info = [[None] * 4 for _ in range(n_time)]
+        
+        # Initialize SSEM arrays
+        self.S_MC = np.full((n_time, n_shells), np.nan)
+        self.D_MC = self.S_MC.copy()
+        self.N_MC = self.S_MC.copy()
+        
+        self.num_pmd = 0
+        self.num_deorbited = 0
+        self.count_tot_launches = 0
+        self.deorbitlist_r = np.zeros(n_time)
+        self.launch_data = []
+        self.conjunctions = []  # per step: rows of (n, ID1, ID2, miss [km], vrel [km/s], t offset [s]) of approaches sampled at the screened epochs
+        self.species = (0, 0, 0, 0)  # latest (nS, nD, nN, nB)
+        self.rv_stale = None  # per slot: r/v not yet computed since the last lazy propagation
+
+class Simulation:
+    """
+    One Monte Carlo run of MOCAT-MC
     
-    # Initialize counters
-    num_pmd = 0
-    num_deorbited = 0
-    launch = 0
-    out_future = []
-    count_tot_launches = 0
-    file_save_index = 0
-    deorbitlist_r = np.zeros(n_time)
+    Replaces the module-level globals of the original main_mc: the
+    configuration is read once into attributes and all mutable state lives in
+    a SimState owned by the instance. The caller's configuration dictionary
+    is never modified.
     
-    # Initialize SSEM arrays
-    S_MC = np.full((n_time, len(paramSSEM['R02']) - 1), np.nan)
-    D_MC = S_MC.copy()
-    N_MC = S_MC.copy()
+    Parameters:
+    -----------
+    MCconfig : dict
+        Configuration dictionary (see setup_MCconfig)
+    RNGseed : int, optional
+        Random seed for reproducibility (falls back to MCconfig['seed'])
+    resume_from : str, optional
+        Checkpoint file written by save_checkpoint; the run continues from
+        the saved step with the saved population and RNG state, and the
+        remaining steps are bit-identical to an uninterrupted run
+        
+    Usage:
+    ------
+    sim = Simulation(cfg, seed)
+    while not sim.done:
+        sim.step()
+    results = sim.results()
+    """
     
-    # Get indices for matrix operations
-    param['maxID'] = np.max([np.max(mat_sats[:, idx_ID]), 0])
+    def __init__(self, MCconfig, RNGseed=None, resume_from=None):
+        if not isinstance(MCconfig, dict):
+            raise TypeError(f'MCconfig must be a configuration dict (see setup_MCconfig), got {type(MCconfig).__name__}')
+        
+        # Initialize RNG seed
+        if resume_from is not None:
+            seed = None  # RNG state comes from the checkpoint
+        elif RNGseed is not None:
+            seed = RNGseed
+            print(f'main_mc specified with seed {RNGseed}')
+        elif 'seed' in MCconfig:
+            seed = MCconfig['seed']
+            print(f'main_mc specified with config seed {MCconfig["seed"]}')
+        else:
+            seed = None
+        self.RNGseed = RNGseed
+        rng = np.random.RandomState(seed)
+        
+        # Work on a copy of the configuration; remove large data embedded in
+        # cfg (for saving)
+        cfg = dict(MCconfig)
+        cfg['a_all'] = {}
+        cfg['ap_all'] = {}
+        cfg['aa_all'] = {}
+        launchMC_step = cfg.get('launchMC_step', [])
+        cfg['launchMC_step'] = {}
+        self.cfg = cfg
+        
+        # Extract configuration parameters
+        self.time0 = cfg['time0']
+        self.tsince = cfg['tsince']
+        self.n_time = cfg['n_time']
+        self.launch_model = cfg['launch_model'].lower()
+        self.launchMC_step = launchMC_step
+        self.additional_launches = cfg.get('additional_launches', [])
+        self.launch_frequency = cfg.get('launch_frequency')
+        self.use_sgp4 = cfg['use_sgp4']
+        self.skipCollisions = cfg['skipCollisions']
+        self.collision_mode = cfg.get('collision_mode', 'sample').lower()
+        if self.collision_mode not in ['sample', 'expected']:
+            raise ValueError(f"Unknown collision_mode '{self.collision_mode}' (use 'sample' or 'expected')")
+        self.CUBE_RES = cfg['CUBE_RES']
+        self.collision_alt_limit = cfg['collision_alt_limit']
+        self.max_pairs_per_cube = cfg.get('max_pairs_per_cube')
+        self.n_collision_samples = max(int(cfg.get('n_collision_samples', 1)), 1)
+        self.n_collision_grids = max(int(cfg.get('n_collision_grids', 1)), 1)
+        self.altitude_prefilter = cfg.get('altitude_prefilter', True)
+        self.lazy_state = cfg.get('lazy_state', False)
+        self.use_decay_schedule = cfg.get('decay_schedule', True)
+        self.band_margin = cfg.get('band_margin', 25)
+        self.conjunction_threshold = cfg.get('conjunction_threshold')
+        self.orbtol = cfg['orbtol']
+        self.PMD = cfg['PMD']
+        self.step_control = cfg['step_control']
+        self.P_frag = cfg['P_frag']
+        self.save_output_file = cfg['save_output_file']
+        self.filename_save = cfg['filename_save']
+        self.n_save_checkpoint = cfg.get('n_save_checkpoint', np.inf)
+        self.saveMSnTimesteps = cfg.get('saveMSnTimesteps', 146)
+        self.output_flush_steps = cfg.get('output_flush_steps', 146)
+        self.output_sink = cfg.get('output_sink', 'memory').lower()
+        self.output_path = cfg.get('output_path')
+        if self.output_path is None:
+            self.output_path = os.path.splitext(self.filename_save)[0] + '_sats_info'
+            if self.output_sink in ['hdf5', 'h5']:
+                self.output_path += '.h5'
+        self.DAY2MIN = cfg['DAY2MIN']
+        self.YEAR2DAY = cfg['YEAR2DAY']
+        
+        # Initialize parameters (private copies, maxID and jd change every step)
+        param = dict(cfg.get('param', {}))
+        self.paramSSEM = dict(cfg['paramSSEM'])
+        param['paramSSEM'] = self.paramSSEM
+        param['sample_params'] = cfg.get('sample_params', 0)
+        
+        # Assign constants to param structure
+        param['req'] = cfg['radiusearthkm']
+        param['mu'] = cfg['mu_const']
+        param['j2'] = cfg['j2']
+        param['max_frag'] = cfg['max_frag']
+        self.paramSSEM['species'] = [1, 1, 1, 0, 0, 0]  # species: [S,D,N,Su,B,U]
+        
+        # Density profile
+        param['density_profile'] = cfg['density_profile']
+        
+        # Define index arrays for event inputs (rows extracted in mat_sats format)
+        self.idx_exp_in = [idx_mass, idx_radius, idx_r[0], idx_r[1], idx_r[2], idx_v[0], idx_v[1], idx_v[2], idx_objectclass]
+        self.idx_col_in = [idx_mass, idx_radius, idx_r[0], idx_r[1], idx_r[2], idx_v[0], idx_v[1], idx_v[2], idx_objectclass]
+        
+        # Per-timestep sats_info go to disk unless kept in memory
+        sink = None
+        if self.output_sink != 'memory' and self.save_output_file not in [3, 4]:
+            sink = open_sink(self.output_sink, self.output_path, self.output_flush_steps)
+        
+        # Perigee/apogee bands of the population (a cache, rebuilt on resume);
+        # objects sharing a cube differ in radius by at most the cube diagonal
+        self.bands = None
+        if self.altitude_prefilter:
+            self.bands = AltitudeBands(self.CUBE_RES, np.sqrt(3) / 2 * self.CUBE_RES + self.band_margin,
+                                       np.sqrt(3) * self.collision_alt_limit)
+        
+        # Earliest possible decay step of every object (also a cache); the
+        # lifetime bound holds for the analytic drag model only
+        self.decay = None
+        if self.use_decay_schedule and not self.use_sgp4:
+            self.decay = DecaySchedule(self.tsince, param)
+        
+        if resume_from is not None:
+            self.state = self._load_checkpoint(resume_from, param, sink)
+            self._schedule_decay(self.state.pop.live_rows(), self.state.n)
+            print(f'Resumed from {resume_from} at step {self.state.n} of {self.n_time - 1}')
+            return
+        
+        # Columnar population storage: removals tombstone rows, insertions append
+        # into spare capacity, compaction happens lazily at the end of a timestep
+        pop = PopulationStore(cfg['mat_sats'])
+        param['maxID'] = max(int(np.max(pop['ID'], initial=0)), 0)
+        
+        if sink is not None:
+            sink.truncate(-1)  # output of an earlier run is overwritten
+        self.state = SimState(pop, rng, param, self.n_time, len(self.paramSSEM['R02']) - 1,
+                              self.save_output_file, sink)
+        self._schedule_decay(pop.live_rows(), 0)
+        
+        # Store initial state
+        self._record(0, [], [], [])
+        self._save_matsats(0)
+        
+        # Fail early if checkpoints cannot be written
+        if np.isfinite(self.n_save_checkpoint):
+            _check_writable(self.filename_save)
+        
+        self._print_status(0, self.time0, [])
     
-    # Define index arrays for different operations
-    idx_launch_in_extra = [idx_ID]
-    idx_prop_in = [idx_a, idx_ecco, idx_inclo, idx_nodeo, idx_argpo, idx_mo, idx_bstar, idx_controlled]
-    idx_thalassa_in = [idx_a, idx_ecco, idx_inclo, idx_nodeo, idx_argpo, idx_mo, idx_bstar, idx_mass, idx_radius, idx_r[0], idx_r[1], idx_r[2], idx_v[0], idx_v[1], idx_v[2]]
-    idx_prop_out = [idx_a, idx_ecco, idx_inclo, idx_nodeo, idx_argpo, idx_mo, idx_error, idx_r[0], idx_r[1], idx_r[2], idx_v[0], idx_v[1], idx_v[2]]
-    idx_control_in = [idx_a, idx_ecco, idx_inclo, idx_nodeo, idx_argpo, idx_mo, idx_controlled, idx_a_desired, idx_missionlife, idx_launch_date, idx_r[0], idx_r[1], idx_r[2], idx_v[0], idx_v[1], idx_v[2]]
-    idx_control_out = [idx_a, idx_controlled, idx_r[0], idx_r[1], idx_r[2], idx_v[0], idx_v[1], idx_v[2]]
-    idx_exp_in = [idx_mass, idx_radius, idx_r[0], idx_r[1], idx_r[2], idx_v[0], idx_v[1], idx_v[2], idx_objectclass]
-    idx_col_in = [idx_mass, idx_radius, idx_r[0], idx_r[1], idx_r[2], idx_v[0], idx_v[1], idx_v[2], idx_objectclass]
+    @property
+    def done(self):
+        """True once the last timestep has been propagated"""
+        return self.state.n >= self.n_time - 1
     
-    # Store initial state
-    objclassint_store = mat_sats[:, idx_objectclass]
-    a_store = mat_sats[:, idx_a]
-    controlled_store = mat_sats[:, idx_controlled]
+    def step(self):
+        """
+        Advance the simulation by one timestep
+        
+        Returns:
+        --------
+        n : int
+            Index of the timestep that was computed
+        """
+        if self.done:
+            raise RuntimeError('Simulation already finished')
+        state = self.state
+        n = state.n + 1
+        current_time = self.time0 + timedelta(minutes=self.tsince[n])
+        
+        out_future = self._launches(n)
+        state.param['maxID'] = state.param['maxID'] + len(out_future)
+        state.count_tot_launches = state.count_tot_launches + len(out_future)
+        
+        self._propagate(n, current_time)
+        self._control(n)
+        state.deorbitlist_r[n] = state.num_deorbited
+        self._conjunctions(n, current_time)
+        out_frag = self._explosions(n, current_time)
+        remove_collision, out_collision = self._collisions(n, current_time)
+        
+        # DATA PROCESSING
+        pop = state.pop
+        if len(remove_collision) > 0:
+            pop.remove(remove_collision)
+        
+        # Add new objects
+        for new_rows in [out_future, out_frag, out_collision]:
+            if len(new_rows) > 0:
+                self._schedule_decay(pop.append(new_rows), n)
+        
+        # Record launch data
+        if len(out_future) > 0:
+            state.launch_data.extend(out_future)
+        
+        # ACCOUNTING
+        self._record(n, out_future, out_frag, out_collision)
+        self._save_matsats(n)
+        self._print_status(n, current_time, out_future)
+        
+        # Squeeze out tombstones once enough of them have accumulated
+        remap = pop.maybe_compact()
+        if self.bands is not None:
+            self.bands.remap(remap)
+        if self.decay is not None:
+            self.decay.remap(remap)
+        if remap is not None and state.rv_stale is not None:
+            stale = state.rv_stale
+            state.rv_stale = stale[np.flatnonzero(remap[:len(stale)] >= 0)]
+        
+        state.n = n
+        
+        # Periodic checkpoint of the full state
+        if np.isfinite(self.n_save_checkpoint) and n % self.n_save_checkpoint == 0:
+            self.save_checkpoint(self.filename_save)
+        return n
     
-    # Initialize sats_info
-    if save_output_file in [3, 4]:
-        sats_info[0] = objclassint_store.astype(np.int8)
-        sats_info[1] = a_store.astype(np.float32)
-        sats_info[2] = controlled_store.astype(np.int8)
-        # Calculate SSEM population
-        S_MC[0, :], D_MC[0, :], N_MC[0, :] = Fast_MC2SSEM_population(sats_info, paramSSEM)
-    else:
-        sats_info[0][0] = objclassint_store.astype(np.int8)
-        sats_info[0][1] = a_store.astype(np.float32)
-        sats_info[0][2] = controlled_store.astype(np.int8)
+    def run(self):
+        """
+        Propagate all remaining timesteps
+        
+        Returns:
+        --------
+        Same tuple as main_mc
+        """
+        while not self.done:
+            self.step()
+        self.close()
+        
+        print(f'\n === FINISHED MC RUN (main_mc.py) WITH SEED: {self.RNGseed} ===')
+        
+        return self.results()
     
-    # Extract species numbers
-    nS, nD, nN, nB = categorizeObj(objclassint_store, controlled_store)
+    def results(self):
+        """Return the main_mc output tuple for the current state"""
+        state = self.state
+        nS, nD, nN, nB = state.species
+        return (nS, nD, nN, nB, state.deorbitlist_r, state.satellites_over_time,
+                state.derelicts_over_time, state.debris_over_time, state.rocket_bodies_over_time,
+                state.expected_coll, state.expected_coll_shell, state.expected_coll_species)
     
-    # Store initial species counts
-    satellites_over_time[0] = nS
-    derelicts_over_time[0] = nD
-    debris_over_time[0] = nN
-    rocket_bodies_over_time[0] = nB
+    def close(self):
+        """Flush and close the output sink"""
+        if self.state.sink is not None:
+            self.state.sink.close()
     
-    # Test save
-    if save_output_file > 0:
-        # TODO: Implement proper saving
-        print(f'Test saving of {filename_save} successful')
+    def save_checkpoint(self, filename):
+        """
+        Write the full simulation state to a binary checkpoint file
+        
+        The file holds the population slots, RNG state, maxID, step index and
+        all accumulated time series. It is written to a temporary file in the
+        same directory and renamed into place, so an interrupted write never
+        leaves a truncated checkpoint behind.
+        
+        Parameters:
+        -----------
+        filename : str
+            Checkpoint file (.npz)
+        """
+        self._materialize()
+        state = self.state
+        data = {'version': CHECKPOINT_VERSION, 'n': state.n, 'n_time': self.n_time,
+                'maxID': state.param['maxID'], 'num_pmd': state.num_pmd,
+                'num_deorbited': state.num_deorbited, 'count_tot_launches': state.count_tot_launches,
+                'species': np.array(state.species)}
+        for name, arr in state.pop.to_arrays().items():
+            data['pop_' + name] = arr
+        
+        rng_name, keys, pos, has_gauss, cached_gaussian = state.rng.get_state()
+        data.update(rng_keys=keys, rng_pos=pos, rng_has_gauss=has_gauss,
+                    rng_cached_gaussian=cached_gaussian)
+        
+        for name in CHECKPOINT_SERIES:
+            data[name] = getattr(state, name)
+        
+        # sats_info is ragged (one entry per recorded step): store concatenated
+        # arrays with per-step lengths. Streamed sats_info are flushed instead
+        # and cut back to the checkpoint step on resume.
+        if self.save_output_file in [3, 4]:
+            sats_info = [state.sats_info]
+        elif state.sink is not None:
+            state.sink.flush()
+            sats_info = [[np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int8)]]
+        else:
+            sats_info = state.sats_info[:state.n + 1]
+        data['sats_info_len'] = np.array([len(info[0]) for info in sats_info])
+        for k in range(3):
+            data[f'sats_info_{k}'] = np.concatenate([info[k] for info in sats_info])
+        
+        data['launch_data'] = np.array(state.launch_data, dtype=float).reshape(-1, 24)
+        data['conjunctions'] = np.concatenate([np.zeros((0, 6))] + state.conjunctions)
+        
+        _atomic_savez(filename, data)
     
-    # Print initial status
-    print(f'Year {time0.year} - Day {time0.timetuple().tm_yday:03d},\t PMD {num_pmd:04d},\t Deorbit {num_deorbited:03d},\t Launches {len(out_future):03d},\t nFrag {count_expl[0]:03d},\t nCol {count_coll[0]:03d},\t nObjects {numObjects[0]} ({nS},{nD},{nN},{nB})')
+    def _load_checkpoint(self, filename, param, sink=None):
+        """Rebuild a SimState from a checkpoint written by save_checkpoint"""
+        with np.load(filename) as data:
+            if int(data['version']) != CHECKPOINT_VERSION:
+                raise ValueError(f'Unsupported checkpoint version {int(data["version"])} in {filename}')
+            if int(data['n_time']) != self.n_time:
+                raise ValueError(f'Checkpoint {filename} was written for n_time={int(data["n_time"])}, '
+                                 f'configuration has n_time={self.n_time}')
+            
+            pop = PopulationStore.from_arrays({name: data['pop_' + name] for name, _, _ in POP_FIELDS}
+                                              | {'live': data['pop_live']})
+            rng = np.random.RandomState()
+            rng.set_state(('MT19937', data['rng_keys'], int(data['rng_pos']),
+                           int(data['rng_has_gauss']), float(data['rng_cached_gaussian'])))
+            param['maxID'] = int(data['maxID'])
+            
+            state = SimState(pop, rng, param, self.n_time, len(self.paramSSEM['R02']) - 1,
+                             self.save_output_file, sink)
+            state.n = int(data['n'])
+            state.num_pmd = int(data['num_pmd'])
+            state.num_deorbited = int(data['num_deorbited'])
+            state.count_tot_launches = int(data['count_tot_launches'])
+            state.species = tuple(int(x) for x in data['species'])
+            for name in CHECKPOINT_SERIES:
+                getattr(state, name)[...] = data[name]
+            
+            bounds = np.cumsum(data['sats_info_len'])[:-1]
+            parts = [np.split(data[f'sats_info_{k}'], bounds) for k in range(3)]
+            if self.save_output_file in [3, 4]:
+                state.sats_info = [parts[k][0] for k in range(3)]
+            elif sink is not None:
+                sink.truncate(state.n)
+            else:
+                for n_rec in range(state.n + 1):
+                    state.sats_info[n_rec] = [parts[k][n_rec] for k in range(3)]
+            
+            state.launch_data = list(data['launch_data'])
+            state.conjunctions = [data['conjunctions']]
+        return state
     
-    launch_data = []
+    @property
+    def mat_sats(self):
+        """Current population in legacy mat_sats format (copy)"""
+        self._materialize()
+        return self.state.pop.to_matrix()
     
-    # START PROPAGATION
-    for n in range(1, n_time):
-        current_time = time0 + timedelta(minutes=tsince[n])
-        jd = Time(current_time).jd
-        
-        # LAUNCHES
-        if launch_model.lower() == 'matsat':  # repeat launches
+    def _launches(self, n):
+        """LAUNCHES: new objects (mat_sats rows) entering at timestep n"""
+        if self.launch_model == 'matsat':  # repeat launches
             # Get launches for current timestep
-            if n < len(launchMC_step):
-                out_future = launchMC_step[n] if launchMC_step[n] is not None else []
-            else:
-                out_future = []
-            launch = len(out_future)
-        elif launch_model.lower() == 'random':
-            # Random launch model - implement based on launch frequency
-            if hasattr(globals(), 'launch_frequency') and np.random.random() < launch_frequency:
-                # Generate random launch
-                out_future = generate_random_launch(param)
-                launch = len(out_future)
-            else:
-                out_future = []
-                launch = 0
-        elif launch_model.lower() in ['data', 'somma']:
+            if n < len(self.launchMC_step) and self.launchMC_step[n] is not None:
+                return self.launchMC_step[n]
+            return []
+        elif self.launch_model == 'random':
+            # Random launch model - fires with probability launch_frequency per step
+            if self.launch_frequency is not None and self.state.rng.random() < self.launch_frequency:
+                return generate_random_launch(self.state.param, rng=self.state.rng)
+            return []
+        elif self.launch_model in ['data', 'somma']:
             # Data-driven launch model
-            if n < len(additional_launches):
-                out_future = additional_launches[n] if additional_launches[n] is not None else []
-            else:
-                out_future = []
-            launch = len(out_future)
-        elif launch_model.lower() == 'no_launch':
-            out_future = []
-            launch = 0
+            if n < len(self.additional_launches) and self.additional_launches[n] is not None:
+                return self.additional_launches[n]
+            return []
+        elif self.launch_model == 'no_launch':
+            return []
         else:
             raise ValueError('Invalid launch model')
+    
+    def _propagate(self, n, current_time):
+        """PROPAGATION (one timestep at a time)"""
+        state = self.state
+        pop = state.pop
         
-        param['maxID'] = param['maxID'] + len(out_future)
-        count_tot_launches = count_tot_launches + len(out_future)
+        state.param['jd'] = Time(current_time).jd
+        dt = 60 * (self.tsince[n] - self.tsince[n - 1])  # units of time in seconds
         
-        # PROPAGATION (one timestep at a time)
-        n_sats = mat_sats.shape[0]
+        # Propagate orbital elements in place (tombstoned slots are
+        # propagated too and ignored afterwards); in lazy mode only the mean
+        # elements advance and positions/velocities are computed on demand;
+        # with the decay schedule only the slots due at this step are tested
+        # for decay (the others cannot have decayed yet) and are filed again
+        # if they are still in orbit
+        rv_rows = [] if self.lazy_state else None
+        out = (pop['oe'], pop['error'], pop['r'], pop['v'])
+        if self.use_sgp4:
+            prop_sgp4_vec_cols(pop['oe'], pop['bstar'], pop['controlled'], dt, state.param,
+                               out=out, rv_rows=rv_rows)
+        else:
+            due = self.decay.pop_due(n, pop.live) if self.decay is not None else None
+            prop_mit_vec_cols(pop['oe'], pop['bstar'], pop['controlled'], dt, state.param,
+                              out=out, rv_rows=rv_rows, check_rows=due)
+        if self.bands is not None:
+            self.bands.touch(np.flatnonzero(pop.live & (pop['controlled'] != 1)))
         
-        if not use_sgp4:  # use prop_mit
-            param['jd'] = jd
-            
-            if n > 0:
-                dt = 60 * (tsince[n] - tsince[n - 1])  # units of time in seconds
-            else:
-                dt = 60 * tsince[n]  # units of time in seconds
-            
-            # Propagate orbital elements
-            mat_sats[:, idx_prop_out] = prop_mit_vec(mat_sats[:, idx_prop_in], dt, param)
+        # REMOVE DECAYED SATELLITES
+        if self.decay is not None:
+            is_decayed = pop['error'][due] == 1
+            idx_decayed = due[is_decayed]
+            self._schedule_decay(due[~is_decayed], n)
+        else:
+            idx_decayed = np.flatnonzero(pop.live & (pop['error'] == 1))
+        if len(idx_decayed) > 0:
+            state.num_deorbited += pop.remove(idx_decayed)
+        
+        if self.lazy_state:
+            state.rv_stale = pop.live.copy()
+    
+    def _schedule_decay(self, rows, n):
+        """File slots in the decay schedule with their elements at step n"""
+        if self.decay is not None:
+            pop = self.state.pop
+            self.decay.add(rows, pop['oe'], pop['bstar'], pop['controlled'], n)
+    
+    def _materialize(self, rows=None):
+        """
+        Compute the positions and velocities left out by a lazy propagation
+        
+        Parameters:
+        -----------
+        rows : array-like, optional
+            Slot indices needed by the caller (all live slots if not given);
+            slots that are up to date are skipped
+        """
+        state = self.state
+        stale = state.rv_stale
+        if stale is None:
+            return
+        pop = state.pop
+        
+        # Slots appended after the propagation carry their own state
+        if rows is None:
+            rows = np.flatnonzero(stale & pop.live[:len(stale)])
+        else:
+            rows = np.asarray(rows, dtype=np.intp)
+            rows = rows[rows < len(stale)]
+            rows = rows[stale[rows]]
+        if len(rows) == 0:
+            return
+        
+        mean_oe = pop['oe'][rows, :].copy()
+        mean_oe[:, 0] *= state.param['req']
+        if self.use_sgp4:
+            pop['r'][rows, :], pop['v'][rows, :] = sgp4_mean_oe2rv(mean_oe, pop['bstar'][rows], state.param)
+        else:
+            pop['r'][rows, :], pop['v'][rows, :] = mean_oe2rv(mean_oe, state.param)
+        stale[rows] = False
+    
+    def _control(self, n):
+        """ORBIT CONTROL"""
+        state = self.state
+        pop = state.pop
+        if n % self.step_control == 0 or self.step_control == 1:
+            # Controlled satellites may be reset or released below
+            idx_controlled = np.flatnonzero(pop.live & (pop['controlled'] == 1))
             
-            # REMOVE DECAYED SATELLITES
-            idx_decayed = np.where(mat_sats[:, idx_error] == 1)[0]
-            if len(idx_decayed) > 0:
-                num_deorbited += len(idx_decayed)
-                mat_sats = np.delete(mat_sats, idx_decayed, axis=0)
-        
-        # ORBIT CONTROL
-        if n % step_control == 0 or step_control == 1:
-            # Apply orbit control
-            mat_sats[:, idx_control_out], deorbit_PMD = orbcontrol_vec(
-                mat_sats[:, idx_control_in], tsince[n], time0, orbtol, PMD, DAY2MIN, YEAR2DAY, param)
+            # Apply orbit control in place on live satellites
+            deorbit_PMD = orbcontrol_vec_cols(
+                pop['oe'], pop['controlled'], pop['a_desired'], pop['missionlife'], pop['launch_date'],
+                pop['r'], pop['v'], self.tsince[n], self.time0, self.orbtol, self.PMD,
+                self.DAY2MIN, self.YEAR2DAY, state.param, active=pop.live, rng=state.rng)
             
             # Remove post-mission disposal satellites
-            num_pmd = len(deorbit_PMD)
+            state.num_pmd = len(deorbit_PMD)
             if len(deorbit_PMD) > 0:
-                mat_sats = np.delete(mat_sats, deorbit_PMD, axis=0)
+                pop.remove(deorbit_PMD)
+            self._schedule_decay(idx_controlled[pop.live[idx_controlled]], n)
+            if self.bands is not None:
+                self.bands.touch(idx_controlled)
         else:
-            num_pmd = 0
-        
-        deorbitlist_r[n] = num_deorbited
+            state.num_pmd = 0
+    
+    def _conjunctions(self, n, current_time):
+        """CLOSE APPROACHES of controlled satellites (k-d tree screening)"""
+        if self.conjunction_threshold is None:
+            return
+        state = self.state
+        pop = state.pop
+        rows = pop.live_rows()
+        primary = rows[pop['controlled'][rows] == 1]
+        if len(primary) == 0:
+            return
         
-        # EXPLOSIONS (for Rocket Body)
-        n_sats = mat_sats.shape[0]
+        # Screen at the same epochs as the collision samples: far coarser than
+        # threshold / v_rel, so only the approaches that happen to fall on one
+        # of them are seen (miss and t offset are refined around that epoch)
+        dt = 60 * (self.tsince[n] - self.tsince[n - 1])  # units of time in seconds
+        t = -dt * np.arange(self.n_collision_samples) / self.n_collision_samples
+        pairs, miss, vrel, t_min = conjunction_screen_window(pop['oe'], t, self.conjunction_threshold,
+                                                             state.param, primary=primary, rows=rows)
+        if len(pairs) == 0:
+            return
+        state.conjunctions.append(np.column_stack((np.full(len(pairs), n), pop['ID'][pairs[:, 0]],
+                                                   pop['ID'][pairs[:, 1]], miss, vrel, t_min)))
+        print(f'Year {current_time.year} - Day {current_time.timetuple().tm_yday:03d} \t {len(pairs)} sampled close approaches of controlled satellites (< {self.conjunction_threshold} km)')
+    
+    def _explosions(self, n, current_time):
+        """EXPLOSIONS (for Rocket Body); returns the new fragments"""
+        state = self.state
+        pop = state.pop
         out_frag = []
+        if self.P_frag <= 0:
+            return out_frag
         
-        if P_frag > 0:
-            find_rocket = np.where(mat_sats[:, idx_objectclass] == 5)[0]  # Rocket bodies
-            if len(find_rocket) > 0:
-                rand_P_exp = np.random.random(len(find_rocket))
-                
-                if 'P_frag_cutoff' in locals():
-                    # Age-based explosion logic
-                    current_age = tsince[n] - mat_sats[find_rocket, idx_launch_date]
-                    age_factor = np.exp(-current_age / P_frag_cutoff)
-                    find_P_exp = np.where(rand_P_exp < P_frag * age_factor)[0]
-                else:
-                    find_P_exp = np.where(rand_P_exp < P_frag)[0]
-                
-                remove_frag = find_rocket[find_P_exp]
-                
-                for idx_P_exp_temp in range(len(remove_frag) - 1, -1, -1):  # reverse order
-                    idx_P_exp = remove_frag[idx_P_exp_temp]
-                    
-                    p1_all = mat_sats[idx_P_exp, :]
-                    p1_mass = p1_all[idx_mass]
-                    p1_objectclass = p1_all[idx_objectclass]
-                    p1_in = p1_all[idx_exp_in]
-                    
-                    # Perform explosion fragmentation
-                    debris1 = frag_exp_SBM_vec(tsince[n], p1_in, param)
-                    param['maxID'] = param['maxID'] + len(debris1)
-                    
-                    if len(debris1) == 0:
-                        # Remove from remove_frag if no debris generated
-                        remove_frag = np.delete(remove_frag, idx_P_exp_temp)
-                    else:
-                        out_frag.extend(debris1)
-                        print(f'Year {current_time.year} - Day {current_time.timetuple().tm_yday:03d} \t Explosion, p1 type {p1_objectclass}, {p1_mass:.1f} kg, nDebris {len(debris1)}')
-                        count_expl[n] += 1
-                
-                if len(remove_frag) > 0:
-                    mat_sats = np.delete(mat_sats, remove_frag, axis=0)
-        
-        # COLLISIONS
-        if (skipCollisions == 1) or (mat_sats.shape[0] == 0):
-            collision_array = []
-        else:
-            # Perform cube method collision detection
-            collision_cell = cube_vec_v3(mat_sats[:, idx_r], CUBE_RES, collision_alt_limit)
-            collision_array = collision_cell
+        find_rocket = np.flatnonzero(pop.live & (pop['objectclass'] == 5))  # Rocket bodies (slot indices)
+        if len(find_rocket) == 0:
+            return out_frag
+        
+        rand_P_exp = state.rng.random(len(find_rocket))
+        find_P_exp = np.where(rand_P_exp < self.P_frag)[0]
+        remove_frag = find_rocket[find_P_exp]
+        if len(remove_frag) == 0:
+            return out_frag
         
+        # Fragment all exploding objects in one batch
+        self._materialize(remove_frag)
+        p1_all = pop.to_matrix(remove_frag)
+        debris, offsets = frag_exp_SBM_batch(self.tsince[n], p1_all[:, self.idx_exp_in], state.param, rng=state.rng)
+        n_debris = np.diff(offsets)
+        
+        for k in np.flatnonzero(n_debris > 0):
+            print(f'Year {current_time.year} - Day {current_time.timetuple().tm_yday:03d} \t Explosion, p1 type {p1_all[k, idx_objectclass]}, {p1_all[k, idx_mass]:.1f} kg, nDebris {n_debris[k]}')
+        state.count_expl[n] += np.count_nonzero(n_debris)
+        out_frag = debris
+        
+        # Objects that produced no debris stay in the population
+        pop.remove(remove_frag[n_debris > 0])
+        return out_frag
+    
+    def _collisions(self, n, current_time):
+        """COLLISIONS; returns (slots to remove, new fragments)"""
+        state = self.state
+        pop = state.pop
         remove_collision = []
         out_collision = []
         
-        if len(collision_array) > 0:
-            # Process each collision pair
-            for collision_pair in collision_array:
-                idx1, idx2 = collision_pair
-                
-                # Get collision objects
-                p1_all = mat_sats[idx1, :]
-                p2_all = mat_sats[idx2, :]
-                
-                p1_in = p1_all[idx_col_in]
-                p2_in = p2_all[idx_col_in]
-                
-                # Calculate collision probability and velocity
-                # For single collision pair, calculate manually
-                p1_radius = p1_in[1]
-                p2_radius = p2_in[1]
-                p1_v = p1_in[5:8]
-                p2_v = p2_in[5:8]
-                
-                sigma = (p1_radius + p2_radius)**2 * (np.pi / 1e6)  # m²
-                dU = CUBE_RES**3  # km³
-                Vimp = np.linalg.norm(p1_v - p2_v)  # km/s
-                prob_coll = Vimp / dU * sigma
-                dv_coll = Vimp
-                
-                # Check if collision occurs based on probability
-                if np.random.random() < prob_coll:
-                    # Perform collision fragmentation
-                    debris1, debris2 = frag_col_SBM_vec(tsince[n], p1_in, p2_in, param)
-                    
-                    # Add collision debris to output
-                    if len(debris1) > 0:
-                        out_collision.extend(debris1)
-                    if len(debris2) > 0:
-                        out_collision.extend(debris2)
-                    
-                    # Mark objects for removal
-                    remove_collision.extend([idx1, idx2])
-                    
-                    # Update collision counter
-                    count_coll[n] += 1
-                    
-                    print(f'Year {current_time.year} - Day {current_time.timetuple().tm_yday:03d} \t Collision, p1 type {p1_all[idx_objectclass]}, p2 type {p2_all[idx_objectclass]}, nDebris {len(debris1) + len(debris2)}')
+        if (self.skipCollisions == 1) or (len(pop) == 0):
+            return remove_collision, out_collision
         
-        # DATA PROCESSING
-        if len(remove_collision) > 0:
-            mat_sats = np.delete(mat_sats, remove_collision, axis=0)
+        # Candidate pairs (slot indices) and their collision probabilities
+        pairs, prob_coll, runs, members = self._collision_candidates(n)
+        if len(pairs) == 0:
+            return remove_collision, out_collision
+        idx1 = pairs[:, 0]
+        idx2 = pairs[:, 1]
         
-        # Add new objects
-        if len(out_future) > 0:
-            mat_sats = np.vstack([mat_sats, out_future])
-        if len(out_frag) > 0:
-            mat_sats = np.vstack([mat_sats, out_frag])
-        if len(out_collision) > 0:
-            mat_sats = np.vstack([mat_sats, out_collision])
+        # Expected collisions are accumulated in both modes; 'expected' runs
+        # stop here and never break objects up
+        self._record_expected(n, pairs, prob_coll)
+        if self.collision_mode == 'expected':
+            return remove_collision, out_collision
         
-        # Record launch data
-        if len(out_future) > 0:
-            launch_data.extend(out_future)
+        # One uniform draw per candidate pair: prob_coll is the expected
+        # number of events of the pairs it stands for (above 1 for sampled
+        # pairs of dense cubes), rounded stochastically to an event count
+        n_events = np.floor(prob_coll).astype(np.intp)
+        n_events += state.rng.random(len(pairs)) < prob_coll - n_events
+        accepted = np.flatnonzero(n_events > 0)
         
-        # ACCOUNTING
-        n_sats = mat_sats.shape[0]
-        numObjects[n] = n_sats
+        # An object breaks up at most once per step: accepted pairs are taken
+        # in pair order and later pairs involving an already collided object
+        # are dropped
+        collided = set()
+        event1 = []
+        event2 = []
+        left = np.zeros(len(pairs), dtype=np.intp)
+        for k in accepted:
+            i1, i2 = int(idx1[k]), int(idx2[k])
+            if i1 in collided or i2 in collided:
+                left[k] = n_events[k]
+                continue
+            collided.update((i1, i2))
+            event1.append(i1)
+            event2.append(i2)
+            left[k] = n_events[k] - 1
+        
+        # The other events of a sampled pair (all of them if the pair itself
+        # was taken) belong to other pairs of its cube: each joins two
+        # randomly chosen objects of that cube that are still intact
+        sampled = np.flatnonzero((left > 0) & (runs[:, 1] > 0))
+        for i1, i2 in self._extra_events(members, runs[sampled], left[sampled], collided):
+            event1.append(i1)
+            event2.append(i2)
+        if len(event1) == 0:
+            return remove_collision, out_collision
+        event1 = np.array(event1, dtype=np.intp)
+        event2 = np.array(event2, dtype=np.intp)
+        
+        # Fragment all colliding pairs in one batch
+        p1_all = pop.to_matrix(event1)
+        p2_all = pop.to_matrix(event2)
+        out_collision, offsets = frag_col_SBM_batch(self.tsince[n], p1_all[:, self.idx_col_in],
+                                                    p2_all[:, self.idx_col_in], state.param, rng=state.rng)
+        n_debris = np.diff(offsets)
+        
+        # Mark objects for removal
+        remove_collision = np.column_stack([event1, event2]).ravel()
+        
+        # Update collision counter
+        state.count_coll[n] += len(event1)
+        
+        for k in range(len(event1)):
+            print(f'Year {current_time.year} - Day {current_time.timetuple().tm_yday:03d} \t Collision, p1 type {p1_all[k, idx_objectclass]}, p2 type {p2_all[k, idx_objectclass]}, nDebris {n_debris[k]}')
+        
+        return remove_collision, out_collision
+    
+    def _extra_events(self, members, runs, n_extra, collided):
+        """
+        Pairs of intact objects of the sampled cubes, n_extra per cube
         
-        objclassint_store = mat_sats[:, idx_objectclass]
-        a_store = mat_sats[:, idx_a]
-        controlled_store = mat_sats[:, idx_controlled]
+        The chosen objects are added to collided.
+        
+        Parameters:
+        -----------
+        members : ndarray
+            Slots of the cubes (see _collision_candidates)
+        runs : ndarray
+            (start, length) of every cube in members, shape (n_cubes, 2)
+        n_extra : array-like
+            Number of events of every cube
+        collided : set
+            Slots that already broke up this step
+            
+        Returns:
+        --------
+        events : list of tuple
+            Slot pairs (i1, i2)
+        """
+        rng = self.state.rng
+        events = []
+        for (start, length), n_cube in zip(runs, n_extra):
+            cube = [int(j) for j in rng.permutation(members[start:start + length]) if int(j) not in collided]
+            n_cube = min(int(n_cube), len(cube) // 2)
+            for k in range(n_cube):
+                i1, i2 = sorted(cube[2 * k:2 * k + 2])
+                collided.update((i1, i2))
+                events.append((i1, i2))
+        return events
+    
+    def _collision_candidates(self, n):
+        """
+        Cube method screening over the step; returns (pairs, probabilities, runs, members)
+        
+        The cube test runs at n_collision_samples epochs spread evenly over
+        the step, ending at the propagated positions. Intermediate epochs only
+        advance the mean anomaly backwards from the current elements and are
+        converted in single precision, which is ample for the cube hash. Each
+        sample contributes its probabilities divided by the number of samples,
+        accumulated per pair in order of first appearance. Sampled pairs of
+        dense cubes also carry their cube as a (start, length) slice of
+        members (length 0 for enumerated pairs), see cube_pairs.
+        """
+        state = self.state
+        pop = state.pop
+        n_samples = self.n_collision_samples
+        dt = 60 * (self.tsince[n] - self.tsince[n - 1])  # units of time in seconds
+        
+        # Objects only share a cube within a group of overlapping
+        # perigee-apogee bands; objects alone in their group are left out.
+        # Without the bands, objects whose perigee lies beyond the reach of
+        # the cube test (every coordinate within collision_alt_limit) are
+        # still left out using the mean elements
+        if self.bands is not None:
+            groups = self.bands.update(pop['oe'], pop.live, state.param['req'])
+            valid = groups >= 0
+        else:
+            groups = None
+            r_p = pop['oe'][:, 0] * (1 - pop['oe'][:, 1]) * state.param['req'] - self.band_margin
+            valid = pop.live & (r_p <= np.sqrt(3) * self.collision_alt_limit)
+        rows = np.flatnonzero(valid)
+        
+        # Only the candidates enter the cube test (collision parents and the
+        # encounter shells are taken from them)
+        self._materialize(rows)
+        
+        pairs_all = []
+        prob_all = []
+        runs_all = []
+        members_all = []
+        n_members = 0
+        ess = 0.0
+        for k in range(n_samples):
+            if k == 0:
+                r, v = pop['r'], pop['v']
+            else:
+                r, v = prop_mean_anomaly_cols(pop['oe'], -dt * k / n_samples, state.param,
+                                              rows=rows, dtype=np.float32)
+            
+            # Perform cube method collision detection (pairs of slot indices);
+            # over-dense cubes are sampled and shifted grids averaged, each
+            # pair weighted by the number of pairs it stands for
+            if self.max_pairs_per_cube is None and self.n_collision_grids == 1:
+                pairs = cube_vec_v3(r, self.CUBE_RES, self.collision_alt_limit, valid=valid, groups=groups)
+                weight = 1.0
+                runs = np.zeros((len(pairs), 2), dtype=np.intp)
+                members = np.zeros(0, dtype=np.intp)
+                ess += len(pairs)
+            else:
+                pairs, weight, runs, members = cube_vec_v3(
+                    r, self.CUBE_RES, self.collision_alt_limit, valid=valid, max_pairs=self.max_pairs_per_cube,
+                    rng=state.rng, n_grids=self.n_collision_grids, groups=groups, return_runs=True)
+                ess += effective_sample_size(weight)
+            
+            # Collision probability of every candidate pair (a pair collides
+            # at most once), times the number of pairs it stands for
+            prob = np.minimum(collision_prob_vec(pop['radius'][pairs[:, 0]], v[pairs[:, 0]],
+                                                 pop['radius'][pairs[:, 1]], v[pairs[:, 1]], self.CUBE_RES), 1) * weight
+            pairs_all.append(pairs)
+            prob_all.append(prob / n_samples)
+            runs_all.append(runs + [n_members, 0])
+            members_all.append(members)
+            n_members += len(members)
+        state.pair_ess[n] = ess / n_samples
+        
+        members = np.concatenate(members_all)
+        if n_samples == 1:
+            return pairs_all[0], prob_all[0], runs_all[0], members
+        
+        # Accumulate the probability of pairs found at several epochs
+        pairs, prob, runs = merge_pairs(np.concatenate(pairs_all), np.concatenate(prob_all), pop.n_slots,
+                                        np.concatenate(runs_all))
+        return pairs, prob, runs, members
+    
+    def _record_expected(self, n, pairs, prob_coll):
+        """Accumulate the expected number of collisions per shell and species pair"""
+        state = self.state
+        pop = state.pop
+        
+        # Per-pair probabilities are capped in _collision_candidates; the
+        # weighted values of sampled pairs are expected counts and are summed
+        # as they are
+        expected = prob_coll
+        state.expected_coll[n] = expected.sum()
+        
+        # Shell of the encounter: altitude of the first object
+        alt = np.sqrt(np.sum(pop['r'][pairs[:, 0]]**2, axis=1)) - self.paramSSEM['re']
+        R02 = self.paramSSEM['R02']
+        shell = np.searchsorted(R02, alt, side='right') - 1
+        in_shell = (shell >= 0) & (shell < len(R02) - 1)
+        state.expected_coll_shell[n] = np.bincount(shell[in_shell], weights=expected[in_shell],
+                                                   minlength=len(R02) - 1)
+        
+        species = species_index(pop['objectclass'][pairs], pop['controlled'][pairs])
+        s1 = species[:, 0]
+        s2 = species[:, 1]
+        n_species = len(SPECIES_LABELS)
+        cell = np.minimum(s1, s2).astype(np.intp) * n_species + np.maximum(s1, s2)
+        state.expected_coll_species[n] = np.bincount(cell, weights=expected,
+                                                     minlength=n_species**2).reshape(n_species, n_species)
+    
+    def _record(self, n, out_future, out_frag, out_collision):
+        """ACCOUNTING: store population summaries of timestep n"""
+        state = self.state
+        pop = state.pop
+        state.numObjects[n] = len(pop)
+        
+        rows = pop.live_rows()
+        objclassint_store = pop['objectclass'][rows]
+        a_store = pop['oe'][rows, 0]
+        controlled_store = pop['controlled'][rows]
         
         # Update sats_info
-        if save_output_file in [3, 4]:
-            sats_info[0] = objclassint_store.astype(np.int8)
-            sats_info[1] = a_store.astype(np.float32)
-            sats_info[2] = controlled_store.astype(np.int8)
+        if state.sink is not None:
+            state.sink.write(n, objclassint_store, a_store, controlled_store)
+        elif self.save_output_file in [3, 4]:
+            state.sats_info[0] = objclassint_store.astype(np.int8)
+            state.sats_info[1] = a_store.astype(np.float32)
+            state.sats_info[2] = controlled_store.astype(np.int8)
             # Calculate SSEM population
-            S_MC[n, :], D_MC[n, :], N_MC[n, :] = Fast_MC2SSEM_population(sats_info, paramSSEM)
+            state.S_MC[n, :], state.D_MC[n, :], state.N_MC[n, :] = Fast_MC2SSEM_population(state.sats_info, self.paramSSEM)
         else:
-            sats_info[n][0] = objclassint_store.astype(np.int8)
-            sats_info[n][1] = a_store.astype(np.float32)
-            sats_info[n][2] = controlled_store.astype(np.int8)
+            state.sats_info[n][0] = objclassint_store.astype(np.int8)
+            state.sats_info[n][1] = a_store.astype(np.float32)
+            state.sats_info[n][2] = controlled_store.astype(np.int8)
         
-        count_debris_coll[n] = len(out_collision)
-        count_debris_expl[n] = len(out_frag)
+        state.count_debris_coll[n] = len(out_collision)
+        state.count_debris_expl[n] = len(out_frag)
         
         # Update species counts
-        nS, nD, nN, nB = categorizeObj(objclassint_store, controlled_store.astype(np.int8))
+        nS, nD, nN, nB = categorizeObj(objclassint_store, controlled_store)
+        state.species = (nS, nD, nN, nB)
         
         # Store species counts for this timestep
-        satellites_over_time[n] = nS
-        derelicts_over_time[n] = nD
-        debris_over_time[n] = nN
-        rocket_bodies_over_time[n] = nB
-        
-        # Print status
-        print(f'Year {current_time.year} - Day {current_time.timetuple().tm_yday:03d},\t PMD {num_pmd:04d},\t Deorbit {num_deorbited:03d},\t Launches {len(out_future):03d},\t nFrag {count_expl[n]:03d},\t nCol {count_coll[n]:03d},\t nObjects {numObjects[n]} ({nS},{nD},{nN},{nB})')
+        state.satellites_over_time[n] = nS
+        state.derelicts_over_time[n] = nD
+        state.debris_over_time[n] = nN
+        state.rocket_bodies_over_time[n] = nB
     
-    print(f'\n === FINISHED MC RUN (main_mc.py) WITH SEED: {RNGseed} ===')
+    def _save_matsats(self, n):
+        """Population snapshot every saveMSnTimesteps steps (output sink only)"""
+        if self.state.sink is not None and n % self.saveMSnTimesteps == 0:
+            self._materialize()
+            self.state.sink.write_matsats(n, self.state.pop.to_matrix())
     
-    return nS, nD, nN, nB, deorbitlist_r, satellites_over_time, derelicts_over_time, debris_over_time, rocket_bodies_over_time
+    def _print_status(self, n, current_time, out_future):
+        state = self.state
+        nS, nD, nN, nB = state.species
+        print(f'Year {current_time.year} - Day {current_time.timetuple().tm_yday:03d},\t PMD {state.num_pmd:04d},\t Deorbit {state.num_deorbited:03d},\t Launches {len(out_future):03d},\t nFrag {state.count_expl[n]:03d},\t nCol {state.count_coll[n]:03d},\t nObjects {state.numObjects[n]} ({nS},{nD},{nN},{nB})')
+
+def _atomic_savez(filename, data):
+    """Write arrays to an .npz file through a temporary file and an atomic rename"""
+    filename = os.path.abspath(filename)
+    fd, tmp_name = tempfile.mkstemp(suffix='.npz.tmp', dir=os.path.dirname(filename))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, filename)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
 
-def loadCFG(cfg):
-    """Load configuration into global variables"""
-    global mat_sats, time0, tsince, n_time, launch_model, repeatLaunches, launchMC_step
-    global additional_launches, ind_launch, ind_launch_add, use_sgp4, skipCollisions
-    global max_frag, CUBE_RES, collision_alt_limit, density_profile, param
-    global orbtol, PMD, step_control, P_frag, P_frag_cutoff, alph, alph_a
-    global save_output_file, filename_save, paramSSEM
+def _check_writable(filename):
+    """Create and remove a temporary file next to filename (raises OSError if that fails)"""
+    fd, tmp_name = tempfile.mkstemp(suffix='.npz.tmp', dir=os.path.dirname(os.path.abspath(filename)))
+    os.close(fd)
+    os.remove(tmp_name)
+
+def main_mc(MCconfig, RNGseed=None, resume_from=None):
+    """
+    Main Monte Carlo simulation function
     
-    # Extract all configuration parameters
-    for key, value in cfg.items():
-        if key == 'param':
-            param = value
-        else:
-            globals()[key] = value 
\ No newline at end of file
+    Parameters:
+    -----------
+    MCconfig : dict
+        Configuration dictionary
+    RNGseed : int, optional
+        Random seed for reproducibility
+    resume_from : str, optional
+        Checkpoint file to continue from (see Simulation.save_checkpoint);
+        checkpoints are written every cfg['n_save_checkpoint'] steps to
+        cfg['filename_save']
+        
+    Returns:
+    --------
+    nS : int
+        Number of satellites
+    nD : int
+        Number of derelicts
+    nN : int
+        Number of debris
+    nB : int
+        Number of rocket bodies
+    deorbitlist_r : array-like
+        Cumulative number of decayed objects per timestep
+    satellites_over_time, derelicts_over_time, debris_over_time, rocket_bodies_over_time : ndarray
+        Species counts per timestep
+    expected_coll : ndarray
+        Expected number of collisions per timestep (sum of the pair probabilities)
+    expected_coll_shell : ndarray
+        Expected collisions per timestep and SSEM shell, shape (n_time, n_shells)
+    expected_coll_species : ndarray
+        Expected collisions per timestep and species pair (upper triangle,
+        indexed by SPECIES_LABELS), shape (n_time, n_species, n_species)
+    """
+    return Simulation(MCconfig, RNGseed, resume_from=resume_from).run()
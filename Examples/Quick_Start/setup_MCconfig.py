@@ -82,13 +82,22 @@ def setup_MCconfig(rngseed, ICfile):
     paramSSEM['re'] = cfgMC['radiusearthkm']
     cfgMC['paramSSEM'] = paramSSEM
 
-    cfgMC['use_sgp4'] = False
+    cfgMC['use_sgp4'] = False  # True: vectorized SGP4/SDP4 instead of the MIT propagator
 
     cfgMC['skipCollisions'] = 0
+    cfgMC['collision_mode'] = 'sample'  # 'sample' (random breakups) or 'expected' (expected rates only)
     cfgMC['max_frag'] = np.inf
     
     cfgMC['CUBE_RES'] = 50
     cfgMC['collision_alt_limit'] = 45000
+    cfgMC['max_pairs_per_cube'] = None  # sample (unbiased, weighted) cubes with more candidate pairs
+    cfgMC['n_collision_samples'] = 1  # cube test epochs per propagation step
+    cfgMC['n_collision_grids'] = 1  # randomly shifted cube grids averaged per epoch
+    cfgMC['altitude_prefilter'] = True  # skip objects whose perigee-apogee band overlaps no other
+    cfgMC['band_margin'] = 25  # [km] osculating vs mean radius allowance of the bands
+    cfgMC['lazy_state'] = False  # positions/velocities only for collision candidates and event parents
+    cfgMC['decay_schedule'] = True  # check only objects whose predicted earliest decay step has come
+    cfgMC['conjunction_threshold'] = None  # [km] log close approaches of controlled satellites if set
     
     cfgMC = fillin_atmosphere(cfgMC)
 
@@ -97,6 +106,8 @@ def setup_MCconfig(rngseed, ICfile):
     cfgMC['save_diaryName'] = ''
     cfgMC['save_output_file'] = 0
     cfgMC['saveMSnTimesteps'] = 146
+    cfgMC['output_sink'] = 'memory'  # 'memory', 'npy' (memory-mappable shards) or 'hdf5'
+    cfgMC['output_flush_steps'] = 146  # timesteps of sats_info buffered per write of the output sink
 
     if 'time0' in cfgMC:
         filename_save = f'TLEIC_year{cfgMC["time0"].year}_rand{rngseed}.npz'
@@ -14,7 +14,7 @@ sys.path.append(str(Path(__file__).parent.parent.parent / 'supporting_functions'
 sys.path.append(str(Path(__file__).parent.parent / 'Quick_Start'))
 
 from setup_MCconfig import setup_MCconfig
-from main_mc import main_mc
+from ensemble_mc import run_ensemble
 
 def scenario_no_launch():
     """Main Scenario No Launch function"""
@@ -23,21 +23,22 @@ def scenario_no_launch():
     ICfile = str(Path(__file__).parent.parent.parent / 'supporting_data' / 'TLEhistoric' / '2020.mat')
     
     t = np.arange(1, 362, 5)
-    deorbit_list_m = np.zeros((3, 730))
-    
-    for idx in range(3):
-        seed = idx + 1
-        
-        print('MC configuration starting...')
-        cfgMC = setup_MCconfig(seed, ICfile)
-        print(f'Seed {seed}')
-        
-        print(f'Initial Population: {cfgMC["mat_sats"].shape[0]} sats')
-        print(f'Launches per year: {cfgMC["repeatLaunches"].shape[0] if cfgMC["repeatLaunches"].size > 0 else 0}')
-        print('Starting main_mc...')
-        
-        nS, nD, nN, nB, deorbitlist_r = main_mc(cfgMC, seed)
-        deorbit_list_m[idx, :] = deorbitlist_r
+    seeds = [1, 2, 3]
+    deorbit_list_m = np.zeros((len(seeds), 730))
+    
+    # Configuration (IC file, launches, density) is prepared once for all seeds
+    print('MC configuration starting...')
+    cfgMC = setup_MCconfig(seeds[0], ICfile)
+    
+    print(f'Initial Population: {cfgMC["mat_sats"].shape[0]} sats')
+    print(f'Launches per year: {cfgMC["repeatLaunches"].shape[0] if cfgMC["repeatLaunches"].size > 0 else 0}')
+    print(f'Starting main_mc for seeds {seeds}...')
+    
+    # Runs are spread over all cores; results arrive as each seed finishes
+    for seed, result in run_ensemble(cfgMC, seeds):
+        nS, nD, nN, nB, deorbitlist_r = result[:5]
+        print(f'Seed {seed} done: ({nS},{nD},{nN},{nB})')
+        deorbit_list_m[seeds.index(seed), :] = deorbitlist_r
     
     plt.figure(figsize=(10, 6))
     time_years = np.linspace(2020, 2030, 730)
@@ -1,23 +1,52 @@
 
-import pandas as pd
+import sys
 import numpy as np
+import pandas as pd
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).parent.parent / 'supporting_functions'))
+from jb2008_store import JB2008_ALT, load_jb2008_store
+
+CSV_FILE = Path(__file__).parent / "dens_jb2008_032020_022224.csv"
+
+def load_density_store():
+    """
+    Memory-mapped JB2008 density table (converted from the CSV on first use).
+    
+    Returns:
+        numpy.memmap: Records with fields year, month, jd and dens (36 levels)
+    """
+    if not CSV_FILE.exists() and not CSV_FILE.with_suffix('.npy').exists():
+        raise FileNotFoundError(f"Density data file not found: {CSV_FILE}")
+    
+    return load_jb2008_store(CSV_FILE)
+
 def load_density_data():
     """
-    Load the JB2008 density data from CSV file.
+    Load the JB2008 density data.
     
     Returns:
         pandas.DataFrame: DataFrame with columns:
-            - year: Year (2020-2024)
+            - year: Year (2020-2224)
             - month: Month (1-12)
             - alt_0 to alt_35: Density values for 36 altitude levels
     """
-    csv_file = Path(__file__).parent / "dens_jb2008_032020_022224.csv"
-    if not csv_file.exists():
-        raise FileNotFoundError(f"Density data file not found: {csv_file}")
-    
-    return pd.read_csv(csv_file)
+    table = load_density_store()
+    df = pd.DataFrame(np.asarray(table['dens']), columns=[f'alt_{i}' for i in range(len(JB2008_ALT))])
+    df.insert(0, 'month', np.asarray(table['month']))
+    df.insert(0, 'year', np.asarray(table['year']))
+    return df
+
+def _time_index(table, year, month):
+    """Row of a (year, month) in the store"""
+    row = np.flatnonzero((table['year'] == year) & (table['month'] == month))
+    if len(row) == 0:
+        raise ValueError(f"No data found for year {year}, month {month}")
+    return row[0]
+
+def _check_level(altitude_level):
+    if not 0 <= altitude_level < len(JB2008_ALT):
+        raise ValueError(f"Altitude level {altitude_level} not found. Available: 0-35")
 
 def get_density_at_altitude_time(year, month, altitude_level):
     """
@@ -31,16 +60,10 @@ def get_density_at_altitude_time(year, month, altitude_level):
     Returns:
         float: Density value in kg/m³
     """
-    df = load_density_data()
-    mask = (df['year'] == year) & (df['month'] == month)
-    if not mask.any():
-        raise ValueError(f"No data found for year {year}, month {month}")
-    
-    col_name = f'alt_{altitude_level}'
-    if col_name not in df.columns:
-        raise ValueError(f"Altitude level {altitude_level} not found. Available: 0-35")
+    table = load_density_store()
+    _check_level(altitude_level)
     
-    return df.loc[mask, col_name].iloc[0]
+    return table['dens'][_time_index(table, year, month), altitude_level]
 
 def get_density_profile(year, month):
     """
@@ -53,17 +76,9 @@ def get_density_profile(year, month):
     Returns:
         numpy.ndarray: Array of 36 density values for all altitude levels
     """
-    df = load_density_data()
-    mask = (df['year'] == year) & (df['month'] == month)
-    if not mask.any():
-        raise ValueError(f"No data found for year {year}, month {month}")
-    
-    row = df[mask].iloc[0]
-    density_values = []
-    for i in range(36):
-        density_values.append(row[f'alt_{i}'])
+    table = load_density_store()
     
-    return np.array(density_values)
+    return np.array(table['dens'][_time_index(table, year, month)])
 
 def get_time_series(altitude_level):
     """
@@ -75,12 +90,10 @@ def get_time_series(altitude_level):
     Returns:
         pandas.Series: Time series of density values
     """
-    df = load_density_data()
-    col_name = f'alt_{altitude_level}'
-    if col_name not in df.columns:
-        raise ValueError(f"Altitude level {altitude_level} not found. Available: 0-35")
+    table = load_density_store()
+    _check_level(altitude_level)
     
-    return df[col_name]
+    return pd.Series(table['dens'][:, altitude_level], name=f'alt_{altitude_level}')
 
 def get_available_times():
     """
@@ -89,8 +102,8 @@ def get_available_times():
     Returns:
         list: List of tuples (year, month)
     """
-    df = load_density_data()
-    return list(zip(df['year'], df['month']))
+    table = load_density_store()
+    return list(zip(table['year'].tolist(), table['month'].tolist()))
 
 def get_altitude_levels():
     """
@@ -99,7 +112,7 @@ def get_altitude_levels():
     Returns:
         int: Number of altitude levels (36)
     """
-    return 36
+    return len(JB2008_ALT)
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,146 @@
+"""
+Perigee/apogee altitude-band prefilter for the cube method
+Groups the objects into sets of overlapping radial ranges, so cube_vec_v3
+only pairs objects of the same group and skips objects overlapping no other
+"""
+
+import numpy as np
+
+class AltitudeBands:
+    """
+    Incrementally tracked [perigee, apogee] band occupancy of a population
+
+    Every tracked slot occupies the shells floor((r_p - margin) / width) to
+    floor((r_a + margin) / width), where r_p and r_a are its perigee and
+    apogee radii. Two objects can only share a cube if their bands overlap
+    (positions in one cube differ in radius by at most the cube diagonal),
+    so cube pairs only form within a band group, a connected set of
+    overlapping bands, and an object alone in its group is dropped from the
+    hash. Groups follow from cumulative histograms of the band ends: a group
+    ends after every shell that no band continues past. Only the slots
+    marked with ``touch`` (decay, control, launch) and removed slots update
+    their bands and the histograms.
+
+    Parameters:
+    -----------
+    width : float
+        Shell width [km]
+    margin : float
+        Radius added on both sides of every band [km]; must cover half the
+        cube diagonal plus any difference between osculating and mean radius
+    r_max : float
+        Largest radius that can take part in collisions [km]; objects with
+        perigee above it are not tracked
+    """
+
+    def __init__(self, width, margin, r_max):
+        self.width = float(width)
+        self.margin = float(margin)
+        self.r_max = float(r_max)
+        self.n_shells = int(np.ceil(self.r_max / self.width)) + 2
+        self._lo = np.zeros(0, dtype=np.int64)
+        self._hi = np.zeros(0, dtype=np.int64)
+        self._tracked = np.zeros(0, dtype=bool)
+        self._dirty = np.zeros(0, dtype=bool)
+        self._count_lo = np.zeros(self.n_shells, dtype=np.int64)
+        self._count_hi = np.zeros(self.n_shells, dtype=np.int64)
+
+    def touch(self, rows):
+        """
+        Mark slots whose semi-major axis or eccentricity changed
+
+        Slots that are new since the last update or remap are marked already.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        if len(rows) > 0:
+            self._reserve(int(rows.max()) + 1)
+            self._dirty[rows] = True
+
+    def update(self, oe, live, req):
+        """
+        Refresh the marked and removed slots and return the band groups
+
+        Parameters:
+        -----------
+        oe : array-like
+            Mean orbital elements [a,ecco,...] of the used slots, shape
+            (n_slots, 6), a in Earth radii
+        live : array-like of bool
+            Live flags of the used slots
+        req : float
+            Earth radius [km]
+
+        Returns:
+        --------
+        groups : ndarray
+            Band group of every slot (int64), -1 for slots that cannot share
+            a cube (not live, perigee too high or alone in their group)
+        """
+        oe = np.asarray(oe)
+        live = np.asarray(live, dtype=bool)
+        n_slots = len(live)
+        self._reserve(n_slots)
+
+        tracked = self._tracked[:n_slots]
+        rows = np.flatnonzero(self._dirty[:n_slots] | (tracked & ~live))
+        self._dirty[rows] = False
+
+        a = oe[rows, 0] * req
+        e = oe[rows, 1]
+        r_p = a * (1 - e) - self.margin
+        r_a = a * (1 + e) + self.margin
+        want = live[rows] & (r_p <= self.r_max)
+        lo = np.clip(np.floor(np.where(want, r_p, 0) / self.width), 0, self.n_shells - 1).astype(np.int64)
+        hi = np.clip(np.floor(np.where(want, r_a, 0) / self.width), 0, self.n_shells - 1).astype(np.int64)
+
+        changed = (tracked[rows] != want) | (want & ((self._lo[rows] != lo) | (self._hi[rows] != hi)))
+        self._untrack(rows[changed & tracked[rows]])
+        rows_in = rows[changed & want]
+        lo_in = lo[changed & want]
+        hi_in = hi[changed & want]
+        self._lo[rows_in] = lo_in
+        self._hi[rows_in] = hi_in
+        self._tracked[rows_in] = True
+        self._count_lo += np.bincount(lo_in, minlength=self.n_shells)
+        self._count_hi += np.bincount(hi_in, minlength=self.n_shells)
+
+        # Bands continuing past shell s: starting at or below s minus ending
+        # at or below s; a new group starts after every shell none continues past
+        spanning = np.cumsum(self._count_lo) - np.cumsum(self._count_hi)
+        shell_group = np.concatenate(([0], np.cumsum(spanning[:-1] == 0)))
+        group_size = np.bincount(shell_group, weights=self._count_lo)
+
+        group = shell_group[self._lo[:n_slots]]
+        return np.where(tracked & (group_size[group] >= 2), group, -1)
+
+    def remap(self, remap):
+        """
+        Follow a PopulationStore.compact: slots move to remap[slot], -1 drops them
+        """
+        if remap is None:
+            return
+        remap = np.asarray(remap, dtype=np.intp)
+        self._reserve(len(remap))  # slots appended since the last update
+        old = np.arange(len(remap))
+        self._untrack(old[(remap < 0) & self._tracked[:len(remap)]])
+        keep = old[remap >= 0]
+        for name in ['_lo', '_hi', '_tracked', '_dirty']:
+            arr = getattr(self, name)
+            moved = np.ones_like(arr) if name == '_dirty' else np.zeros_like(arr)
+            moved[remap[keep]] = arr[keep]
+            setattr(self, name, moved)
+
+    def _untrack(self, rows):
+        self._count_lo -= np.bincount(self._lo[rows], minlength=self.n_shells)
+        self._count_hi -= np.bincount(self._hi[rows], minlength=self.n_shells)
+        self._tracked[rows] = False
+
+    def _reserve(self, n_slots):
+        if n_slots <= len(self._tracked):
+            return
+        capacity = max(n_slots, int(1.5 * len(self._tracked)))
+        for name in ['_lo', '_hi', '_tracked', '_dirty']:
+            arr = getattr(self, name)
+            grown = np.ones(capacity, dtype=arr.dtype) if name == '_dirty' else np.zeros(capacity, dtype=arr.dtype)
+            grown[:len(arr)] = arr
+            setattr(self, name, grown)
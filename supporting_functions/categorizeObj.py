@@ -49,4 +49,36 @@ def categorizeObj(objint_st, cont_st):
     nN = np.sum((objint_st == 3) | (objint_st == 4) | (objint_st >= 6))
     nB = np.sum(objint_st == 5)
     
-    return int(nS), int(nD), int(nN), int(nB) 
\ No newline at end of file
+    return int(nS), int(nD), int(nN), int(nB)
+
+# Species of species_index, in index order ('other' collects object classes
+# counted in none of the categories above)
+SPECIES_LABELS = ('S', 'D', 'N', 'B', 'other')
+
+def species_index(objint_st, cont_st):
+    """
+    Species of every object, using the same rules as categorizeObj
+    
+    Parameters:
+    -----------
+    objint_st : array-like
+        List of object indices
+    cont_st : array-like
+        List of control indices
+        
+    Returns:
+    --------
+    species : ndarray
+        Index into SPECIES_LABELS for every object
+    """
+    
+    objint_st = np.asarray(objint_st)
+    cont_st = np.asarray(cont_st)
+    
+    species = np.full(objint_st.shape, 4, dtype=np.int8)
+    species[(objint_st == 1) & (cont_st == 1)] = 0
+    species[(objint_st == 1) & (cont_st == 0)] = 1
+    species[(objint_st == 3) | (objint_st == 4) | (objint_st >= 6)] = 2
+    species[objint_st == 5] = 3
+    
+    return species
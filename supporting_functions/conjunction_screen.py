@@ -0,0 +1,132 @@
+"""
+Conjunction screening with k-d trees
+Deterministic close-approach search over propagated positions, as a
+complement to the statistical cube method
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+from prop_mit_vec import prop_mean_anomaly_cols
+
+def conjunction_screen(r, v, threshold, primary=None, rows=None):
+    """
+    Pairs of objects closer than threshold at one epoch
+
+    Parameters:
+    -----------
+    r : array-like
+        Position vectors [km], shape (n_objects, 3)
+    v : array-like
+        Velocity vectors [km/s], shape (n_objects, 3)
+    threshold : float
+        Screening distance [km]
+    primary : array-like, optional
+        Rows screened against all other rows (e.g. controlled satellites);
+        all pairs among ``rows`` are screened if not given
+    rows : array-like, optional
+        Rows taking part in the screening (all rows if not given)
+
+    Returns:
+    --------
+    pairs : ndarray
+        Row indices, shape (n_pairs, 2), first < second, sorted
+    miss : ndarray
+        Distance of each pair [km]
+    vrel : ndarray
+        Relative speed of each pair [km/s]
+    """
+
+    r = np.asarray(r, dtype=float)
+    v = np.asarray(v, dtype=float)
+    rows = np.arange(len(r)) if rows is None else np.asarray(rows, dtype=np.intp)
+
+    tree = cKDTree(r[rows])
+    if primary is None:
+        pairs = rows[tree.query_pairs(threshold, output_type='ndarray')].reshape(-1, 2)
+    else:
+        primary = np.asarray(primary, dtype=np.intp)
+        hits = cKDTree(r[primary]).sparse_distance_matrix(tree, threshold, output_type='ndarray')
+        pairs = np.column_stack((primary[hits['i']], rows[hits['j']]))
+        pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+        pairs.sort(axis=1)
+        pairs = np.unique(pairs, axis=0)  # primary-primary pairs are found twice
+    if len(pairs) > 0:
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+    miss = np.sqrt(np.sum((r[pairs[:, 0]] - r[pairs[:, 1]])**2, axis=1))
+    vrel = np.sqrt(np.sum((v[pairs[:, 0]] - v[pairs[:, 1]])**2, axis=1))
+
+    return pairs, miss, vrel
+
+def conjunction_screen_window(oe, t, threshold, param, primary=None, rows=None):
+    """
+    Closest approach of every pair coming within threshold at the epochs of a time grid
+
+    Positions at each epoch are obtained by advancing only the mean anomaly
+    of the mean elements (see prop_mean_anomaly_cols), so the epochs should
+    span at most one propagation step. Pairs are found at the epochs of t;
+    the time and distance of closest approach of each pair are then refined
+    with linear relative motion around its closest epoch, within half the
+    spacing of t. With a spacing of at most threshold / v_rel every approach
+    closer than 0.85 threshold is found; on coarser grids the pairs are only
+    those that happen to be close at one of the epochs.
+
+    Parameters:
+    -----------
+    oe : array-like
+        Mean orbital elements [a,ecco,inclo,nodeo,argpo,mo], shape (n_objects, 6), a in Earth radii
+    t : array-like
+        Epoch offsets [seconds] relative to the elements
+    threshold : float
+        Screening distance [km]
+    param : dict
+        Propagation parameters (mu, req, j2)
+    primary : array-like, optional
+        Rows screened against all other rows (all pairs if not given)
+    rows : array-like, optional
+        Rows taking part in the screening (all rows if not given)
+
+    Returns:
+    --------
+    pairs : ndarray
+        Row indices, shape (n_pairs, 2), first < second, sorted
+    miss : ndarray
+        Refined miss distance of each pair [km]
+    vrel : ndarray
+        Relative speed of each pair [km/s]
+    t_ca : ndarray
+        Refined epoch offset of the closest approach [seconds]
+    """
+
+    oe = np.asarray(oe)
+    rows = np.arange(len(oe)) if rows is None else np.asarray(rows, dtype=np.intp)
+    t = np.unique(np.asarray(t, dtype=float))
+
+    # Each epoch stands for the times up to half way to its neighbours
+    half_gap = np.diff(t) / 2
+    reach_before = np.concatenate(([0.0], half_gap))
+    reach_after = np.concatenate((half_gap, [0.0]))
+
+    found = []
+    for k, t_k in enumerate(t):
+        r, v = prop_mean_anomaly_cols(oe, t_k, param, rows=rows)
+        pairs, miss, _ = conjunction_screen(r, v, threshold, primary=primary, rows=rows)
+        dr = r[pairs[:, 0]] - r[pairs[:, 1]]
+        dv = v[pairs[:, 0]] - v[pairs[:, 1]]
+        found.append((pairs, miss, dr, dv, np.full(len(miss), k)))
+    pairs, miss, dr, dv, k_min = (np.concatenate(x) for x in zip(*found))
+
+    # Keep the closest epoch of every pair
+    order = np.lexsort((miss, pairs[:, 1], pairs[:, 0]))
+    first = np.ones(len(pairs), dtype=bool)
+    first[1:] = np.any(pairs[order][1:] != pairs[order][:-1], axis=1)
+    keep = order[first]
+    pairs, dr, dv, k_min = pairs[keep], dr[keep], dv[keep], k_min[keep]
+
+    # Linear relative motion minimum around that epoch
+    vrel2 = np.sum(dv**2, axis=1)
+    tau = -np.sum(dr * dv, axis=1) / np.where(vrel2 > 0, vrel2, 1.0)
+    tau = np.clip(tau, -reach_before[k_min], reach_after[k_min])
+    miss = np.sqrt(np.sum((dr + dv * tau[:, None])**2, axis=1))
+
+    return pairs, miss, np.sqrt(vrel2), t[k_min] + tau
@@ -4,10 +4,9 @@ Python version of cube_vec_v3.m
 """
 
 import numpy as np
-import pandas as pd
-from itertools import combinations
 
-def cube_vec_v3(X, CUBE_RES, collision_alt_limit):
+def cube_vec_v3(X, CUBE_RES, collision_alt_limit, valid=None, max_pairs=None, rng=None, n_grids=1, groups=None,
+                return_runs=False):
     """
     Cube method for collision detection - only consider RSO below collision_alt_limit
     
@@ -19,51 +18,285 @@ def cube_vec_v3(X, CUBE_RES, collision_alt_limit):
         Cube resolution [km]
     collision_alt_limit : float
         Altitude limit for collision consideration [km]
+    valid : array-like of bool, optional
+        Rows that may take part in collisions (e.g. the live flags of a
+        PopulationStore); all rows if not given
+    max_pairs : int, optional
+        Cubes holding more candidate pairs than this are sampled instead of
+        enumerated (see cube_pairs); all pairs are returned if not given
+    rng : numpy.random.RandomState, optional
+        Random number generator for pair sampling and grid offsets (defaults
+        to np.random)
+    n_grids : int
+        Number of grids; with more than one, every grid is shifted by a
+        random sub-cube offset and pairs are weighted by the fraction of
+        grids in which they share a cube
+    groups : array-like of int, optional
+        Group label of every row (e.g. AltitudeBands.update); rows of
+        different groups never share a cell, rows labelled -1 are dropped
+    return_runs : bool
+        Also return the cube of every sampled pair (see cube_pairs)
         
     Returns:
     --------
-    res : list
-        List of collision pairs, each element contains indices of objects in same cube
+    res : ndarray
+        Collision pairs, shape (n_pairs, 2) of row indices of objects sharing a
+        cube; pairs are ordered by cube index, then by row index (i < j); with
+        several grids, by first appearance (grid 0 first)
+    weight : ndarray
+        Only if max_pairs is given, n_grids > 1 or return_runs: number of pairs each
+        returned pair stands for, averaged over the grids, shape (n_pairs,)
+    runs, members : ndarray
+        Only if return_runs: cube of every pair as (start, length) in
+        members (see cube_pairs); with several grids, a cube in which the
+        pair was sampled
     """
     
-    # Convert to numpy array if needed
+    # Convert to numpy array if needed (X itself is never modified)
     X = np.asarray(X)
     
-    # Only consider RSO below collision_alt_limit for collision
-    idx_invalid = np.any(np.abs(X) > collision_alt_limit, axis=1)
-    X[idx_invalid, :] = np.nan
+    # Only consider RSO below collision_alt_limit for collision; other rows
+    # are dropped before discretization
+    idx_valid = np.all(np.abs(X[:, :3]) <= collision_alt_limit, axis=1)
+    if valid is not None:
+        idx_valid &= np.asarray(valid, dtype=bool)
+    if groups is not None:
+        groups = np.asarray(groups, dtype=np.int64)
+        idx_valid &= groups >= 0
+    rows = np.flatnonzero(idx_valid)
     
-    # Discretize positions
-    X_dis = np.floor(X[:, :3] / CUBE_RES)
+    if len(rows) < 2:
+        pairs = np.zeros((0, 2), dtype=np.intp)
+        if return_runs:
+            return pairs, np.zeros(0), np.zeros((0, 2), dtype=np.intp), np.zeros(0, dtype=np.intp)
+        return pairs if (max_pairs is None and n_grids == 1) else (pairs, np.zeros(0))
     
-    # Shift origin such that X_dis is always positive
-    shift_lim = np.max(np.abs(X_dis)) + 10
-    X_dis = X_dis + shift_lim
-    shift_lim2 = 2 * shift_lim
+    if n_grids == 1:
+        # Discretize positions
+        X_dis = np.floor(X[rows, :3] / CUBE_RES).astype(np.int64)
+        
+        # Create unique index for each cube (the group is the least
+        # significant digit, so cubes keep their order)
+        if groups is not None:
+            X_dis = np.column_stack((X_dis, groups[rows]))
+        X_idx = cube_keys(X_dis)
+        
+        return cube_pairs(X_idx, rows, max_pairs, rng, return_runs)
+    
+    # Discretize positions on all shifted grids at once; the grid number is
+    # the leading key digit, so cubes of different grids never match
+    if rng is None:
+        rng = np.random
+    offsets = rng.random((n_grids, 1, 3)) * CUBE_RES
+    X_dis = np.floor((X[rows, :3] + offsets) / CUBE_RES).astype(np.int64).reshape(-1, 3)
+    grid = np.repeat(np.arange(n_grids, dtype=np.int64), len(rows))
+    if groups is not None:
+        X_dis = np.column_stack((X_dis, np.tile(groups[rows], n_grids)))
+    X_idx = cube_keys(np.column_stack((grid, X_dis)))
+    
+    res = cube_pairs(X_idx, np.tile(rows, n_grids), max_pairs, rng, return_runs)
+    if return_runs:
+        pairs, weight, runs, members = res
+        return merge_pairs(pairs, weight / n_grids, len(X), runs) + (members,)
+    pairs, weight = res if max_pairs is not None else (res, np.ones(len(res)))
+    return merge_pairs(pairs, weight / n_grids, len(X))
+
+def cube_keys(X_dis):
+    """
+    Integer key of each cube, ordered like the cube coordinates (x, then y, then z)
+    
+    Parameters:
+    -----------
+    X_dis : ndarray
+        Integer cube coordinates, shape (n, 3) (or (n, d), most significant
+        column first)
+        
+    Returns:
+    --------
+    keys : ndarray
+        int64 keys, equal exactly for rows in the same cube
+    """
     
-    # Create unique index for each cube
-    X_idx = X_dis[:, 0] * (shift_lim2 * shift_lim2) + X_dis[:, 1] * shift_lim2 + X_dis[:, 2]
+    # Shift origin such that X_dis is always non-negative
+    X_dis = X_dis - X_dis.min(axis=0)
+    span = X_dis.max(axis=0) + 1
     
-    # Find unique indices and duplicates
-    unique_idx, unique_indices = np.unique(X_idx, return_index=True)
-    duplicate_mask = np.isin(X_idx, X_idx[np.setdiff1d(np.arange(len(X_idx)), unique_indices)])
-    duplicates = X_idx[duplicate_mask]
-    duplicate_idx = np.where(duplicate_mask)[0]
+    # Mixed-radix key; the spans are tight, so this only overflows for
+    # populations spread over more than ~2**63 cubes
+    if np.prod(span.astype(float)) < 2.0 ** 62:
+        keys = X_dis[:, 0].copy()
+        for k in range(1, X_dis.shape[1]):
+            keys *= span[k]
+            keys += X_dis[:, k]
+        return keys
+    _, keys = np.unique(X_dis, axis=0, return_inverse=True)
+    return keys.astype(np.int64).ravel()
+
+def cube_pairs(keys, rows=None, max_pairs=None, rng=None, return_runs=False):
+    """
+    All pairs of rows sharing a cell key, by sorting instead of grouping
+    
+    Rows are stably sorted by key; every run of equal keys of length L
+    contributes its L*(L-1)/2 pairs, generated without Python loops.
+    
+    With max_pairs, runs holding more than max_pairs pairs contribute
+    max_pairs pairs drawn uniformly (with replacement) instead, each with
+    weight L*(L-1)/2 / max_pairs. Summing weight * f(pair) over the result is
+    then an unbiased estimate of the sum over all pairs, so collision
+    probabilities (capped at 1 per pair) scaled by the weight keep the
+    expected collision rate; the scaled value is an expected number of
+    events and may exceed 1. With return_runs the cube of every sampled pair
+    is returned as well, as the slice of its run in the sorted rows, so the
+    further events a weighted pair stands for can be placed in that cube.
     
-    # Group duplicates
-    if len(duplicates) > 0:
-        # Use pandas for grouping (similar to splitapply in MATLAB)
-        df = pd.DataFrame({'idx': duplicate_idx, 'val': duplicates})
-        groups = df.groupby('val')['idx'].apply(list).tolist()
+    Parameters:
+    -----------
+    keys : array-like
+        Cell key of each row, shape (n,)
+    rows : array-like, optional
+        Row index reported for each key (0..n-1 if not given)
+    max_pairs : int, optional
+        Pair budget per run above which pairs are sampled
+    rng : numpy.random.RandomState, optional
+        Random number generator for pair sampling (defaults to np.random)
+    return_runs : bool
+        Also return weight, runs and members (all pairs enumerated and of
+        weight 1 without max_pairs)
         
-        # Generate collision pairs for each group
-        res = []
-        for group in groups:
-            if len(group) > 1:
-                # Generate all pairs of objects in the same cube
-                pairs = list(combinations(group, 2))
-                res.extend(pairs)
-    else:
-        res = []
-    
-    return res 
\ No newline at end of file
+    Returns:
+    --------
+    pairs : ndarray
+        Shape (n_pairs, 2) of intp; pairs are ordered by key, then by row
+        position (first < second within each run; sampled runs in draw order)
+    weight : ndarray
+        Only if max_pairs is given or return_runs: weight of each pair, shape (n_pairs,)
+    runs : ndarray
+        Only if return_runs: (start, length) of the run of every sampled
+        pair in members, (0, 0) for enumerated pairs, shape (n_pairs, 2)
+    members : ndarray
+        Only if return_runs: rows sorted by key
+    """
+    
+    keys = np.asarray(keys)
+    rows = np.arange(len(keys)) if rows is None else np.asarray(rows, dtype=np.intp)
+    n = len(keys)
+    
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    sorted_rows = rows[order]
+    
+    # Run boundaries of equal keys
+    new_run = np.ones(n, dtype=bool)
+    np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=new_run[1:])
+    starts = np.flatnonzero(new_run)
+    lengths = np.diff(np.append(starts, n))
+    n_run_pairs = lengths * (lengths - 1) // 2
+    
+    dense = np.zeros(len(starts), dtype=bool)
+    if max_pairs is not None:
+        max_pairs = max(int(max_pairs), 1)
+        dense = n_run_pairs > max_pairs
+    
+    # Enumerated runs: position p pairs with every later position of its run
+    n_partners = np.repeat(np.where(dense, 0, starts + lengths), lengths) - np.arange(n) - 1
+    n_partners = np.maximum(n_partners, 0)
+    n_pairs = int(n_partners.sum())
+    first = np.repeat(np.arange(n), n_partners)
+    offsets = np.cumsum(n_partners) - n_partners
+    second = first + 1 + (np.arange(n_pairs) - np.repeat(offsets, n_partners))
+    pairs = np.column_stack((sorted_rows[first], sorted_rows[second]))
+    
+    if max_pairs is None and not return_runs:
+        return pairs
+    weight = np.ones(n_pairs)
+    if not dense.any():
+        if return_runs:
+            return pairs, weight, np.zeros((n_pairs, 2), dtype=np.intp), sorted_rows
+        return pairs, weight
+    
+    # Sampled runs: max_pairs uniform unordered pairs of distinct positions each
+    if rng is None:
+        rng = np.random
+    run_start = np.repeat(starts[dense], max_pairs)
+    run_len = np.repeat(lengths[dense], max_pairs)
+    u = rng.random((2, len(run_start)))
+    i = np.floor(u[0] * run_len).astype(np.intp)
+    j = np.floor(u[1] * (run_len - 1)).astype(np.intp)
+    j += j >= i
+    sampled = np.column_stack((sorted_rows[run_start + np.minimum(i, j)],
+                               sorted_rows[run_start + np.maximum(i, j)]))
+    sampled_weight = np.repeat(n_run_pairs[dense] / max_pairs, max_pairs)
+    
+    # Merge back into key order
+    run_id = np.concatenate((np.repeat(np.arange(len(starts)), lengths)[first],
+                             np.repeat(np.flatnonzero(dense), max_pairs)))
+    merge = np.argsort(run_id, kind='stable')
+    pairs = np.concatenate((pairs, sampled))[merge]
+    weight = np.concatenate((weight, sampled_weight))[merge]
+    if return_runs:
+        runs = np.concatenate((np.zeros((n_pairs, 2), dtype=np.intp),
+                               np.column_stack((run_start, run_len))))[merge]
+        return pairs, weight, runs, sorted_rows
+    return pairs, weight
+
+def merge_pairs(pairs, weight, n_rows, runs=None):
+    """
+    Merge repeated pairs, summing their weights
+    
+    Parameters:
+    -----------
+    pairs : ndarray
+        Pairs of row indices, shape (n_pairs, 2)
+    weight : array-like
+        Weight (or probability) of each pair, shape (n_pairs,)
+    n_rows : int
+        Upper bound of the row indices
+    runs : ndarray, optional
+        Cube of each pair as returned by cube_pairs, shape (n_pairs, 2)
+        
+    Returns:
+    --------
+    pairs : ndarray
+        Unique pairs in order of first appearance
+    weight : ndarray
+        Summed weight of each unique pair
+    runs : ndarray
+        Only if runs is given: cube of the first sampled appearance of each
+        unique pair ((0, 0) if it was never sampled)
+    """
+    
+    if len(pairs) == 0:
+        return (pairs, np.zeros(0)) if runs is None else (pairs, np.zeros(0), np.zeros((0, 2), dtype=np.intp))
+    pair_key = pairs[:, 0].astype(np.int64) * n_rows + pairs[:, 1]
+    _, first, inverse = np.unique(pair_key, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    weight = np.bincount(inverse, weights=weight, minlength=len(first))
+    order = np.argsort(first)
+    if runs is None:
+        return pairs[first[order]], weight[order]
+    
+    # A pair sampled in any grid or epoch keeps a cube it was sampled in
+    merged_runs = np.zeros((len(first), 2), dtype=np.intp)
+    sampled = np.flatnonzero(runs[:, 1] > 0)[::-1]
+    merged_runs[inverse[sampled]] = runs[sampled]
+    return pairs[first[order]], weight[order], merged_runs[order]
+
+def effective_sample_size(weight):
+    """
+    Kish effective sample size of weighted candidate pairs
+    
+    Parameters:
+    -----------
+    weight : array-like
+        Pair weights as returned by cube_pairs
+        
+    Returns:
+    --------
+    ess : float
+        (sum w)^2 / sum w^2; equals the number of pairs when none is sampled
+    """
+    
+    weight = np.asarray(weight, dtype=float)
+    if weight.size == 0:
+        return 0.0
+    return float(weight.sum() ** 2 / np.sum(weight ** 2))
@@ -0,0 +1,224 @@
+"""
+Decay-time prediction and bucketed decay schedule
+Files every object under the earliest timestep at which the analytic drag
+model can bring its perigee below the decay altitude, so only the objects
+due at a step are checked for decay
+"""
+
+import numpy as np
+from new_analytic_propagator.densityexp_vec import H0, densityexp_vec
+
+# Factor of the effective B* in analytic_propagation_vec (C_0 = Bstar / (1e6 * 0.157) * rho_0)
+BSTAR_SCALE = 1e6 * 0.157
+
+def density_envelope(param, h_decay=150.0):
+    """
+    Upper bound of the drag density of analytic_propagation_vec over all epochs
+
+    Parameters:
+    -----------
+    param : dict
+        Propagation parameters (density_profile and, for JB2008, the table
+        alt, dens_value)
+    h_decay : float
+        Decay altitude [km]; the bound starts there
+
+    Returns:
+    --------
+    h : ndarray
+        Altitude nodes [km], starting at h_decay
+    rho : ndarray
+        Non-increasing density bound in the units of rho_0 of
+        analytic_propagation_vec; rho[k] holds on [h[k], h[k+1]), rho[-1]
+        above h[-1]
+    """
+    density_profile = param['density_profile'].lower()
+    if density_profile == 'jb2008' and np.size(param.get('dens_value', [])) == 0:
+        density_profile = 'static'
+
+    if density_profile == 'jb2008':
+        # The profile of any epoch interpolates two months of the table
+        alt = np.asarray(param['alt'], dtype=float)
+        alt = alt[:, 0] if alt.ndim == 2 else alt
+        h = np.union1d(alt, [h_decay])
+        rho_h = np.interp(h, alt, np.max(param['dens_value'], axis=1)) * 1e9
+    elif density_profile == 'static':
+        # Nodes on every band edge: the model decreases within a band
+        h = np.union1d(np.union1d(H0, np.arange(0, 2001, 10.0)), [h_decay])
+        rho_h = densityexp_vec(h) * 1e9
+    else:
+        h = np.array([h_decay])
+        rho_h = np.array([1e-20])
+
+    keep = h >= h_decay
+    h = h[keep]
+    rho_h = rho_h[keep]
+
+    # Largest node value of every interval, then the largest value at or above
+    # every altitude (the density is evaluated at a mean altitude above perigee)
+    rho = np.append(np.maximum(rho_h[:-1], rho_h[1:]), rho_h[-1])
+    rho = np.maximum.accumulate(rho[::-1])[::-1]
+    return h, rho
+
+class DecaySchedule:
+    """
+    Bucketed schedule of the earliest possible decay step of every slot
+
+    Under the drag model of analytic_propagation_vec the perigee radius of an
+    uncontrolled object drops by at most
+    2 (1 + beta^2) sqrt(mu a) (Bstar / BSTAR_SCALE + 1e-20 / rho_min) rho(h_p)
+    per unit time (beta = sqrt(3)/2 e, rho bounded by density_envelope), and
+    a, e and hence this rate bound only decrease. Integrating it from the
+    perigee down to the decay altitude gives a lower bound of the lifetime;
+    the slot is filed under the first step at or after it and is checked
+    only then, and re-filed if it is still in orbit. Slots whose bound lies
+    beyond the last step are never checked. Controlled objects do not decay
+    while controlled: they are filed when the control flag or elements change
+    (see ``add``).
+
+    Parameters:
+    -----------
+    tsince : array-like
+        Time of every timestep [min]
+    param : dict
+        Propagation parameters (req, mu, density_profile and the density table)
+    h_decay : float
+        Decay altitude [km] (perigee test of prop_mit_vec)
+    """
+
+    NEVER = -1
+
+    def __init__(self, tsince, param, h_decay=150.0):
+        self.tsince = np.asarray(tsince, dtype=float)
+        self.req = param['req']
+        self.mu = param['mu']
+        self.h_decay = float(h_decay)
+
+        # Integral of dh / rho from the decay altitude, linear between nodes
+        h, rho = density_envelope(param, h_decay)
+        self._h = np.append(h, h[-1] + 1e7)
+        self._F = np.concatenate(([0], np.cumsum(np.diff(self._h) / rho)))
+        self._rho_min = rho[-1]
+
+        self._due = np.zeros(0, dtype=np.int64)
+        self._buckets = {}
+
+    def lifetime(self, oe, bstar):
+        """
+        Lower bound of the time until decay
+
+        Parameters:
+        -----------
+        oe : array-like
+            Mean orbital elements [a,ecco,...], shape (n, 6), a in Earth radii
+        bstar : array-like
+            B* drag term, shape (n,)
+
+        Returns:
+        --------
+        t : ndarray
+            Time [s], 0 for objects at or below the decay altitude (or with
+            invalid elements), shape (n,)
+        """
+        oe = np.asarray(oe)
+        a = oe[:, 0] * self.req
+        e = oe[:, 1]
+        h_p = a * (1 - e) - self.req
+
+        Bstar = np.abs(np.asarray(bstar, dtype=float))
+        Bstar[Bstar < 1e-12] = 9.7071e-05
+        beta_sq = 0.75 * e**2
+        with np.errstate(invalid='ignore'):
+            rate = 2 * (1 + beta_sq) * np.sqrt(self.mu * a) * (Bstar / BSTAR_SCALE + 1e-20 / self._rho_min)
+            t = np.interp(h_p, self._h, self._F) / rate
+        decayed = ~(h_p > self.h_decay) | ~(e < 1) | ~np.isfinite(t)
+        return np.where(decayed, 0.0, t)
+
+    def add(self, rows, oe, bstar, controlled, n):
+        """
+        (Re-)file slots with their elements at step n
+
+        Parameters:
+        -----------
+        rows : array-like
+            Slot indices
+        oe, bstar, controlled : array-like
+            Columns of the used slots (e.g. views of a PopulationStore)
+        n : int
+            Current step; the elements are those after step n
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        self._reserve(len(oe))
+        if len(rows) == 0:
+            return
+        t = self.lifetime(oe[rows], bstar[rows])
+
+        # Controlled objects keep their orbit until they are released
+        held = (np.asarray(controlled)[rows] == 1) & (t > 0)
+        t_due = self.tsince[n] + t / 60
+        due = np.maximum(np.searchsorted(self.tsince, t_due, side='left'), n + 1)
+        due[held | (due >= len(self.tsince))] = self.NEVER
+
+        self._due[rows] = due
+        filed = due != self.NEVER
+        for step, members in self._group(rows[filed], due[filed]):
+            self._buckets.setdefault(step, []).append(members)
+
+    def pop_due(self, n, live):
+        """
+        Slots filed under step n that are still live (they leave the schedule)
+
+        Parameters:
+        -----------
+        n : int
+            Current step
+        live : array-like of bool
+            Live flags of the used slots
+
+        Returns:
+        --------
+        rows : ndarray
+            Slot indices, sorted
+        """
+        members = self._buckets.pop(n, [])
+        if len(members) == 0:
+            return np.zeros(0, dtype=np.intp)
+        rows = np.unique(np.concatenate(members))
+        rows = rows[(self._due[rows] == n) & np.asarray(live)[rows]]
+        self._due[rows] = self.NEVER
+        return rows
+
+    def remap(self, remap):
+        """
+        Follow a PopulationStore.compact: slots move to remap[slot], -1 drops them
+        """
+        if remap is None:
+            return
+        remap = np.asarray(remap, dtype=np.intp)
+        keep = np.flatnonzero(remap >= 0)
+        moved = np.full_like(self._due, self.NEVER)
+        moved[remap[keep]] = self._due[keep]
+        self._due = moved
+
+        filed = np.flatnonzero(self._due != self.NEVER)
+        self._buckets = {}
+        for step, members in self._group(filed, self._due[filed]):
+            self._buckets[step] = [members]
+
+    @staticmethod
+    def _group(rows, steps):
+        order = np.argsort(steps, kind='stable')
+        rows = rows[order]
+        steps = steps[order]
+        starts = np.flatnonzero(np.diff(steps, prepend=-2))
+        for k, start in enumerate(starts):
+            end = starts[k + 1] if k + 1 < len(starts) else len(rows)
+            yield int(steps[start]), rows[start:end]
+
+    def _reserve(self, n_slots):
+        if n_slots <= len(self._due):
+            return
+        capacity = max(n_slots, int(1.5 * len(self._due)))
+        grown = np.full(capacity, self.NEVER, dtype=np.int64)
+        grown[:len(self._due)] = self._due
+        self._due = grown
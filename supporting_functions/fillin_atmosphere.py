@@ -3,12 +3,13 @@ Atmospheric model setup
 Python version of fillin_atmosphere.m
 """
 
+import warnings
 import numpy as np
 import scipy.io as sio
-from datetime import datetime
 from astropy.time import Time
 import sys
 from pathlib import Path
+from jb2008_store import JB2008_CSV, load_jb2008_store, jb2008_param
 
 def fillin_atmosphere(cfgMC):
     """
@@ -65,15 +66,8 @@ def initJB2008(cfgMC):
                 fn = alt_path
                 break
         else:
-            print(f"Warning: Density file not found at {fn}")
-            print("Using default atmospheric parameters")
-            # Set default parameters
-            cfgMC['param'] = {
-                'dens_times': np.array([]),
-                'alt': np.array([]),
-                'dens_value': np.array([])
-            }
-            return cfgMC
+            # No .mat: use the memory-mapped store built from the shipped CSV
+            return initJB2008_store(cfgMC)
     
     # Load density data
     try:
@@ -86,13 +80,9 @@ def initJB2008(cfgMC):
         alt = dens_highvar['alt'].flatten()
         dens = dens_highvar['dens']
         
-        # Calculate Julian dates
-        dens_times = np.zeros(len(month))
-        for k in range(len(month)):
-            # Create datetime and convert to Julian date
-            dt = datetime(int(year[k]), int(month[k]), 1)
-            jd = Time(dt).jd
-            dens_times[k] = jd
+        # Calculate Julian dates (first day of each month)
+        dens_times = Time({'year': year.astype(int), 'month': month.astype(int),
+                           'day': np.ones(len(month), dtype=int)}, format='ymdhms').jd
         
         # Create meshgrid
         dens_times2, alt2 = np.meshgrid(dens_times, alt)
@@ -105,8 +95,8 @@ def initJB2008(cfgMC):
         }
         
     except Exception as e:
-        print(f"Error loading density file: {e}")
-        print("Using default atmospheric parameters")
+        warnings.warn(f"Error loading density file {fn}: {e}; "
+                      "falling back to the static exponential density model", RuntimeWarning)
         # Set default parameters
         cfgMCout = cfgMC.copy()
         cfgMCout['param'] = {
@@ -115,4 +105,34 @@ def initJB2008(cfgMC):
             'dens_value': np.array([])
         }
     
-    return cfgMCout 
\ No newline at end of file
+    return cfgMCout
+
+def initJB2008_store(cfgMC):
+    """
+    Initialize JB2008 atmospheric model from the CSV-backed density store
+    
+    Parameters:
+    -----------
+    cfgMC : dict
+        Configuration dictionary
+        
+    Returns:
+    --------
+    cfgMCout : dict
+        Updated configuration dictionary with JB2008 parameters (read-only
+        views of the memory-mapped store)
+    """
+    
+    cfgMCout = cfgMC.copy()
+    try:
+        cfgMCout['param'] = jb2008_param(load_jb2008_store(JB2008_CSV))
+    except Exception as e:
+        warnings.warn(f"Error loading density file {JB2008_CSV}: {e}; "
+                      "falling back to the static exponential density model", RuntimeWarning)
+        cfgMCout['param'] = {
+            'dens_times': np.array([]),
+            'alt': np.array([]),
+            'dens_value': np.array([])
+        }
+    
+    return cfgMCout
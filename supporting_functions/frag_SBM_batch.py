@@ -0,0 +1,271 @@
+"""
+Batched fragmentation following NASA EVOLVE 4.0 standard breakup model
+Vectorized over K collision or explosion events of one timestep
+(batched version of frag_col_SBM_vec.m / frag_exp_SBM_vec.m)
+"""
+
+import numpy as np
+from func_Am import func_Am
+from func_dv import func_dv
+from func_create_tlesv2_vec import func_create_tlesv2_batch
+
+LB = 0.1  # 10 cm lower bound; L_c
+N_DIAMETER_BINS = 199  # bins between 200 logspace diameter edges
+
+def frag_exp_SBM_batch(ep, p1_in, param, rng=None):
+    """
+    Explosion fragmentation of K objects
+
+    Parameters:
+    -----------
+    ep : float
+        Epoch
+    p1_in : array-like
+        K x 9 rows of [mass, radius, r_x, r_y, r_z, v_x, v_y, v_z, objectclass]
+    param : dict
+        Parameter dictionary containing max_frag, mu, req, maxID (and j2 to
+        store mean elements); maxID is advanced by the number of debris created
+    rng : numpy.random.RandomState, optional
+        Random number generator (defaults to the global np.random state)
+
+    Returns:
+    --------
+    debris : ndarray
+        Debris of all events in mat_sats format, shape (n_debris, 24)
+    offsets : ndarray
+        Debris of event k are rows offsets[k]:offsets[k+1], shape (K+1,)
+    """
+    if rng is None:
+        rng = np.random
+
+    p1_in = np.asarray(p1_in, dtype=float).reshape(-1, 9)
+    n_events = len(p1_in)
+
+    p1_mass = p1_in[:, 0]
+    p1_radius = p1_in[:, 1]
+    p1_objclass = p1_in[:, 8]
+
+    # For explosions, use total mass of the object
+    M = p1_mass
+
+    d, A, Am, m, ev = _sample_fragments(M, np.minimum(1, 2 * p1_radius), p1_objclass, rng)
+
+    # Remove smallest objects until mass conservation is met
+    keep, order = _trim_to_mass(m, ev, M, np.bincount(ev, m, n_events) > M)
+    d, A, Am, m, ev = d[order][keep], A[order][keep], Am[order][keep], m[order][keep], ev[order][keep]
+
+    # Single remnant carrying the remaining mass
+    m_rem = M - np.bincount(ev, m, n_events)
+    ev_rem = np.flatnonzero(m_rem > M / 1000)
+    m_rem = m_rem[ev_rem]
+
+    fragments, ev = _assemble_fragments(d, A, Am, m, ev, m_rem, ev_rem, p1_mass, p1_radius,
+                                        p1_objclass, 'exp', rng)
+
+    debris, counts = func_create_tlesv2_batch(ep, p1_in[:, 2:5], p1_in[:, 5:8], p1_objclass, fragments, ev,
+                                              param['max_frag'], param['mu'], param['req'], param['maxID'],
+                                              j2=param.get('j2'))
+    param['maxID'] = param['maxID'] + len(debris)
+    return debris, np.concatenate([[0], np.cumsum(counts)])
+
+def frag_col_SBM_batch(ep, p1_in, p2_in, param, rng=None):
+    """
+    Collision fragmentation of K object pairs
+
+    Parameters:
+    -----------
+    ep : float
+        Epoch
+    p1_in, p2_in : array-like
+        K x 9 rows of [mass, radius, r_x, r_y, r_z, v_x, v_y, v_z, objectclass]
+    param : dict
+        Parameter dictionary containing max_frag, mu, req, maxID (and j2 to
+        store mean elements); maxID is advanced by the number of debris created
+    rng : numpy.random.RandomState, optional
+        Random number generator (defaults to the global np.random state)
+
+    Returns:
+    --------
+    debris : ndarray
+        Debris of all events in mat_sats format, shape (n_debris, 24)
+    offsets : ndarray
+        Debris of event k are rows offsets[k]:offsets[k+1], shape (K+1,);
+        within an event, debris of the heavier object come first
+    """
+    debris, group_offsets = _frag_col_groups(ep, p1_in, p2_in, param, rng)
+    return debris, group_offsets[::2]
+
+def _frag_col_groups(ep, p1_in, p2_in, param, rng=None):
+    """frag_col_SBM_batch returning offsets per parent (2K+1): heavier object, then lighter"""
+    if rng is None:
+        rng = np.random
+
+    p1_in = np.asarray(p1_in, dtype=float).reshape(-1, 9)
+    p2_in = np.asarray(p2_in, dtype=float).reshape(-1, 9)
+    n_events = len(p1_in)
+
+    # Ensure p1_mass > p2_mass, or p1_radius > p2_radius if p1_mass == p2_mass
+    swap = (p1_in[:, 0] < p2_in[:, 0]) | ((p1_in[:, 0] == p2_in[:, 0]) & (p1_in[:, 1] < p2_in[:, 1]))
+    p1_in, p2_in = np.where(swap[:, None], p2_in, p1_in), np.where(swap[:, None], p1_in, p2_in)
+
+    p1_mass = p1_in[:, 0]
+    p1_radius = p1_in[:, 1]
+    p1_objclass = p1_in[:, 8]
+    p2_mass = p2_in[:, 0]
+    p2_radius = p2_in[:, 1]
+
+    # Calculate relative velocity
+    dv = np.linalg.norm(p1_in[:, 5:8] - p2_in[:, 5:8], axis=1)  # km/s
+
+    # Calculate catastrophic ratio (specific energy); catastrophic if > 40 J/g
+    catastrophRatio = (p2_mass * (dv * 1000)**2) / (2 * p1_mass * 1000)  # J/g
+    isCatastrophic = catastrophRatio >= 40
+    M = np.where(isCatastrophic, p1_mass + p2_mass, p2_mass * dv**2)
+
+    d, A, Am, m, ev = _sample_fragments(M, np.minimum(1, 2 * p1_radius), p1_objclass, rng)
+
+    short = np.bincount(ev, m, n_events) < M
+
+    # Catastrophic collisions short of mass: large fragments may not exceed
+    # the mass of the larger object (smallest ones kept)
+    largeidx = ((d > p2_radius[ev] * 2) | (m > p2_mass[ev])) & (d < p1_radius[ev] * 2)
+    large_trim = isCatastrophic & short & (np.bincount(ev, m * largeidx, n_events) > p1_mass)
+    keep, order = _trim_to_mass(m, ev, p1_mass, large_trim, eligible=largeidx)
+    d, A, Am, m, ev = d[order][keep], A[order][keep], Am[order][keep], m[order][keep], ev[order][keep]
+
+    # Other collisions above the mass budget: remove smallest objects until
+    # mass conservation is met
+    keep, order = _trim_to_mass(m, ev, M, ~short)
+    d, A, Am, m, ev = d[order][keep], A[order][keep], Am[order][keep], m[order][keep], ev[order][keep]
+
+    # Remnants: 2-8 random pieces for catastrophic collisions, otherwise one
+    m_remSum = M - np.bincount(ev, m, n_events)
+    has_rem = np.where(short, m_remSum > 0, m_remSum > M / 1000)
+    num_rem = np.where(has_rem, 1, 0)
+    multi = has_rem & short & isCatastrophic
+    num_rem[multi] = rng.randint(2, 9, size=np.count_nonzero(multi))
+    ev_rem = np.repeat(np.arange(n_events), num_rem)
+    remDist = np.ones(len(ev_rem))
+    is_multi = multi[ev_rem]
+    remDist[is_multi] = rng.random(np.count_nonzero(is_multi))
+    m_rem = m_remSum[ev_rem] * remDist / np.bincount(ev_rem, remDist, n_events)[ev_rem]
+
+    fragments, ev = _assemble_fragments(d, A, Am, m, ev, m_rem, ev_rem, p1_mass, p1_radius,
+                                        p1_objclass, 'col', rng)
+
+    # Distribute fragments between parent objects according to mass ratio:
+    # the first share of each event goes to the heavier object
+    n_frag = np.bincount(ev, minlength=n_events)
+    n_frag1 = (n_frag * (p1_mass / (p1_mass + p2_mass))).astype(int)
+    pos = np.arange(len(ev)) - (np.cumsum(n_frag) - n_frag)[ev]
+    group = 2 * ev + (pos >= n_frag1[ev])
+
+    parents = np.empty((2 * n_events, 9))
+    parents[0::2] = p1_in
+    parents[1::2] = p2_in
+    debris, counts = func_create_tlesv2_batch(ep, parents[:, 2:5], parents[:, 5:8], parents[:, 8], fragments,
+                                              group, param['max_frag'], param['mu'], param['req'],
+                                              param['maxID'], j2=param.get('j2'))
+    param['maxID'] = param['maxID'] + len(debris)
+    return debris, np.concatenate([[0], np.cumsum(counts)])
+
+def _sample_fragments(M, L_max, objclass, rng):
+    """
+    Sample fragment diameters of every event from the SBM size distribution
+
+    Returns d, A, Am, m and the event index ev of every fragment; fragments
+    are grouped by event and randomly ordered within an event.
+    """
+    n_events = len(M)
+    L_max = np.maximum(L_max, LB)
+    # Diameter bins in log space between LB and L_max
+    log10_dd = np.linspace(np.log10(LB), np.log10(L_max), N_DIAMETER_BINS + 1, axis=1)
+    dd_edges = 10**log10_dd
+    dd_means = 10**(log10_dd[:, :-1] + np.diff(log10_dd, axis=1) / 2)
+
+    # Number of fragments per bin, fractional parts sampled
+    nddcdf = 0.1 * M[:, None]**(0.75) * dd_edges**(-1.71)
+    ndd = np.maximum(0, -np.diff(nddcdf, axis=1))
+    floor_ndd = np.floor(ndd)
+    rand_sampling = rng.random(ndd.shape)
+    add_sampling = rand_sampling > (1 - (ndd - floor_ndd))
+    counts = (floor_ndd + add_sampling).astype(int).ravel()
+    d = np.repeat(dd_means.ravel(), counts)
+    ev = np.repeat(np.repeat(np.arange(n_events), N_DIAMETER_BINS), counts)
+
+    # Random order within each event
+    order = np.lexsort((rng.random(len(d)), ev))
+    d = d[order]
+
+    # Calculate fragment properties
+    A = 0.556945 * d**(2.0047077)  # Area calculation
+    Am = func_Am(d, objclass[ev], rng)  # Area-to-mass ratio
+    m = A / Am  # Mass calculation
+    return d, A, Am, m, ev
+
+def _trim_to_mass(m, ev, budget, active, eligible=None):
+    """
+    Keep the smallest fragments whose cumulative mass stays below the budget
+
+    Only events flagged in ``active`` are trimmed (and reordered by mass);
+    other events keep all fragments in their current order. If ``eligible``
+    is given, only those fragments count towards the budget and can be
+    removed; they are placed first within a trimmed event.
+
+    Returns:
+    --------
+    keep : ndarray of bool
+        Fragments kept, in the returned order
+    order : ndarray
+        Permutation to apply to the fragment arrays before ``keep``
+    """
+    n = len(m)
+    if eligible is None:
+        eligible = np.ones(n, dtype=bool)
+    by_mass = np.lexsort((m, ~eligible, ev))
+    rank = np.empty(n, dtype=np.intp)
+    rank[by_mass] = np.arange(n)
+    secondary = np.where(active[ev], rank, np.arange(n))
+    order = np.lexsort((secondary, ev))
+
+    ev = ev[order]
+    trimmed = active[ev] & eligible[order]
+    cumsum_m = np.cumsum(np.where(trimmed, m[order], 0.0))
+    seg_start = np.searchsorted(ev, np.arange(len(active)))
+    cumsum_m = cumsum_m - np.concatenate([[0.0], cumsum_m])[seg_start][ev]
+    keep = ~trimmed | (cumsum_m < budget[ev])
+    return keep, order
+
+def _assemble_fragments(d, A, Am, m, ev, m_rem, ev_rem, p1_mass, p1_radius, p1_objclass, frag_type, rng):
+    """Append remnants, draw velocity changes and drop fragments below LB"""
+    # Calculate remnant properties
+    d_rem = (m_rem / p1_mass[ev_rem] * p1_radius[ev_rem]**3)**(1/3) * 2
+    Am_rem = func_Am(d_rem, p1_objclass[ev_rem], rng)
+    A_rem = m_rem * Am_rem
+
+    # Remnants follow the fragments of their event
+    ev_all = np.concatenate([ev, ev_rem])
+    order = np.argsort(ev_all, kind='stable')
+    ev_all = ev_all[order]
+    d_all = np.concatenate([d, d_rem])[order]
+    A_all = np.concatenate([A, A_rem])[order]
+    Am_all = np.concatenate([Am, Am_rem])[order]
+    m_all = np.concatenate([m, m_rem])[order]
+
+    # Calculate velocity changes
+    dv = func_dv(Am_all, frag_type) / 1000  # km/s
+
+    # Random velocity directions
+    u = rng.random(len(dv)) * 2 - 1
+    theta = rng.random(len(dv)) * 2 * np.pi
+
+    v = np.sqrt(1 - u**2)
+    p = np.column_stack([v * np.cos(theta), v * np.sin(theta), u])
+    dv_vec = p * dv[:, np.newaxis]
+
+    # Create fragments array: [diam, Area, AMR, m, total_dv, dv_X, dv_Y, dv_Z]
+    fragments = np.column_stack([d_all, A_all, Am_all, m_all, dv, dv_vec])
+
+    # Remove fragments smaller than lower bound
+    valid = fragments[:, 0] >= LB
+    return fragments[valid], ev_all[valid]
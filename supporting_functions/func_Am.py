@@ -5,16 +5,18 @@ Based on NASA's new breakup model of evolve 4.0
 
 import numpy as np
 
-def func_Am(d, ObjClass):
+def func_Am(d, ObjClass, rng=None):
     """
     Calculate area-to-mass ratio for fragments
     
     Parameters:
     -----------
-    d : array-like
+    d : float or array-like
         Diameter in meters
     ObjClass : int or array-like
         Object class (1=Satellite, 2=Debris, 5=Rocket Body, etc.)
+    rng : numpy.random.RandomState, optional
+        Random number generator (defaults to the global np.random state)
         
     Returns:
     --------
@@ -22,103 +24,46 @@ def func_Am(d, ObjClass):
         Area-to-mass ratio in m²/kg
     """
     
+    if rng is None:
+        rng = np.random
+    
+    d = np.atleast_1d(np.asarray(d, dtype=float))
     numObj = len(d)
     logds = np.log10(d)  # d in meters
-    amsms = np.full((numObj, 5), np.nan)  # store alpha,mu1,sig1,mu2,sig2
     
     # Check if ObjClass is scalar or array
-    if np.isscalar(ObjClass):
-        ObjClass = np.full(numObj, ObjClass)
+    ObjClass = np.broadcast_to(np.asarray(ObjClass, dtype=float), d.shape)
     
     # Rocket-body related objects (class 5-8)
     rocket_mask = (ObjClass > 4.5) & (ObjClass < 8.5)
     
-    for ind in range(numObj):
-        logd = logds[ind]
-        
-        if rocket_mask[ind]:
-            # Rocket body parameters
-            # alpha
-            if logd <= -1.4:
-                alpha = 1
-            elif -1.4 < logd < 0:
-                alpha = 1 - 0.3571 * (logd + 1.4)
-            else:  # >= 0
-                alpha = 0.5
-            
-            # mu1
-            if logd <= -0.5:
-                mu1 = -0.45
-            elif -0.5 < logd < 0:
-                mu1 = -0.45 - 0.9 * (logd + 0.5)
-            else:  # >= 0
-                mu1 = -0.9
-            
-            # sigma1
-            sigma1 = 0.55
-            
-            # mu2
-            mu2 = -0.9
-            
-            # sigma2
-            if logd <= -1.0:
-                sigma2 = 0.28
-            elif -1 < logd < 0.1:
-                sigma2 = 0.28 - 0.1636 * (logd + 1)
-            else:  # >= 0.1
-                sigma2 = 0.1
-                
-        else:
-            # Satellite/Debris parameters
-            # alpha
-            if logd <= -1.95:
-                alpha = 1
-            elif -1.95 < logd < 0.55:
-                alpha = 1 - 0.4 * (logd + 1.95)
-            else:  # >= 0.55
-                alpha = 0.0
-            
-            # mu1
-            if logd <= -0.55:
-                mu1 = -0.3
-            elif -0.55 < logd < 0.55:
-                mu1 = -0.3 - 0.4 * (logd + 0.55)
-            else:  # >= 0.55
-                mu1 = -0.7
-            
-            # sigma1
-            sigma1 = 0.4
-            
-            # mu2
-            mu2 = -0.7
-            
-            # sigma2
-            if logd <= -1.1:
-                sigma2 = 0.28
-            elif -1.1 < logd < 0.1:
-                sigma2 = 0.28 - 0.1636 * (logd + 1.1)
-            else:  # >= 0.1
-                sigma2 = 0.1
-        
-        amsms[ind, :] = [alpha, mu1, sigma1, mu2, sigma2]
+    # Distribution parameters (alpha, mu1, sigma1, mu2, sigma2) of every object;
+    # each is constant below the lower break, linear in log10(d) between the
+    # breaks and constant above the upper break
+    alpha = np.where(rocket_mask,
+                     _piecewise(logds, -1.4, 0, 1, -0.3571, 0.5),       # Rocket body
+                     _piecewise(logds, -1.95, 0.55, 1, -0.4, 0.0))      # Satellite/Debris
+    mu1 = np.where(rocket_mask,
+                   _piecewise(logds, -0.5, 0, -0.45, -0.9, -0.9),
+                   _piecewise(logds, -0.55, 0.55, -0.3, -0.4, -0.7))
+    sigma1 = np.where(rocket_mask, 0.55, 0.4)
+    mu2 = np.where(rocket_mask, -0.9, -0.7)
+    sigma2 = np.where(rocket_mask,
+                      _piecewise(logds, -1.0, 0.1, 0.28, -0.1636, 0.1),
+                      _piecewise(logds, -1.1, 0.1, 0.28, -0.1636, 0.1))
     
-    # Calculate log10(Am) using the two-component lognormal distribution
-    log10_Am = np.full(numObj, np.nan)
-    
-    for ind in range(numObj):
-        alpha, mu1, sigma1, mu2, sigma2 = amsms[ind, :]
-        
-        # Generate random number
-        rand_val = np.random.random()
-        
-        if rand_val < alpha:
-            # First component
-            log10_Am[ind] = np.random.normal(mu1, sigma1)
-        else:
-            # Second component
-            log10_Am[ind] = np.random.normal(mu2, sigma2)
+    # Calculate log10(Am) using the two-component lognormal distribution:
+    # one uniform selects the component, one standard normal draws from it
+    rand_val = rng.random(numObj)
+    z = rng.standard_normal(numObj)
+    log10_Am = np.where(rand_val < alpha, mu1 + sigma1 * z, mu2 + sigma2 * z)
     
     # Convert to Am (m²/kg)
     Am = 10**log10_Am
     
-    return Am 
\ No newline at end of file
+    return Am
+
+def _piecewise(logd, lo, hi, value_lo, slope, value_hi):
+    """value_lo for logd <= lo, value_lo + slope*(logd - lo) for lo < logd < hi, value_hi otherwise"""
+    return np.where(logd <= lo, value_lo,
+                    np.where(logd < hi, value_lo + slope * (logd - lo), value_hi))
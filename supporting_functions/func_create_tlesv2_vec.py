@@ -5,6 +5,7 @@ Converts fragment information to satellite matrix format
 
 import numpy as np
 from rv2coe_vec import rv2coe_vec
+from new_analytic_propagator.osc2mean_m_vec import osc2mean_m_vec
 from filter_objclass_fragments_int import filter_objclass_fragments_int
 
 def func_create_tlesv2_vec(ep, r_parent, v_parent, class_parent, fragments, max_frag, mu, req, maxID):
@@ -38,46 +39,96 @@ def func_create_tlesv2_vec(ep, r_parent, v_parent, class_parent, fragments, max_
         Fragment matrix in satellite format
     """
     
-    r0 = np.array(r_parent)
-    v0 = np.array(v_parent)
-    
-    if len(fragments) > max_frag:
-        print(f'Warning: number of fragments {len(fragments)} exceeds max_frag {max_frag}')
-    
-    n_frag = min(len(fragments), max_frag)
-    
-    if n_frag == 0:
+    fragments = np.asarray(fragments, dtype=float).reshape(-1, 8)
+    mat_frag, _ = func_create_tlesv2_batch(ep, np.reshape(r_parent, (1, 3)), np.reshape(v_parent, (1, 3)),
+                                           [class_parent], fragments, np.zeros(len(fragments), dtype=int),
+                                           max_frag, mu, req, maxID)
+    if len(mat_frag) == 0:
         return np.array([])
+    return mat_frag
+
+def func_create_tlesv2_batch(ep, r_parent, v_parent, class_parent, fragments, group, max_frag, mu, req, maxID,
+                             j2=None):
+    """
+    Create new satellite objects from the fragments of several parents
     
-    # Sort by mass to minimize mass conservation issues
-    mass_idx = np.argsort(fragments[:, 3])[::-1]  # Sort by mass (descending)
-    fragments = fragments[mass_idx[:n_frag]]
+    Parameters:
+    -----------
+    ep : float
+        Epoch
+    r_parent : array-like
+        G x 3 parent position vectors
+    v_parent : array-like
+        G x 3 parent velocity vectors
+    class_parent : array-like
+        Object class of each parent, length G
+    fragments : array-like
+        Nx8 fragment data: [diam, Area, AMR, m, total_dv, dv_X, dv_Y, dv_Z]
+    group : array-like
+        Parent index (0..G-1) of every fragment, non-decreasing
+    max_frag : int
+        Maximum number of fragments per parent
+    mu : float
+        Gravitational parameter
+    req : float
+        Earth radius
+    maxID : int
+        Maximum object ID; new IDs are assigned consecutively in parent order
+    j2 : float, optional
+        J2 coefficient; if given, the osculating elements of the fragments
+        are converted to mean elements (osc2mean_m_vec) as the propagator
+        expects, otherwise they are used as they are
+        
+    Returns:
+    --------
+    mat_frag : ndarray
+        Fragment matrix in satellite format, rows grouped by parent
+    counts : ndarray
+        Number of rows of each parent, length G
+    """
+    
+    r_parent = np.asarray(r_parent, dtype=float).reshape(-1, 3)
+    v_parent = np.asarray(v_parent, dtype=float).reshape(-1, 3)
+    fragments = np.asarray(fragments, dtype=float).reshape(-1, 8)
+    group = np.asarray(group, dtype=np.intp)
+    n_parents = len(r_parent)
+    
+    n_per_parent = np.bincount(group, minlength=n_parents)
+    for n_frag_parent in n_per_parent[n_per_parent > max_frag]:
+        print(f'Warning: number of fragments {n_frag_parent} exceeds max_frag {max_frag}')
+    
+    # Sort by mass (descending) within each parent to minimize mass
+    # conservation issues, keeping at most max_frag fragments per parent
+    mass_idx = np.lexsort((-fragments[:, 3], group))
+    group = group[mass_idx]
+    rank = np.arange(len(group)) - (np.cumsum(n_per_parent) - n_per_parent)[group]
+    keep = rank < max_frag
+    fragments = fragments[mass_idx[keep]]
+    group = group[keep]
     
     # Add velocity changes to parent velocity
-    v = fragments[:, 5:8] + v0  # Add dV components
-    r = np.tile(r0, (n_frag, 1))  # Repeat parent position
+    v = fragments[:, 5:8] + v_parent[group]  # Add dV components
+    r = r_parent[group]  # Repeat parent position
     
     # Convert to orbital elements
-    try:
-        _, a, ecc, incl, omega, argp, _, m, _, _, _ = rv2coe_vec(r, v, mu)
-    except:
-        # If conversion fails, return empty array
-        return np.array([])
+    _, a, ecc, incl, omega, argp, nu, m, _, _, _ = rv2coe_vec(r, v, mu)
     
     # Filter for elliptical orbits (a > 0)
     idx_a = np.where(a > 0)[0]
     num_a = len(idx_a)
-    
-    if num_a == 0:
-        return np.array([])
+    group = group[idx_a]
+    counts = np.bincount(group, minlength=n_parents)
     
     # Extract valid orbital elements
-    a = a[idx_a] / req  # Convert to Earth radii
-    ecco = ecc[idx_a]
-    inclo = incl[idx_a]
-    nodeo = omega[idx_a]
-    argpo = argp[idx_a]
-    mo = m[idx_a]
+    oe = np.column_stack([a[idx_a], ecc[idx_a], incl[idx_a], omega[idx_a], argp[idx_a], m[idx_a]])
+    if j2 is not None and num_a > 0:
+        osc2mean_m_vec(oe, {'mu': mu, 'req': req, 'j2': j2}, theta_osc=nu[idx_a], out=oe)
+    a = oe[:, 0] / req  # Convert to Earth radii
+    ecco = oe[:, 1]
+    inclo = oe[:, 2]
+    nodeo = oe[:, 3]
+    argpo = oe[:, 4]
+    mo = oe[:, 5]
     
     # Calculate Bstar parameter
     rho_0 = 0.157  # kg/(m²*Re)
@@ -98,7 +149,8 @@ def func_create_tlesv2_vec(ep, r_parent, v_parent, class_parent, fragments, max_
     launch_date = np.full(num_a, np.nan)
     
     # Assign fragment object class
-    frag_objectclass = np.full(num_a, filter_objclass_fragments_int(class_parent))
+    frag_class = np.array([filter_objclass_fragments_int(c) for c in np.ravel(class_parent)], dtype=float)
+    frag_objectclass = frag_class[group] if num_a > 0 else np.zeros(0)
     
     # Generate fragment IDs
     ID_frag = np.arange(maxID + 1, maxID + num_a + 1)
@@ -110,4 +162,4 @@ def func_create_tlesv2_vec(ep, r_parent, v_parent, class_parent, fragments, max_
         date_created, launch_date, r[idx_a], v[idx_a], frag_objectclass, ID_frag
     ])
     
-    return mat_frag 
\ No newline at end of file
+    return mat_frag, counts
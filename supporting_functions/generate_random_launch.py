@@ -4,7 +4,7 @@ Random launch generation function
 
 import numpy as np
 
-def generate_random_launch(param):
+def generate_random_launch(param, rng=None):
     """
     Generate a random launch based on parameters
     
@@ -12,6 +12,8 @@ def generate_random_launch(param):
     -----------
     param : dict
         Simulation parameters
+    rng : numpy.random.RandomState, optional
+        Random number generator (defaults to the global np.random state)
         
     Returns:
     --------
@@ -19,35 +21,38 @@ def generate_random_launch(param):
         Array of launched objects
     """
     
+    if rng is None:
+        rng = np.random
+    
     # This is a simplified random launch generator
     # In practice, this would be more sophisticated based on historical data
     
     # Generate random orbital elements
-    n_objects = np.random.poisson(5)  # Average 5 objects per launch
+    n_objects = rng.poisson(5)  # Average 5 objects per launch
     
     if n_objects == 0:
         return []
     
     # Random semi-major axis (LEO range)
-    a = np.random.uniform(1.05, 1.2)  # Earth radii
+    a = rng.uniform(1.05, 1.2)  # Earth radii
     
     # Random eccentricity
-    e = np.random.uniform(0, 0.1)
+    e = rng.uniform(0, 0.1)
     
     # Random inclination
-    i = np.random.uniform(0, np.pi/2)
+    i = rng.uniform(0, np.pi/2)
     
     # Random other orbital elements
-    omega = np.random.uniform(0, 2*np.pi)
-    argp = np.random.uniform(0, 2*np.pi)
-    M = np.random.uniform(0, 2*np.pi)
+    omega = rng.uniform(0, 2*np.pi)
+    argp = rng.uniform(0, 2*np.pi)
+    M = rng.uniform(0, 2*np.pi)
     
     # Create launch objects
     launch_objects = []
     for j in range(n_objects):
         # Random mass and radius
-        mass = np.random.uniform(100, 1000)  # kg
-        radius = np.random.uniform(0.5, 2.0)  # m
+        mass = rng.uniform(100, 1000)  # kg
+        radius = rng.uniform(0.5, 2.0)  # m
         
         # Create object array (simplified format)
         obj = np.array([
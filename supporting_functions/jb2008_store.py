@@ -0,0 +1,118 @@
+"""
+Memory-mapped JB2008 density store
+Converts the shipped monthly JB2008 density CSV once into a binary .npy
+table that every consumer maps read-only
+"""
+
+import os
+import warnings
+import numpy as np
+from pathlib import Path
+from astropy.time import Time
+from erfa import ErfaWarning
+
+# Altitude levels of the density table [km] (columns alt_0 ... alt_35)
+JB2008_ALT = np.arange(200.0, 2000.0, 50.0)
+
+# One record per month: calendar month, JD of its first day and the density
+# profile [kg/m^3] over JB2008_ALT
+JB2008_DTYPE = np.dtype([('year', '<i4'), ('month', '<i4'), ('jd', '<f8'),
+                         ('dens', '<f8', (len(JB2008_ALT),))])
+
+JB2008_CSV = Path(__file__).parent.parent / 'supporting_data' / 'dens_jb2008_032020_022224.csv'
+
+_stores = {}
+
+def convert_jb2008_csv(csv_file=JB2008_CSV, store_file=None):
+    """
+    Convert the JB2008 density CSV (year, month, alt_0..alt_35) into a .npy store
+
+    Parameters:
+    -----------
+    csv_file : str or Path
+        Density CSV file
+    store_file : str or Path, optional
+        Output file (csv_file with a .npy suffix if not given)
+
+    Returns:
+    --------
+    store_file : Path
+        Written store
+    """
+    csv_file = Path(csv_file)
+    store_file = csv_file.with_suffix('.npy') if store_file is None else Path(store_file)
+
+    # The altitudes are not in the file: its columns must be the levels of JB2008_ALT
+    with open(csv_file) as f:
+        header = [name.strip() for name in f.readline().split(',')]
+    expected = ['year', 'month'] + [f'alt_{k}' for k in range(len(JB2008_ALT))]
+    if header != expected:
+        raise ValueError(f"Expected columns year, month, alt_0 ... alt_{len(JB2008_ALT) - 1} "
+                         f"({JB2008_ALT[0]:g}-{JB2008_ALT[-1]:g} km) in {csv_file}, got {header}")
+
+    data = np.loadtxt(csv_file, delimiter=',', skiprows=1, ndmin=2)
+    if data.shape[1] != len(expected):
+        raise ValueError(f"Expected {len(expected)} values per row in {csv_file}")
+
+    table = np.zeros(len(data), dtype=JB2008_DTYPE)
+    table['year'] = data[:, 0]
+    table['month'] = data[:, 1]
+    with warnings.catch_warnings():
+        # Months past 2100 are flagged as dubious (no leap second table)
+        warnings.simplefilter('ignore', ErfaWarning)
+        table['jd'] = Time({'year': table['year'], 'month': table['month'],
+                            'day': np.ones(len(data), dtype=int)}, format='ymdhms').jd
+    table['dens'] = data[:, 2:]
+
+    # Write under a temporary name so concurrent readers never map a partial file
+    tmp_file = store_file.with_name(f'{store_file.name}.{os.getpid()}.tmp')
+    with open(tmp_file, 'wb') as f:
+        np.save(f, table)
+    tmp_file.replace(store_file)
+    return store_file
+
+def load_jb2008_store(csv_file=JB2008_CSV, store_file=None):
+    """
+    Memory-mapped JB2008 table, converted from the CSV on first use
+
+    The store is rebuilt when it is missing or older than the CSV. Maps are
+    cached per file, so repeated calls in a process are O(1), and processes
+    mapping the same file share its pages.
+
+    Parameters:
+    -----------
+    csv_file : str or Path
+        Density CSV file
+    store_file : str or Path, optional
+        Store file (csv_file with a .npy suffix if not given)
+
+    Returns:
+    --------
+    table : np.memmap
+        Read-only records of JB2008_DTYPE, one per month in file order
+    """
+    csv_file = Path(csv_file)
+    store_file = csv_file.with_suffix('.npy') if store_file is None else Path(store_file)
+
+    if store_file not in _stores:
+        if not store_file.exists() or (csv_file.exists() and
+                                       store_file.stat().st_mtime < csv_file.stat().st_mtime):
+            convert_jb2008_csv(csv_file, store_file)
+        table = np.load(store_file, mmap_mode='r')
+        if table.dtype != JB2008_DTYPE:
+            raise ValueError(f"{store_file} is not a JB2008 density store")
+        _stores[store_file] = table
+    return _stores[store_file]
+
+def jb2008_param(table):
+    """
+    Density parameters (alt, dens_times, dens_value) in the meshgrid layout of initJB2008
+
+    All three arrays are views of the store, no table is copied.
+    """
+    shape = (len(JB2008_ALT), len(table))
+    return {
+        'dens_times': np.broadcast_to(table['jd'][None, :], shape),
+        'alt': np.broadcast_to(JB2008_ALT[:, None], shape),
+        'dens_value': table['dens'].T
+    }
@@ -1,37 +1,44 @@
 import numpy as np
+from .density_profile import DensityProfile
+from .densityexp_vec import densityexp_vec
 
 def analytic_propagation_vec(input_oe, param):
     """
     Vectorized analytic propagation of near-circular satellite orbits in the atmosphere of an oblate planet.
     Reference: Martinusi et al., Celestial Mechanics and Dynamical Astronomy 123, no. 1 (2015): 85-103.
-    input_oe: ndarray, shape (N,6)
-    param: object with required attributes
+    input_oe: ndarray, shape (N,6), a in km
+    param: dict with req, j2, mu, density_profile, Bstar (N,), t, t_0 and, for
+        'JB2008', the density table alt, dens_times, dens_value and the epoch jd
+        (its DensityProfile is kept in density_cache); an empty JB2008 table
+        falls back to the static exponential model
     Returns:
         out_oe: ndarray, shape (N,6)
         errors: ndarray, shape (N,)
     """
     errors = np.zeros(input_oe.shape[0], dtype=int)
-    re = param.req
-    J2 = param.j2
-    mu = param.mu
+    re = param['req']
+    J2 = param['j2']
+    mu = param['mu']
     a_0 = input_oe[:, 0]
     a_minus_re = a_0 - re
-    if param.density_profile.lower() == 'jb2008':
-        rho_0 = np.zeros_like(a_0)
-        check_above = a_minus_re > param.alt[-1, 0]
-        check_below = a_minus_re < param.alt[0, 0]
-        check_in_range = ~check_above & ~check_below
-        rho_0[check_in_range] = lininterp2_vec_v2(param.alt[:, 0], param.dens_times[0, :], param.dens_value, a_minus_re[check_in_range], param.jd) * 1e9
-        rho_0[check_above] = lininterp1_vec(param.dens_times[0, :], param.dens_value[-1, :], param.jd) * 1e9
-        rho_0[check_below] = lininterp1_vec(param.dens_times[0, :], param.dens_value[0, :], param.jd) * 1e9
-    elif param.density_profile.lower() == 'static':
+    density_profile = param['density_profile'].lower()
+    if density_profile == 'jb2008' and np.size(param.get('dens_value', [])) == 0:
+        density_profile = 'static'
+    if density_profile == 'jb2008':
+        # Altitude profile of the current epoch, built once per timestep
+        dens = param.get('density_cache')
+        if dens is None or dens.dens_value is not param['dens_value']:
+            dens = DensityProfile(param['alt'], param['dens_times'], param['dens_value'])
+            param['density_cache'] = dens
+        rho_0 = dens.density(a_minus_re, param['jd']) * 1e9
+    elif density_profile == 'static':
         rho_0 = densityexp_vec(a_minus_re) * 1e9
     else:
         rho_0 = np.full_like(a_0, 1e-20)
-    C_0 = np.maximum((param.Bstar / (1e6 * 0.157)) * rho_0, 1e-20)
+    C_0 = np.maximum((param['Bstar'] / (1e6 * 0.157)) * rho_0, 1e-20)
     k2_over_mu = J2 * re ** 2 / 2
-    t = param.t
-    t_0 = param.t_0
+    t = param['t']
+    t_0 = param['t_0']
     e_0 = input_oe[:, 1]
     inc_0 = input_oe[:, 2]
     bigO_0 = input_oe[:, 3]
@@ -43,12 +50,15 @@ def analytic_propagation_vec(input_oe, param):
     alpha0_sq = (e_0 / np.sqrt(a_0)) ** 2
     beta_0 = (np.sqrt(3) / 2) * e_0
     tan_atan_beta0 = np.maximum(np.tan(np.arctan(beta_0) - beta_0 * n_0 * a_0 * C_0 * (t - t_0)), 0)
-    a = (a_0 / beta_0 ** 2) * tan_atan_beta0 ** 2
-    e = (2 / np.sqrt(3)) * tan_atan_beta0
     check_beta = beta_0 == 0
+    a = np.empty_like(a_0)
+    a[~check_beta] = (a_0[~check_beta] / beta_0[~check_beta] ** 2) * tan_atan_beta0[~check_beta] ** 2
+    e = (2 / np.sqrt(3)) * tan_atan_beta0
     if np.any(check_beta):
         a0_beta = a_0[check_beta]
         a[check_beta] = a0_beta * (1 - C_0[check_beta] * n_0[check_beta] * a0_beta * (t - t_0))
+    # Orbits decayed within the step (a <= 0) give non-finite elements
+    a = np.where(a > 0, a, np.nan)
     a_sq = a ** 2
     four_thirds_over_a_cb = 4 / 3 / (a_sq * a)
     a0_sq = a_0 ** 2
@@ -60,10 +70,7 @@ def analytic_propagation_vec(input_oe, param):
     omega = 3 * k2_over_mu / 16 * (5 * c_sq - 1) * five_a0sq_over2_tau2_plus_4thirds_over_tau3_over_C0 + omega_0
     bigO = -3 * k2_over_mu / 8 * c * five_a0sq_over2_tau2_plus_4thirds_over_tau3_over_C0 + bigO_0
     out_oe = np.column_stack([a, e, np.mod(inc_0, 2 * np.pi), np.mod(bigO, 2 * np.pi), np.mod(omega, 2 * np.pi), np.mod(Mo, 2 * np.pi)])
-    not_real = ~np.isreal(inc_0) | ~np.isreal(bigO) | ~np.isreal(omega) | ~np.isreal(Mo)
+    not_real = ~np.isfinite(bigO) | ~np.isfinite(omega) | ~np.isfinite(Mo)
     errors[not_real] = 1
     out_oe[not_real, :] = input_oe[not_real, :]
     return out_oe, errors
-
-# Placeholders for lininterp1_vec, lininterp2_vec_v2, densityexp_vec
-# These should be implemented or imported as needed. 
\ No newline at end of file
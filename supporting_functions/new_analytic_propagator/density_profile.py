@@ -0,0 +1,59 @@
+import numpy as np
+
+class DensityProfile:
+    """
+    JB2008 density table collapsed to one altitude profile per epoch.
+    The table is interpolated in time once when the epoch changes; density
+    lookups then interpolate linearly in altitude, with an O(1) index on a
+    uniform altitude grid (np.interp otherwise). Altitudes outside the table
+    take the density of the nearest end, as in analytic_propagation_vec.m.
+    alt: ndarray, altitudes [km], (n_alt,) or the (n_alt, n_times) meshgrid
+    dens_times: ndarray, epochs [JD], (n_times,) or the (n_alt, n_times) meshgrid
+    dens_value: ndarray, densities, shape (n_alt, n_times)
+    """
+
+    def __init__(self, alt, dens_times, dens_value):
+        alt = np.asarray(alt, dtype=float)
+        dens_times = np.asarray(dens_times, dtype=float)
+        self.alt = alt[:, 0] if alt.ndim == 2 else alt
+        self.dens_times = dens_times[0, :] if dens_times.ndim == 2 else dens_times
+        self.dens_value = np.asarray(dens_value)
+        if self.dens_value.shape != (len(self.alt), len(self.dens_times)):
+            raise ValueError('[length(alt), length(dens_times)] does not match size(dens_value)')
+        step = np.diff(self.alt)
+        self.h0 = self.alt[0]
+        self.dh = step[0] if len(step) > 0 else 1.0
+        self.uniform = len(step) > 0 and np.allclose(step, self.dh)
+        self.jd = None
+        self.profile = None
+        self._slope = None
+
+    def at(self, jd):
+        """
+        Altitude profile at epoch jd (cached until the epoch changes); epochs
+        outside the table take the nearest month.
+        """
+        if jd != self.jd:
+            times = self.dens_times
+            k = int(np.clip(np.searchsorted(times, jd, side='right') - 1, 0, len(times) - 1))
+            if k + 1 < len(times) and jd > times[k]:
+                w = (jd - times[k]) / (times[k + 1] - times[k])
+                self.profile = self.dens_value[:, k] * (1 - w) + self.dens_value[:, k + 1] * w
+            else:
+                self.profile = self.dens_value[:, k].astype(float)
+            self._slope = np.append(np.diff(self.profile), 0.0)
+            self.jd = jd
+        return self.profile
+
+    def density(self, h, jd):
+        """
+        Density at altitudes h [km] and epoch jd, in the units of dens_value.
+        """
+        profile = self.at(jd)
+        h = np.asarray(h, dtype=float)
+        if not self.uniform:
+            return np.interp(h, self.alt, profile)
+        x = np.clip((h - self.h0) / self.dh, 0, len(profile) - 1)
+        x = np.where(np.isnan(x), 0, x)
+        k = x.astype(np.intp)
+        return profile[k] + (x - k) * self._slope[k]
@@ -0,0 +1,122 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+KEPLER_TOL = 1e-13
+KEPLER_MAX_ITER = 30
+
+def kepler_solve(manom, ecc, out=None, tol=KEPLER_TOL, max_iter=KEPLER_MAX_ITER, use_numba=None):
+    """
+    Shared Kepler equation solver for elliptic and hyperbolic orbits.
+    Danby starter and third-order Danby corrections; only the entries that
+    have not converged are iterated further (active set). Uses a compiled
+    kernel when numba is installed, NumPy otherwise.
+    manom: float or ndarray (mean anomaly in radians)
+    ecc: float or ndarray (eccentricity), broadcast against manom
+    out: ndarray or None (buffer for the eccentric anomaly)
+    use_numba: bool or None (None: numba if available)
+    Returns:
+        eanom: eccentric (hyperbolic for ecc >= 1) anomaly, elliptic values in [0, 2pi)
+    """
+    manom, ecc = np.broadcast_arrays(np.asarray(manom, dtype=float), np.asarray(ecc, dtype=float))
+    if out is None:
+        out = np.empty(manom.shape)
+    if use_numba is None:
+        use_numba = numba is not None
+    if use_numba and numba is None:
+        raise ImportError("numba is required for use_numba=True (pip install numba)")
+
+    flat = out.reshape(-1)  # view for contiguous buffers
+    if use_numba:
+        _kepler_numba(np.ascontiguousarray(manom).ravel(), np.ascontiguousarray(ecc).ravel(),
+                      tol, max_iter, flat)
+    else:
+        _kepler_numpy(manom.ravel(), ecc.ravel(), tol, max_iter, flat)
+    if not np.shares_memory(flat, out):
+        out[...] = flat.reshape(out.shape)
+    return out
+
+def true_anomaly(eanom, ecc):
+    """
+    True anomaly from eccentric (or hyperbolic) anomaly.
+    """
+    eanom = np.asarray(eanom)
+    ecc = np.asarray(ecc)
+    ell = ecc < 1
+    sta = np.where(ell, np.sqrt(np.abs(1 - ecc**2)) * np.sin(eanom),
+                   np.sqrt(np.abs(ecc**2 - 1)) * np.sinh(np.where(ell, 0, eanom)))
+    cta = np.where(ell, np.cos(eanom) - ecc, ecc - np.cosh(np.where(ell, 0, eanom)))
+    return np.arctan2(sta, cta)
+
+def _kepler_numpy(manom, ecc, tol, max_iter, eanom):
+    pi2 = 2.0 * np.pi
+    ell = ecc < 1
+    xma = np.where(ell, manom - pi2 * np.floor(manom / pi2), manom)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        eanom[:] = np.where(ell, xma + 0.85 * np.sign(np.sin(xma)) * ecc,
+                            np.sign(xma) * np.log(2.0 * np.abs(xma) / ecc + 1.8))
+    eanom[ell & (ecc == 0)] = xma[ell & (ecc == 0)]
+    for active in (np.flatnonzero(ell & (ecc > 0)), np.flatnonzero(~ell)):
+        hyperbolic = active.size > 0 and not ell[active[0]]
+        for _ in range(max_iter):
+            if active.size == 0:
+                break
+            E = eanom[active]
+            e = ecc[active]
+            if hyperbolic:
+                s = e * np.sinh(E)
+                c = e * np.cosh(E)
+                f = s - E - xma[active]
+                fp = c - 1
+            else:
+                s = e * np.sin(E)
+                c = e * np.cos(E)
+                f = E - s - xma[active]
+                fp = 1 - c
+            delta = -f / fp
+            deltastar = -f / (fp + 0.5 * delta * s)
+            deltak = -f / (fp + 0.5 * deltastar * s + deltastar**2 * c / 6)
+            eanom[active] = E + deltak
+            active = active[~(np.abs(deltak) <= tol)]
+
+def _kepler_scalar(manom, ecc, tol, max_iter):
+    pi2 = 2.0 * np.pi
+    if ecc < 1:
+        xma = manom - pi2 * np.floor(manom / pi2)
+        if ecc == 0:
+            return xma
+        E = xma + 0.85 * np.sign(np.sin(xma)) * ecc
+    else:
+        xma = manom
+        E = np.sign(xma) * np.log(2.0 * np.abs(xma) / ecc + 1.8)
+    for _ in range(max_iter):
+        if ecc < 1:
+            s = ecc * np.sin(E)
+            c = ecc * np.cos(E)
+            f = E - s - xma
+            fp = 1 - c
+        else:
+            s = ecc * np.sinh(E)
+            c = ecc * np.cosh(E)
+            f = s - E - xma
+            fp = c - 1
+        delta = -f / fp
+        deltastar = -f / (fp + 0.5 * delta * s)
+        deltak = -f / (fp + 0.5 * deltastar * s + deltastar**2 * c / 6)
+        E = E + deltak
+        if np.abs(deltak) <= tol:
+            break
+    return E
+
+if numba is not None:
+    _kepler_scalar = numba.njit(cache=True)(_kepler_scalar)
+
+    @numba.njit(cache=True)
+    def _kepler_numba(manom, ecc, tol, max_iter, eanom):
+        for k in range(manom.size):
+            eanom[k] = _kepler_scalar(manom[k], ecc[k], tol, max_iter)
+else:
+    _kepler_numba = None
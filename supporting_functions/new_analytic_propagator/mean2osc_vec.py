@@ -1,24 +1,27 @@
 import numpy as np
+from .kepler1 import kepler1
 
-def mean2osc_vec(oemean, param):
+def mean2osc_vec(oemean, param, out=None):
     """
     Convert mean classical orbital elements to osculating classical orbital elements (vectorized).
     oemean: ndarray, shape (N,6)
-    param: object with required attributes
+    param: dict with mu, req, j2
+    out: ndarray or None, shape (N,6), may be oemean itself
     Returns:
         oeosc: ndarray, shape (N,6)
     """
     pi2 = 2.0 * np.pi
+    oemean = np.asarray(oemean)
     # compute j2 effect on orbital elements
     doe = delm(oemean, param)
-    oeosc = oemean + doe
+    oeosc = np.add(oemean, doe, out=out)
     oeosc[:, 2:6] = np.mod(oeosc[:, 2:6] + pi2, pi2)
     return oeosc
 
 def delm(x, param):
-    mu = param.mu
-    req = param.req
-    j2 = param.j2
+    mu = param['mu']
+    req = param['req']
+    j2 = param['j2']
     pi2 = 2.0 * np.pi
     a = x[:, 0]
     e = x[:, 1]
@@ -112,9 +115,4 @@ def anomly(nflg, ain, e):
     if nflg in [2, 4]:
         return f
     if nflg in [3, 5]:
-        return am
-
-def kepler1(manom, ecc):
-    # Placeholder for kepler1 function, should be replaced with actual implementation
-    # Returns (eanom, tanom)
-    return manom, manom  # Dummy implementation 
\ No newline at end of file
+        return am 
\ No newline at end of file
@@ -1,35 +1,25 @@
 import numpy as np
+from .kepler_solve import kepler_solve
 
 def mean_osculating_map(x, option, param):
     """
     Map between mean and osculating elements using Ref. 2 (Junkins & Schaub, 2009).
-    x: array-like, shape (6,)
+    x: array-like, shape (6,) or (N,6)
     option: int
         >0: mean to osculating
         <0: osculating to mean
-    param: object with required attributes
+    param: dict with req, j2
     Returns:
-        y: ndarray, shape (6,)
+        y: ndarray, same shape as x
     """
-    a, e, inc, bigO, omega, Mo = x
-    mu = param.mu
-    re = param.req
-    J2 = param.j2
+    a, e, inc, bigO, omega, Mo = np.asarray(x, dtype=float).T
+    re = param['req']
+    J2 = param['j2']
     if option > 0:
         gam2 = (J2 / 2) * (re / a) ** 2
     else:
         gam2 = -(J2 / 2) * (re / a) ** 2
-    if (-np.pi < Mo < 0) or (Mo > np.pi):
-        E = Mo - e
-    else:
-        E = Mo + e
-    Epw = Mo
-    for _ in range(1000):
-        DeltaEpw = -(Mo - Epw + e * np.sin(Epw)) / (-1 + e * np.cos(Epw))
-        Epw = Epw + DeltaEpw
-        if np.abs(DeltaEpw) < 1e-13:
-            break
-    E = Epw
+    E = kepler_solve(Mo, e)
     eta = np.sqrt(1 - e ** 2)
     gam2_p = gam2 / eta ** 4
     theta = 2 * np.arctan(np.sqrt((1 + e) / (1 - e)) * np.tan(E / 2))
@@ -54,5 +44,5 @@ def mean_osculating_map(x, option, param):
     bigO_p = np.arctan2(d3, d4)
     inc_p = 2 * np.arcsin(np.sqrt(d3 ** 2 + d4 ** 2))
     omega_p = angle_total_p - Mo_p - bigO_p
-    y = np.array([a_p, e_p, inc_p, bigO_p, omega_p, Mo_p])
+    y = np.stack([a_p, e_p, inc_p, bigO_p, omega_p, Mo_p], axis=-1)
     return y 
\ No newline at end of file
@@ -1,8 +1,11 @@
 import numpy as np
+from .kepler_solve import kepler_solve, true_anomaly
 
-def osc2mean_vec(oeosc, param):
+def osc2mean_vec(oeosc, param, out=None, tol=1e-13, max_iter=5):
     """
     Convert osculating classical orbital elements to mean classical orbital elements.
+    The fixed-point iteration stops per object once its mean elements change
+    by less than tol (only the remaining objects are iterated further).
 
     Parameters
     ----------
@@ -14,158 +17,165 @@ def osc2mean_vec(oeosc, param):
             3: RAAN (rad)
             4: argument of perigee (rad)
             5: true anomaly (rad)
-    param : object
-        Must have attributes req, j2
+    param : dict
+        Must have keys req, j2
+    out : ndarray, optional
+        Nx6 buffer for the mean elements
+    tol : float
+        Convergence tolerance on the element corrections
+    max_iter : int
+        Maximum number of iterations
 
     Returns
     -------
     oemean : ndarray
-        Mean orbital elements (Nx6 array)
+        Mean orbital elements (Nx6 array), true anomaly in column 5
     """
-    req = param.req
-    j2 = param.j2
+    threej2req2 = 3 * param['j2'] * param['req']**2
     pi2 = 2.0 * np.pi
+    oeosc = np.asarray(oeosc)
+    oemean = np.empty((oeosc.shape[0], 6)) if out is None else out
 
     eos = oeosc[:, 1]
     M = oeosc[:, 5]
     a = np.sin(M) * np.sqrt(1.0 - eos**2)
     b = eos + np.cos(M)
     eanom = np.arctan2(a, b)
-
-    aos = oeosc[:, 0]
-    ios = oeosc[:, 2]
-    ranos = oeosc[:, 3]
-    apos = oeosc[:, 4]
-    si2 = np.sin(ios)**2
     maos = np.mod(eanom - eos * np.sin(eanom), pi2)
-    aa = 1.0/3.0 - 0.5 * si2
-    bb = 0.5 * si2
 
-    check_e = eos < 0.01
-    find_e = np.where(check_e)[0]
-    find_note = np.where(~check_e)[0]
+    find_e = np.flatnonzero(eos < 0.01)
+    find_note = np.flatnonzero(~(eos < 0.01))
+    if find_e.size > 0:
+        oemean[find_e, :5], mam_e = _osc2mean_small_e(oeosc[find_e], maos[find_e], threej2req2, tol, max_iter)
+        oemean[find_e, 5] = mam_e
+    if find_note.size > 0:
+        oemean[find_note, :5], mam_note = _osc2mean_note(oeosc[find_note], maos[find_note], threej2req2, tol, max_iter)
+        oemean[find_note, 5] = mam_note
+
+    # Mean anomaly to true anomaly
+    mod_mam = np.mod(oemean[:, 5], pi2)
+    oemean[:, 5] = true_anomaly(kepler_solve(mod_mam, oemean[:, 1]), oemean[:, 1])
+    return oemean
 
-    # For eos < 0.01
-    aos_e = aos[find_e]
-    eos_e = eos[find_e]
-    ios_e = ios[find_e]
-    ranos_e = ranos[find_e]
-    apos_e = apos[find_e]
-    maos_e = maos[find_e]
-    bb_e = bb[find_e]
-    lamos = np.mod(maos_e + apos_e, pi2)
-    zos = eos_e * np.cos(apos_e)
-    etaos = eos_e * np.sin(apos_e)
-    sl = np.sin(lamos)
-    cl = np.cos(lamos)
-    s2l = np.sin(2 * lamos)
-    c2l = np.cos(2 * lamos)
-    s3l = np.sin(3 * lamos)
-    c3l = np.cos(3 * lamos)
-    s2i = np.sin(2 * ios_e)
-    am_e = aos_e.copy()
-    lamm = lamos.copy()
-    zm = zos.copy()
-    etam = etaos.copy()
-    threej2req2 = 3 * j2 * req * req
-    for _ in range(5):
-        asp_e = threej2req2 / am_e * (bb_e * c2l + (1 - 3.5 * bb_e) * zm * cl + (1 - 2.5 * bb_e) * etam * sl + 3.5 * bb_e * (zm * c3l + etam * s3l))
-        am_e = aos_e - asp_e
-        am2_e = am_e**2
-        threej2req2_over2_am2 = threej2req2 / 2 / am2_e
-        isp_e = threej2req2_over2_am2 / 4 * s2i * (c2l - zm * cl + etam * sl + 7/3 * (zm * c3l + etam * s3l))
-        im_e = ios_e - isp_e
-        ci = np.cos(im_e)
-        s2i = np.sin(2 * im_e)
-        bb_e = 0.5 * np.sin(im_e)**2
-        ransp_e = threej2req2_over2_am2 * ci * (0.5 * s2l - 3.5 * zm * sl + 2.5 * etam * cl + 7/6 * (zm * s3l - etam * c3l))
-        ranm_e = ranos_e - ransp_e
-        lamsp = threej2req2_over2_am2 * (-0.5 * (1 - 5 * bb_e) * s2l + (7 - 77/4 * bb_e) * zm * sl - (6 - 55/4 * bb_e) * etam * cl - (7/6 - 77/12 * bb_e) * (zm * s3l - etam * c3l))
-        lamm = lamos - lamsp
+def _osc2mean_small_e(oeosc, maos, threej2req2, tol, max_iter):
+    # Nonsingular elements for eos < 0.01 (lambda = M + w, z = e cos w, eta = e sin w)
+    pi2 = 2.0 * np.pi
+    aos, eos, ios, ranos, apos = oeosc[:, :5].T
+    lamos = np.mod(maos + apos, pi2)
+    zos = eos * np.cos(apos)
+    etaos = eos * np.sin(apos)
+    # state: am, im, lamm, zm, etam
+    state = np.column_stack([aos, ios, lamos, zos, etaos])
+    ranm = ranos.copy()
+    active = np.arange(len(aos))
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        am, im, lamm, zm, etam = state[active].T
+        lamos_k, zos_k, etaos_k = lamos[active], zos[active], etaos[active]
         sl = np.sin(lamm)
         cl = np.cos(lamm)
         s2l = np.sin(2 * lamm)
         c2l = np.cos(2 * lamm)
         s3l = np.sin(3 * lamm)
         c3l = np.cos(3 * lamm)
-        s4l = np.sin(4 * lamm)
-        c4l = np.cos(4 * lamm)
-        zsp = threej2req2_over2_am2 * ((1 - 2.5 * bb_e) * cl + 7/6 * bb_e * c3l + (1.5 - 5 * bb_e) * zm * c2l + (2 - 3 * bb_e) * etam * s2l + 17/4 * bb_e * (zm * c4l + etam * s4l))
-        zm = zos - zsp
-        etasp = threej2req2_over2_am2 * ((1 - 3.5 * bb_e) * sl + 7/6 * bb_e * s3l + (1 - 6 * bb_e) * zm * s2l - (1.5 - 4 * bb_e) * etam * c2l + 17/4 * bb_e * (zm * s4l - etam * c4l))
-        etam = etaos - etasp
-    em_e = np.sqrt(etam**2 + zm**2)
-    apm_e = np.zeros_like(em_e)
-    check_em = em_e > 1.0e-8
-    apm_e[check_em] = np.arctan2(etam[check_em], zm[check_em])
-    mam_e = np.mod(lamm - apm_e, pi2)
-    # For eos >= 0.01
-    aos_note = aos[find_note]
-    eos_note = eos[find_note]
-    ios_note = ios[find_note]
-    apos_note = apos[find_note]
-    ranos_note = ranos[find_note]
-    maos_note = maos[find_note]
-    am_note = aos_note.copy()
-    em_note = eos_note.copy()
-    em_note2 = em_note**2
-    one_minus_emnote = 1 - em_note2
-    pm_note = aos_note * one_minus_emnote
-    im_note = ios_note.copy()
-    apm_note = apos_note.copy()
-    mam_note = maos_note.copy()
-    aa_note = aa[~check_e]
-    bb_note = bb[~check_e]
-    n_sats = em_note.size
-    # Placeholder for kepler1_C_tanom/kepler1_vec_tanom
-    tam_note = np.zeros_like(mam_note)  # TODO: Replace with actual anomaly solver
-    um = np.mod(apm_note + tam_note, pi2)
-    hm = pm_note / (1 + em_note * np.cos(tam_note))
-    for _ in range(5):
+        s2i = np.sin(2 * im)
+        bb = 0.5 * np.sin(im)**2
+        asp = threej2req2 / am * (bb * c2l + (1 - 3.5 * bb) * zm * cl + (1 - 2.5 * bb) * etam * sl + 3.5 * bb * (zm * c3l + etam * s3l))
+        am_new = aos[active] - asp
+        threej2req2_over2_am2 = threej2req2 / 2 / am_new**2
+        isp = threej2req2_over2_am2 / 4 * s2i * (c2l - zm * cl + etam * sl + 7/3 * (zm * c3l + etam * s3l))
+        im_new = ios[active] - isp
+        ci = np.cos(im_new)
+        bb = 0.5 * np.sin(im_new)**2
+        ransp = threej2req2_over2_am2 * ci * (0.5 * s2l - 3.5 * zm * sl + 2.5 * etam * cl + 7/6 * (zm * s3l - etam * c3l))
+        ranm[active] = ranos[active] - ransp
+        lamsp = threej2req2_over2_am2 * (-0.5 * (1 - 5 * bb) * s2l + (7 - 77/4 * bb) * zm * sl - (6 - 55/4 * bb) * etam * cl - (7/6 - 77/12 * bb) * (zm * s3l - etam * c3l))
+        lamm_new = lamos_k - lamsp
+        sl = np.sin(lamm_new)
+        cl = np.cos(lamm_new)
+        s2l = np.sin(2 * lamm_new)
+        c2l = np.cos(2 * lamm_new)
+        s3l = np.sin(3 * lamm_new)
+        c3l = np.cos(3 * lamm_new)
+        s4l = np.sin(4 * lamm_new)
+        c4l = np.cos(4 * lamm_new)
+        zsp = threej2req2_over2_am2 * ((1 - 2.5 * bb) * cl + 7/6 * bb * c3l + (1.5 - 5 * bb) * zm * c2l + (2 - 3 * bb) * etam * s2l + 17/4 * bb * (zm * c4l + etam * s4l))
+        zm_new = zos_k - zsp
+        etasp = threej2req2_over2_am2 * ((1 - 3.5 * bb) * sl + 7/6 * bb * s3l + (1 - 6 * bb) * zm_new * s2l - (1.5 - 4 * bb) * etam * c2l + 17/4 * bb * (zm_new * s4l - etam * c4l))
+        etam_new = etaos_k - etasp
+        new = np.column_stack([am_new, im_new, lamm_new, zm_new, etam_new])
+        change = np.abs(new - state[active])
+        change[:, 0] /= am_new
+        state[active] = new
+        active = active[np.max(change, axis=1) > tol]
+    am, im, lamm, zm, etam = state.T
+    em = np.sqrt(etam**2 + zm**2)
+    apm = np.zeros_like(em)
+    check_em = em > 1.0e-8
+    apm[check_em] = np.arctan2(etam[check_em], zm[check_em])
+    mam = np.mod(lamm - apm, pi2)
+    return np.column_stack([am, em, im, ranm, apm]), mam
+
+def _osc2mean_note(oeosc, maos, threej2req2, tol, max_iter):
+    # Classical elements for eos >= 0.01
+    pi2 = 2.0 * np.pi
+    aos, eos, ios, ranos, apos = oeosc[:, :5].T
+    tam = true_anomaly(kepler_solve(maos, eos), eos)
+    hm = aos * (1 - eos**2) / (1 + eos * np.cos(tam))
+    # state: am, em, im, apm, mam, tam, hm
+    state = np.column_stack([aos, eos, ios, apos, maos, tam, hm])
+    ranm = ranos.copy()
+    active = np.arange(len(aos))
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        am, em, im, apm, mam, tam, hm = state[active].T
+        aos_k, eos_k, ios_k, ranos_k, apos_k, maos_k = aos[active], eos[active], ios[active], ranos[active], apos[active], maos[active]
+        one_minus_em2 = 1 - em**2
+        pm = am * one_minus_em2
+        si2 = np.sin(im)**2
+        aa = 1/3 - 0.5 * si2
+        bb = 0.5 * si2
+        um = np.mod(apm + tam, pi2)
         cos2um = np.cos(2 * um)
         sin2um = np.sin(2 * um)
-        asp_note = threej2req2 / am_note * ((am_note / hm)**3 * (aa_note + bb_note * cos2um) - aa_note * one_minus_emnote**(-1.5))
-        am_note = aos_note - asp_note
-        isp_note = threej2req2 / 8 / pm_note**2 * np.sin(2 * im_note) * (cos2um + em_note * np.cos(tam_note + 2 * apm_note) + 1/3 * em_note * np.cos(3 * tam_note + 2 * apm_note))
-        im_note = ios_note - isp_note
-        si2_enote = np.sin(im_note)**2
-        aa_note = 1/3 - 0.5 * si2_enote
-        bb_note = 0.5 * si2_enote
-        esp_note = threej2req2 / 2 / am_note**2 * (one_minus_emnote / em_note * ((am_note / hm)**3 * (aa_note + bb_note * cos2um) - aa_note * one_minus_emnote**(-1.5)) - bb_note / (em_note * one_minus_emnote) * (cos2um + em_note * np.cos(tam_note + 2 * apm_note) + em_note * np.cos(3 * tam_note + 2 * apm_note) / 3))
-        em_note = eos_note - esp_note
-        em_note2 = em_note**2
-        one_minus_emnote = 1 - em_note2
-        pm_note = am_note * one_minus_emnote
-        hm = pm_note / (1.0 + em_note * np.cos(tam_note))
-        tam_note = np.mod(tam_note, pi2)
-        mam_note = np.mod(mam_note, pi2)
-        eqoc = np.zeros_like(mam_note)
-        check_tam = (np.abs(tam_note - np.pi) <= 1.0e-06) | (np.abs(mam_note - np.pi) <= 1.0e-06) | (np.abs(tam_note) <= 1.0e-06) | (np.abs(mam_note) <= 1.0e-06)
-        eqoc[~check_tam] = tam_note[~check_tam] - mam_note[~check_tam]
-        threej2req2_over2pm2 = threej2req2 / 2 / pm_note**2
-        ransp_note = -threej2req2_over2pm2 * np.cos(im_note) * (eqoc + em_note * np.sin(tam_note) - 0.5 * sin2um - 0.5 * em_note * np.sin(tam_note + 2 * apm_note) - 1/6 * em_note * np.sin(3 * tam_note + 2 * apm_note))
-        ranm_note = ranos_note - ransp_note
-        apsp = threej2req2_over2pm2 * ((2 - 5 * bb_note) * (eqoc + em_note * np.sin(tam_note)) + (1 - 3 * bb_note) * ((1 - 0.25 * em_note2) * np.sin(tam_note) / em_note + 0.5 * np.sin(2 * tam_note) + em_note * np.sin(3 * tam_note + 2 * apm_note) / 12) - (0.5 * bb_note + (0.5 - 15/8 * bb_note) * em_note2) / em_note * np.sin(tam_note + 2 * apm_note) + em_note / 8 * bb_note * np.sin(tam_note - 2 * apm_note) - 0.5 * (1 - 5 * bb_note) * sin2um + (7/6 * bb_note - 1/6 * em_note2 * (1 - 19/4 * bb_note)) / em_note * np.sin(3 * tam_note + 2 * apm_note) + 0.75 * bb_note * np.sin(4 * tam_note + 2 * apm_note) + em_note / 8 * bb_note * np.sin(5 * tam_note + 2 * apm_note))
-        apm_note = apos_note - apsp
-        masp = threej2req2_over2pm2 * np.sqrt(one_minus_emnote) / em_note * (-(1 - 3 * bb_note) * ((1 - em_note2 / 4) * np.sin(tam_note) + em_note / 2 * np.sin(2 * tam_note) + em_note2 / 12 * np.sin(3 * tam_note)) + bb_note * (0.5 * (1 + 1.25 * em_note2) * np.sin(tam_note + 2 * apm_note) - em_note2 / 8 * np.sin(tam_note - 2 * apm_note) - 7/6 * (1 - em_note2 / 28) * np.sin(3 * tam_note + 2 * apm_note) - 0.75 * em_note * np.sin(4 * tam_note + 2 * apm_note) - em_note2 / 8 * np.sin(5 * tam_note + 2 * apm_note)))
-        mam_note = maos_note - masp
-        n_sats = em_note.size
-        # Placeholder for kepler1_C_tanom/kepler1_vec_tanom
-        tam_note = np.zeros_like(mam_note)  # TODO: Replace with actual anomaly solver
-        um = np.mod(apm_note + tam_note, pi2)
-    oemean = np.zeros((oeosc.shape[0], 6))
-    em = np.concatenate([em_e, em_note])
-    mod_mam = np.mod(np.concatenate([mam_e, mam_note]), pi2)
-    n_sats = em.size
-    # Placeholder for kepler1_C_tanom/kepler1_vec_tanom
-    tanom = np.zeros_like(mod_mam)  # TODO: Replace with actual anomaly solver
-    idx = np.concatenate([find_e, find_note])
-    oemean[idx, :] = np.column_stack([
-        np.concatenate([am_e, am_note]),
-        em,
-        np.concatenate([im_e, im_note]),
-        np.concatenate([ranm_e, ranm_note]),
-        np.concatenate([apm_e, apm_note]),
-        tanom
-    ])
-    return oemean 
\ No newline at end of file
+        # Trigonometric terms shared by the corrections (old argument of perigee)
+        st, s2t, s3t = np.sin(tam), np.sin(2 * tam), np.sin(3 * tam)
+        c_t2w, c_3t2w = np.cos(tam + 2 * apm), np.cos(3 * tam + 2 * apm)
+        s_t2w, s_3t2w = np.sin(tam + 2 * apm), np.sin(3 * tam + 2 * apm)
+        s_tm2w, s_4t2w, s_5t2w = np.sin(tam - 2 * apm), np.sin(4 * tam + 2 * apm), np.sin(5 * tam + 2 * apm)
+        asp = threej2req2 / am * ((am / hm)**3 * (aa + bb * cos2um) - aa * one_minus_em2**(-1.5))
+        am_new = aos_k - asp
+        isp = threej2req2 / 8 / pm**2 * np.sin(2 * im) * (cos2um + em * c_t2w + 1/3 * em * c_3t2w)
+        im_new = ios_k - isp
+        si2 = np.sin(im_new)**2
+        aa = 1/3 - 0.5 * si2
+        bb = 0.5 * si2
+        esp = threej2req2 / 2 / am_new**2 * (one_minus_em2 / em * ((am_new / hm)**3 * (aa + bb * cos2um) - aa * one_minus_em2**(-1.5)) - bb / (em * one_minus_em2) * (cos2um + em * c_t2w + em * c_3t2w / 3))
+        em_new = eos_k - esp
+        em2 = em_new**2
+        one_minus_em2 = 1 - em2
+        pm = am_new * one_minus_em2
+        hm_new = pm / (1.0 + em_new * np.cos(tam))
+        tam = np.mod(tam, pi2)
+        mam = np.mod(mam, pi2)
+        eqoc = np.zeros_like(mam)
+        check_tam = (np.abs(tam - np.pi) <= 1.0e-06) | (np.abs(mam - np.pi) <= 1.0e-06) | (np.abs(tam) <= 1.0e-06) | (np.abs(mam) <= 1.0e-06)
+        eqoc[~check_tam] = tam[~check_tam] - mam[~check_tam]
+        threej2req2_over2pm2 = threej2req2 / 2 / pm**2
+        ransp = -threej2req2_over2pm2 * np.cos(im_new) * (eqoc + em_new * st - 0.5 * sin2um - 0.5 * em_new * s_t2w - 1/6 * em_new * s_3t2w)
+        ranm[active] = ranos_k - ransp
+        apsp = threej2req2_over2pm2 * ((2 - 5 * bb) * (eqoc + em_new * st) + (1 - 3 * bb) * ((1 - 0.25 * em2) * st / em_new + 0.5 * s2t + em_new * s_3t2w / 12) - (0.5 * bb + (0.5 - 15/8 * bb) * em2) / em_new * s_t2w + em_new / 8 * bb * s_tm2w - 0.5 * (1 - 5 * bb) * sin2um + (7/6 * bb - 1/6 * em2 * (1 - 19/4 * bb)) / em_new * s_3t2w + 0.75 * bb * s_4t2w + em_new / 8 * bb * s_5t2w)
+        apm_new = apos_k - apsp
+        two_apm = 2 * apm_new
+        masp = threej2req2_over2pm2 * np.sqrt(one_minus_em2) / em_new * (-(1 - 3 * bb) * ((1 - em2 / 4) * st + em_new / 2 * s2t + em2 / 12 * s3t) + bb * (0.5 * (1 + 1.25 * em2) * np.sin(tam + two_apm) - em2 / 8 * np.sin(tam - two_apm) - 7/6 * (1 - em2 / 28) * np.sin(3 * tam + two_apm) - 0.75 * em_new * np.sin(4 * tam + two_apm) - em2 / 8 * np.sin(5 * tam + two_apm)))
+        mam_new = maos_k - masp
+        tam_new = true_anomaly(kepler_solve(mam_new, em_new), em_new)
+        new = np.column_stack([am_new, em_new, im_new, apm_new, mam_new, tam_new, hm_new])
+        change = np.abs(new[:, :5] - state[active, :5])
+        change[:, 0] /= am_new
+        state[active] = new
+        active = active[np.max(change, axis=1) > tol]
+    am, em, im, apm, mam = state[:, :5].T
+    return np.column_stack([am, em, im, ranm, apm]), mam
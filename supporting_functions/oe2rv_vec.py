@@ -0,0 +1,75 @@
+"""
+Orbital elements to position and velocity, vectorized
+Python version of oe2rv_vec.m
+"""
+
+import numpy as np
+from new_analytic_propagator.kepler_solve import kepler_solve
+
+def oe2rv_vec(oe, mu, E=None, out=None, dtype=float):
+    """
+    Convert classical orbital elements to ECI position and velocity
+
+    The sines and cosines of inclination, RAAN and argument of perigee are
+    evaluated once per object and the perifocal frame is projected column by
+    column into the output buffers.
+
+    Parameters:
+    -----------
+    oe : array-like
+        Orbital elements [a,ecco,inclo,nodeo,argpo,mo], shape (n_objects, 6), a in km
+    mu : float
+        Gravitational parameter [km^3/s^2]
+    E : array-like, optional
+        Eccentric anomaly [rad], shape (n_objects,); solved from mo if not given
+    out : tuple of ndarray, optional
+        Buffers (r_eci, v_eci) of shape (n_objects, 3) written in place
+    dtype : data-type, optional
+        Type of the returned arrays when out is not given (float32 is
+        enough for collision screening)
+
+    Returns:
+    --------
+    r_eci : ndarray
+        Position vectors [km], shape (n_objects, 3)
+    v_eci : ndarray
+        Velocity vectors [km/s], shape (n_objects, 3)
+    """
+
+    oe = np.asarray(oe)
+    a = oe[:, 0]
+    e = oe[:, 1]
+    if E is None:
+        E = kepler_solve(oe[:, 5], e)
+
+    if out is None:
+        r_eci = np.empty((len(oe), 3), dtype=dtype)
+        v_eci = np.empty((len(oe), 3), dtype=dtype)
+    else:
+        r_eci, v_eci = out
+
+    cE = np.cos(E)
+    sE = np.sin(E)
+    sqrt_1me2 = np.sqrt(1 - e**2)
+
+    # Perifocal position and velocity
+    x_p = a * (cE - e)
+    y_p = a * sqrt_1me2 * sE
+    v_fac = np.sqrt(mu / a) / (1 - e * cE)
+    vx_p = -v_fac * sE
+    vy_p = v_fac * sqrt_1me2 * cE
+
+    # Perifocal unit vectors P and Q in ECI
+    ci, si = np.cos(oe[:, 2]), np.sin(oe[:, 2])
+    cO, sO = np.cos(oe[:, 3]), np.sin(oe[:, 3])
+    cw, sw = np.cos(oe[:, 4]), np.sin(oe[:, 4])
+    sw_ci = sw * ci
+    cw_ci = cw * ci
+    P = (cO * cw - sO * sw_ci, sO * cw + cO * sw_ci, sw * si)
+    Q = (-cO * sw - sO * cw_ci, -sO * sw + cO * cw_ci, cw * si)
+
+    for k in range(3):
+        r_eci[:, k] = x_p * P[k] + y_p * Q[k]
+        v_eci[:, k] = vx_p * P[k] + vy_p * Q[k]
+
+    return r_eci, v_eci
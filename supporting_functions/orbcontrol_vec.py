@@ -6,8 +6,9 @@ Python version of orbcontrol_vec.m
 import numpy as np
 from datetime import timedelta
 from astropy.time import Time
+from prop_mit_vec import mean_oe2rv
 
-def orbcontrol_vec(mat_sat_in, tsince, time0, orbtol, PMD, DAY2MIN, YEAR2DAY, param):
+def orbcontrol_vec(mat_sat_in, tsince, time0, orbtol, PMD, DAY2MIN, YEAR2DAY, param, rng=None):
     """
     Orbit control for satellites
     
@@ -29,6 +30,8 @@ def orbcontrol_vec(mat_sat_in, tsince, time0, orbtol, PMD, DAY2MIN, YEAR2DAY, pa
         Days per year
     param : dict
         Parameters dictionary
+    rng : numpy.random.RandomState, optional
+        Random number generator (defaults to the global np.random state)
         
     Returns:
     --------
@@ -41,21 +44,73 @@ def orbcontrol_vec(mat_sat_in, tsince, time0, orbtol, PMD, DAY2MIN, YEAR2DAY, pa
     # Convert to numpy array if needed
     mat_sat_in = np.asarray(mat_sat_in)
     
+    # Work on copies so the caller's matrix is left untouched
+    oe = mat_sat_in[:, 0:6].copy()
+    controlled = mat_sat_in[:, 6].copy()
+    r_out = mat_sat_in[:, 10:13].copy()
+    v_out = mat_sat_in[:, 13:16].copy()
+    
+    deorbit = orbcontrol_vec_cols(oe, controlled, mat_sat_in[:, 7], mat_sat_in[:, 8], mat_sat_in[:, 9],
+                                  r_out, v_out, tsince, time0, orbtol, PMD, DAY2MIN, YEAR2DAY, param, rng=rng)
+    if len(deorbit) == 0:
+        deorbit = np.array([])
+    
+    # Combine output
+    mat_sat_out = np.column_stack([oe[:, 0], controlled, r_out, v_out])
+    
+    return mat_sat_out, deorbit
+
+def orbcontrol_vec_cols(oe, controlled, a_desired, missionlife, launched, r, v,
+                        tsince, time0, orbtol, PMD, DAY2MIN, YEAR2DAY, param, active=None, rng=None):
+    """
+    Orbit control operating in place on population columns
+    
+    Parameters:
+    -----------
+    oe : ndarray
+        Mean orbital elements [a,ecco,inclo,nodeo,argpo,mo], shape (n_sats, 6); the
+        semi-major axis of satellites beyond tolerance is reset in place
+    controlled : ndarray
+        Controlled flag, shape (n_sats,); cleared in place for satellites that
+        become derelict after their mission life
+    a_desired : array-like
+        Desired semi-major axis [Earth radii], shape (n_sats,)
+    missionlife : array-like
+        Mission lifetime [years], shape (n_sats,)
+    launched : array-like
+        Launch date [JD], shape (n_sats,)
+    r, v : ndarray
+        Position [km] and velocity [km/s], shape (n_sats, 3); reset in place
+        for satellites whose semi-major axis is reset
+    tsince, time0, orbtol, PMD, DAY2MIN, YEAR2DAY, param :
+        As in orbcontrol_vec
+    active : array-like of bool, optional
+        Rows to consider (e.g. the live flags of a PopulationStore); all rows
+        if not given
+    rng : numpy.random.RandomState, optional
+        Random number generator (defaults to the global np.random state)
+        
+    Returns:
+    --------
+    deorbit : ndarray
+        Row indices of satellites deorbited by post-mission disposal
+    """
+    
+    if rng is None:
+        rng = np.random
+    
     # Calculate current time
     current_time = time0 + timedelta(minutes=tsince)
     
-    # Extract input data
-    controlled = mat_sat_in[:, 6]
-    a_desired = mat_sat_in[:, 7]
-    missionlife = mat_sat_in[:, 8]
-    launched = mat_sat_in[:, 9]
-    
-    a_out = mat_sat_in[:, 0].copy()
-    r_out = mat_sat_in[:, 10:13].copy()
-    v_out = mat_sat_in[:, 13:16].copy()
+    a_out = oe[:, 0]
     
     # Find controlled satellites
-    is_controlled = np.where(controlled == 1)[0]
+    is_controlled = controlled == 1
+    if active is not None:
+        is_controlled &= active
+    is_controlled = np.flatnonzero(is_controlled)
+    
+    deorbit = np.array([], dtype=int)
     
     if len(is_controlled) > 0:
         a_current = a_out[is_controlled]  # semi-major axis of controlled satellites
@@ -68,17 +123,11 @@ def orbcontrol_vec(mat_sat_in, tsince, time0, orbtol, PMD, DAY2MIN, YEAR2DAY, pa
             # Reset semi-major axis of controlled satellites beyond tolerance
             a_out[find_control] = a_desired[find_control]
             
-            # Compute new osculating elements
-            # TODO: Implement mean2osc_m_vec properly
-            # For now, use simple conversion
-            osc_oe = simple_mean2osc([a_out[find_control] * param['req'], 
-                                    mat_sat_in[find_control, 1:6]], param)
-            
-            # Reset position and velocity
-            # TODO: Implement oe2rv_vec properly
-            r_new, v_new = simple_oe2rv_control(osc_oe, param)
-            r_out[find_control, :] = r_new
-            v_out[find_control, :] = v_new
+            # Reset position and velocity (mean to osculating elements, then oe2rv)
+            r_new, v_new = mean_oe2rv(np.column_stack([a_out[find_control] * param['req'],
+                                                       oe[find_control, 1:6]]), param)
+            r[find_control, :] = r_new
+            v[find_control, :] = v_new
         
         # Satellites past their mission life
         current_jd = Time(current_time).jd
@@ -89,7 +138,7 @@ def orbcontrol_vec(mat_sat_in, tsince, time0, orbtol, PMD, DAY2MIN, YEAR2DAY, pa
         
         if len(find_life) > 0:
             # Generate random number for each satellite beyond life
-            rand_life = np.random.random(len(find_life))
+            rand_life = rng.random(len(find_life))
             check_PMD = PMD < rand_life  # check if PMD is fulfilled
             
             # From active becomes inactive
@@ -97,44 +146,5 @@ def orbcontrol_vec(mat_sat_in, tsince, time0, orbtol, PMD, DAY2MIN, YEAR2DAY, pa
             
             # Deorbited satellites
             deorbit = find_life[~check_PMD]
-        else:
-            deorbit = np.array([])
-    else:
-        deorbit = np.array([])
-    
-    # Combine output
-    mat_sat_out = np.column_stack([a_out, controlled, r_out, v_out])
-    
-    return mat_sat_out, deorbit
-
-def simple_mean2osc(mean_oe, param):
-    """
-    Simple mean to osculating conversion (placeholder)
-    """
-    # For now, just return mean elements as osculating
-    return mean_oe
-
-def simple_oe2rv_control(oe, param):
-    """
-    Simple orbital elements to position/velocity conversion for control
-    """
-    # This is a simplified version
-    n_objects = len(oe)
-    r_eci = np.zeros((n_objects, 3))
-    v_eci = np.zeros((n_objects, 3))
-    
-    # Simple conversion (placeholder)
-    for i in range(n_objects):
-        a, e, i, omega, w, M = oe[i, :]
-        mu = param['mu']
-        
-        # Convert to position and velocity (simplified)
-        r_eci[i, 0] = a * (1 - e**2) / (1 + e * np.cos(M))
-        r_eci[i, 1] = 0
-        r_eci[i, 2] = 0
-        
-        v_eci[i, 0] = 0
-        v_eci[i, 1] = np.sqrt(mu / a) * (1 + e * np.cos(M))
-        v_eci[i, 2] = 0
     
-    return r_eci, v_eci 
\ No newline at end of file
+    return deorbit
@@ -0,0 +1,336 @@
+"""
+Capacity-managed, columnar population storage for mat_sats
+Replaces per-step np.delete / np.vstack rebuilds of the satellite matrix
+"""
+
+import numpy as np
+from getidx import (idx_a, idx_ecco, idx_inclo, idx_nodeo, idx_argpo, idx_mo, idx_bstar,
+                    idx_mass, idx_radius, idx_error, idx_controlled, idx_a_desired,
+                    idx_missionlife, idx_constel, idx_date_created, idx_launch_date,
+                    idx_r, idx_v, idx_objectclass, idx_ID)
+
+# Number of columns of the legacy mat_sats matrix
+N_MATSATS_COLS = 24
+
+# Population fields: (name, dtype, mat_sats column or list of columns)
+# Fields mapped to a list of columns are stored as 2-D (n, len(columns)) arrays
+POP_FIELDS = (
+    ('oe', np.float64, [idx_a, idx_ecco, idx_inclo, idx_nodeo, idx_argpo, idx_mo]),
+    ('bstar', np.float64, idx_bstar),
+    ('mass', np.float64, idx_mass),
+    ('radius', np.float64, idx_radius),
+    ('error', np.int8, idx_error),
+    ('controlled', np.int8, idx_controlled),
+    ('a_desired', np.float64, idx_a_desired),
+    ('missionlife', np.float64, idx_missionlife),
+    ('constel', np.int8, idx_constel),
+    ('date_created', np.float64, idx_date_created),
+    ('launch_date', np.float64, idx_launch_date),
+    ('r', np.float64, idx_r),
+    ('v', np.float64, idx_v),
+    ('objectclass', np.int32, idx_objectclass),
+    ('ID', np.int64, idx_ID),
+)
+
+def matsats_to_columns(mat_sats):
+    """
+    Split a legacy mat_sats matrix into typed population columns
+
+    Parameters:
+    -----------
+    mat_sats : array-like
+        Satellite matrix, shape (n_sats, 24)
+
+    Returns:
+    --------
+    cols : dict
+        Field name -> array, typed as in POP_FIELDS
+
+    Notes:
+    ------
+    NaN entries of integer fields (flags, object class, ID) are stored as 0.
+    """
+    mat_sats = np.asarray(mat_sats, dtype=float)
+    if mat_sats.size == 0:
+        mat_sats = mat_sats.reshape(0, N_MATSATS_COLS)
+    mat_sats = np.atleast_2d(mat_sats)
+
+    cols = {}
+    for name, dtype, col in POP_FIELDS:
+        values = mat_sats[:, col]
+        if np.issubdtype(dtype, np.integer):
+            values = np.nan_to_num(values, nan=0.0)
+        cols[name] = np.ascontiguousarray(values, dtype=dtype)
+    return cols
+
+def columns_to_matsats(cols, rows=None):
+    """
+    Assemble a legacy mat_sats matrix from population columns
+
+    Parameters:
+    -----------
+    cols : dict or PopulationStore
+        Field name -> array
+    rows : array-like, optional
+        Rows to extract (all rows if not given)
+
+    Returns:
+    --------
+    mat_sats : ndarray
+        Satellite matrix, shape (n_rows, 24)
+    """
+    n_rows = len(cols['ID']) if rows is None else len(rows)
+    mat_sats = np.zeros((n_rows, N_MATSATS_COLS))
+    for name, _, col in POP_FIELDS:
+        values = cols[name] if rows is None else cols[name][rows]
+        mat_sats[:, col] = values
+    return mat_sats
+
+class PopulationStore:
+    """
+    Preallocated columnar population storage with tombstoned removal and lazy compaction
+
+    Every field of POP_FIELDS is kept in its own typed array of ``capacity``
+    slots; ``store[name]`` returns a zero-copy view of the used slots that can
+    be handed to the vectorized propagation, control and collision functions.
+    Only the first ``n_slots`` slots are in use; a slot is either live or a
+    tombstone. Removal flips the live flag of the removed slots (O(removed)),
+    insertion writes new rows after the last used slot and grows the arrays
+    geometrically when full (amortized O(added)). Tombstones are squeezed out
+    by ``compact``, which keeps the relative order of live rows, so the live
+    population always reads in the same order as the equivalent
+    np.delete / np.vstack sequence on mat_sats.
+
+    Parameters:
+    -----------
+    mat_sats : array-like
+        Initial satellite matrix, shape (n_sats, 24)
+    capacity : int, optional
+        Initial number of slots (defaults to twice the initial population)
+    growth : float
+        Growth factor applied to the capacity when the arrays are full
+    compact_ratio : float
+        Fraction of tombstoned slots above which ``maybe_compact`` compacts
+    """
+
+    def __init__(self, mat_sats, capacity=None, growth=1.5, compact_ratio=0.25):
+        cols = matsats_to_columns(mat_sats)
+        n_sats = len(cols['ID'])
+
+        if capacity is None:
+            capacity = 2 * n_sats
+        capacity = max(int(capacity), n_sats, 16)
+
+        self.growth = growth
+        self.compact_ratio = compact_ratio
+
+        self._cols = {}
+        for name, dtype, col in POP_FIELDS:
+            shape = (capacity, len(col)) if isinstance(col, list) else (capacity,)
+            self._cols[name] = np.zeros(shape, dtype=dtype)
+            self._cols[name][:n_sats] = cols[name]
+        self._live = np.zeros(capacity, dtype=bool)
+        self._live[:n_sats] = True
+        self._n_slots = n_sats
+        self._n_dead = 0
+        self._rows = None
+
+    def __len__(self):
+        return self._n_slots - self._n_dead
+
+    def __getitem__(self, name):
+        """View of field ``name`` over the used slots, tombstones included"""
+        return self._cols[name][:self._n_slots]
+
+    @property
+    def capacity(self):
+        return self._live.shape[0]
+
+    @property
+    def n_slots(self):
+        """Number of slots in use (live rows plus tombstones)"""
+        return self._n_slots
+
+    @property
+    def n_dead(self):
+        """Number of tombstoned slots awaiting compaction"""
+        return self._n_dead
+
+    @property
+    def live(self):
+        """View of the live flags of the used slots"""
+        return self._live[:self._n_slots]
+
+    def nbytes_per_row(self):
+        """Storage cost of one population row in bytes (live flag included)"""
+        return sum(arr[:1].nbytes for arr in self._cols.values()) + self._live.itemsize
+
+    def live_rows(self):
+        """
+        Slot indices of the live rows, in population order
+
+        The result is cached until the next removal, insertion or compaction;
+        callers must not modify it.
+        """
+        if self._rows is None:
+            if self._n_dead == 0:
+                self._rows = np.arange(self._n_slots)
+            else:
+                self._rows = np.flatnonzero(self._live[:self._n_slots])
+        return self._rows
+
+    def remove(self, rows):
+        """
+        Tombstone the given slots
+
+        Parameters:
+        -----------
+        rows : array-like
+            Slot indices (as returned by ``live_rows``); duplicates and slots
+            that are already tombstoned are ignored
+
+        Returns:
+        --------
+        n_removed : int
+            Number of rows that were live before the call
+        """
+        rows = np.asarray(rows, dtype=np.intp).ravel()
+        if rows.size == 0:
+            return 0
+        rows = rows[self._live[rows]]
+        if rows.size == 0:
+            return 0
+        rows = np.unique(rows)
+        self._live[rows] = False
+        self._n_dead += rows.size
+        self._rows = None
+        return int(rows.size)
+
+    def append(self, new_rows):
+        """
+        Add rows after the last used slot, growing the arrays when needed
+
+        Parameters:
+        -----------
+        new_rows : array-like
+            Rows in mat_sats format, shape (n_new, 24) or a list of rows
+
+        Returns:
+        --------
+        slots : ndarray
+            Slot indices of the appended rows
+        """
+        if len(new_rows) == 0:
+            return np.array([], dtype=np.intp)
+        cols = matsats_to_columns(new_rows)
+        n_new = len(cols['ID'])
+
+        self._reserve(self._n_slots + n_new)
+
+        start = self._n_slots
+        for name in self._cols:
+            self._cols[name][start:start + n_new] = cols[name]
+        self._live[start:start + n_new] = True
+        self._n_slots += n_new
+        self._rows = None
+        return np.arange(start, start + n_new)
+
+    def compact(self):
+        """
+        Squeeze out tombstones, preserving the order of live rows
+
+        Returns:
+        --------
+        remap : ndarray or None
+            New slot index for every old used slot (-1 for tombstones), or None
+            if there was nothing to compact
+        """
+        if self._n_dead == 0:
+            return None
+        n_slots = self._n_slots
+        keep = np.flatnonzero(self._live[:n_slots])
+        n_live = keep.size
+
+        remap = np.full(n_slots, -1, dtype=np.intp)
+        remap[keep] = np.arange(n_live)
+
+        # Live rows only ever move towards the front, so the gathered block can
+        # be written back into the same arrays
+        for arr in self._cols.values():
+            arr[:n_live] = arr[keep]
+        self._live[:n_live] = True
+        self._live[n_live:n_slots] = False
+        self._n_slots = n_live
+        self._n_dead = 0
+        self._rows = None
+        return remap
+
+    def maybe_compact(self):
+        """Compact once the tombstoned fraction exceeds ``compact_ratio``"""
+        if self._n_dead > 0 and self._n_dead > self.compact_ratio * self._n_slots:
+            return self.compact()
+        return None
+
+    def to_arrays(self):
+        """
+        Copy of the used slots of every field, tombstones and live flags included
+
+        Returns:
+        --------
+        arrays : dict
+            Field name -> array, plus 'live' (bool); restores the exact slot
+            layout through ``from_arrays``
+        """
+        arrays = {name: self[name].copy() for name in self._cols}
+        arrays['live'] = self.live.copy()
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, capacity=None, growth=1.5, compact_ratio=0.25):
+        """
+        Rebuild a store from the output of ``to_arrays``
+
+        Parameters:
+        -----------
+        arrays : dict
+            Field name -> array over the used slots, plus 'live'
+        capacity : int, optional
+            Initial number of slots (defaults to twice the used slots)
+        """
+        live = np.asarray(arrays['live'], dtype=bool)
+        n_slots = live.shape[0]
+        store = cls(np.zeros((0, N_MATSATS_COLS)), capacity=2 * n_slots if capacity is None else capacity,
+                    growth=growth, compact_ratio=compact_ratio)
+        store._reserve(n_slots)
+        for name, dtype, _ in POP_FIELDS:
+            store._cols[name][:n_slots] = np.asarray(arrays[name], dtype=dtype)
+        store._live[:n_slots] = live
+        store._n_slots = n_slots
+        store._n_dead = int(n_slots - np.count_nonzero(live))
+        return store
+
+    def to_matrix(self, rows=None):
+        """
+        Return a copy of the population in legacy mat_sats format
+
+        Parameters:
+        -----------
+        rows : array-like, optional
+            Slot indices to extract (all live rows, in order, if not given)
+        """
+        if rows is None:
+            rows = self.live_rows()
+        return columns_to_matsats(self._cols, np.asarray(rows, dtype=np.intp))
+
+    def _reserve(self, n_required):
+        capacity = self.capacity
+        if n_required <= capacity:
+            return
+        new_capacity = max(n_required, int(np.ceil(capacity * self.growth)))
+        for name, arr in self._cols.items():
+            grown = np.zeros((new_capacity,) + arr.shape[1:], dtype=arr.dtype)
+            grown[:self._n_slots] = arr[:self._n_slots]
+            self._cols[name] = grown
+        live = np.zeros(new_capacity, dtype=bool)
+        live[:self._n_slots] = self._live[:self._n_slots]
+        self._live = live
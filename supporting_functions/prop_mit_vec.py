@@ -4,6 +4,9 @@ Python version of prop_mit_vec.m
 """
 
 import numpy as np
+from oe2rv_vec import oe2rv_vec
+from new_analytic_propagator.analytic_propagation_vec import analytic_propagation_vec
+from new_analytic_propagator.mean2osc_m_vec import mean2osc_m_vec
 
 def prop_mit_vec(mat_sat_in, t, param):
     """
@@ -26,28 +29,76 @@ def prop_mit_vec(mat_sat_in, t, param):
     
     mat_sat_in = np.asarray(mat_sat_in)
     
+    out_mean_oe, errors, r_eci, v_eci = prop_mit_vec_cols(
+        mat_sat_in[:, 0:6], mat_sat_in[:, 6], mat_sat_in[:, 7], t, param)
+    
+    mat_sat_out = np.column_stack([out_mean_oe, errors, r_eci, v_eci])
+    
+    return mat_sat_out
+
+def prop_mit_vec_cols(oe, bstar, controlled, t, param, out=None, rv_rows=None, check_rows=None):
+    """
+    MIT propagator operating on population columns
+    
+    Parameters:
+    -----------
+    oe : array-like
+        Mean orbital elements [a,ecco,inclo,nodeo,argpo,mo], shape (n_sats, 6), a in Earth radii
+    bstar : array-like
+        B* drag term, shape (n_sats,)
+    controlled : array-like
+        Controlled flag, shape (n_sats,)
+    t : float
+        Propagation time [seconds]
+    param : dict
+        Propagation parameters
+    out : tuple of ndarray, optional
+        (oe, errors, r_eci, v_eci) arrays to write the results into; may alias
+        the input ``oe`` (e.g. views of a PopulationStore)
+    rv_rows : array-like, optional
+        Rows whose positions and velocities are computed (all rows if not
+        given); the other rows of r_eci/v_eci are left untouched, so only the
+        mean elements advance (an empty list skips the conversion entirely)
+    check_rows : array-like, optional
+        Rows tested for decay (all rows if not given); the other rows are
+        taken to stay in orbit and get no error flag (see DecaySchedule)
+        
+    Returns:
+    --------
+    out_mean_oe : ndarray
+        Propagated mean orbital elements, shape (n_sats, 6), a in Earth radii
+    errors : ndarray
+        Error flags (1 for decayed or invalid orbits), shape (n_sats,)
+    r_eci : ndarray
+        Position vectors [km], shape (n_sats, 3)
+    v_eci : ndarray
+        Velocity vectors [km/s], shape (n_sats, 3)
+    """
+    
+    oe = np.asarray(oe)
+    
     req = param['req']
     
     param['t'] = t
     param['t_0'] = 0
     
-    n_sat = mat_sat_in.shape[0]
+    n_sat = oe.shape[0]
     
-    in_mean_oe = np.column_stack([req * mat_sat_in[:, 0], mat_sat_in[:, 1:6]])
+    in_mean_oe = np.column_stack([req * oe[:, 0], oe[:, 1:6]])
     
-    Bstar = np.abs(mat_sat_in[:, 6])
+    Bstar = np.abs(bstar)
     Bstar[Bstar < 1e-12] = 9.7071e-05
     
     out_mean_oe = np.zeros((n_sat, 6))
     errors = np.zeros(n_sat)
     
     idx_notdecay = in_mean_oe[:, 0] * (1 - in_mean_oe[:, 1]) > req + 150
-    idx_controlled = mat_sat_in[:, 7] == 1
+    idx_controlled = np.asarray(controlled) == 1
     idx_propagate = idx_notdecay & ~idx_controlled
     
     if np.any(idx_propagate):
         param['Bstar'] = Bstar[idx_propagate]
-        out_mean_oe[idx_propagate, :], errors[idx_propagate] = simple_keplerian_propagation(
+        out_mean_oe[idx_propagate, :], errors[idx_propagate] = analytic_propagation_vec(
             in_mean_oe[idx_propagate, :], param)
     
     out_mean_oe[~idx_propagate, :] = in_mean_oe[~idx_propagate, :]
@@ -57,63 +108,107 @@ def prop_mit_vec(mat_sat_in, t, param):
         mean_motion = np.sqrt(param['mu'] / out_mean_oe[controlled_mask, 0]**3)
         out_mean_oe[controlled_mask, 5] += mean_motion * t
     
-    check_alt_ecc = (out_mean_oe[:, 0] * (1 - out_mean_oe[:, 1]) > req + 150) & (out_mean_oe[:, 1] < 1)
+    if check_rows is None:
+        check_alt_ecc = (out_mean_oe[:, 0] * (1 - out_mean_oe[:, 1]) > req + 150) & (out_mean_oe[:, 1] < 1)
+    else:
+        check_rows = np.asarray(check_rows, dtype=np.intp)
+        check_alt_ecc = np.ones(n_sat, dtype=bool)
+        check_alt_ecc[check_rows] = ((out_mean_oe[check_rows, 0] * (1 - out_mean_oe[check_rows, 1]) > req + 150)
+                                     & (out_mean_oe[check_rows, 1] < 1))
+        unchecked = np.ones(n_sat, dtype=bool)
+        unchecked[check_rows] = False
+        errors[unchecked] = 0
     errors[~check_alt_ecc] = 1
     
-    osc_oe = np.zeros((n_sat, 6))
-    E_osc = np.zeros(n_sat)
-    
-    if np.any(check_alt_ecc):
-        osc_oe[check_alt_ecc, :] = out_mean_oe[check_alt_ecc, :]
-        E_osc[check_alt_ecc] = out_mean_oe[check_alt_ecc, 5]
+    # Positions and velocities go straight into the output buffers
+    if out is None:
+        r_eci = np.zeros((n_sat, 3))
+        v_eci = np.zeros((n_sat, 3))
+    else:
+        r_eci, v_eci = out[2], out[3]
+    
+    if rv_rows is not None:
+        rv_rows = np.asarray(rv_rows, dtype=np.intp)
+        rv_valid = check_alt_ecc[rv_rows]
+        r_eci[rv_rows[~rv_valid], :] = 0
+        v_eci[rv_rows[~rv_valid], :] = 0
+        rv_rows = rv_rows[rv_valid]
+        if len(rv_rows) > 0:
+            r_eci[rv_rows, :], v_eci[rv_rows, :] = mean_oe2rv(out_mean_oe[rv_rows, :], param)
+    elif np.all(check_alt_ecc):
+        mean_oe2rv(out_mean_oe, param, out=(r_eci, v_eci))
+    else:
+        valid_indices = np.where(check_alt_ecc)[0]
+        r_eci[~check_alt_ecc, :] = 0
+        v_eci[~check_alt_ecc, :] = 0
+        if len(valid_indices) > 0:
+            r_eci[valid_indices, :], v_eci[valid_indices, :] = mean_oe2rv(
+                out_mean_oe[valid_indices, :], param)
     
     out_mean_oe[:, 0] = out_mean_oe[:, 0] / req
-    osc_oe[~check_alt_ecc, :] = out_mean_oe[~check_alt_ecc, :]
     
-    r_eci = np.zeros((n_sat, 3))
-    v_eci = np.zeros((n_sat, 3))
+    if out is None:
+        return out_mean_oe, errors, r_eci, v_eci
     
-    if np.any(check_alt_ecc):
-        valid_indices = np.where(check_alt_ecc)[0]
-        r_temp, v_temp = simple_oe2rv(
-            osc_oe[valid_indices, :], E_osc[valid_indices], param)
-        r_eci[valid_indices, :] = r_temp
-        v_eci[valid_indices, :] = v_temp
-    
-    mat_sat_out = np.column_stack([out_mean_oe, errors, r_eci, v_eci])
+    out_oe, out_errors = out[0], out[1]
+    out_oe[...] = out_mean_oe
+    out_errors[...] = errors
     
-    return mat_sat_out
+    return out_oe, out_errors, r_eci, v_eci
 
-def simple_keplerian_propagation(mean_oe, param):
+def prop_mean_anomaly_cols(oe, t, param, rows=None, dtype=float):
     """
-    Simple Keplerian propagation (placeholder for analytic_propagation_vec)
+    Positions and velocities after advancing only the mean anomaly
+    
+    Cheap intermediate epochs for collision screening: drag, J2 secular
+    rates and control are ignored, the other elements are kept fixed.
+    
+    Parameters:
+    -----------
+    oe : array-like
+        Mean orbital elements [a,ecco,inclo,nodeo,argpo,mo], shape (n_sats, 6), a in Earth radii
+    t : float
+        Time offset [seconds] (negative to go back in time)
+    param : dict
+        Propagation parameters (mu, req, j2)
+    rows : array-like, optional
+        Rows to evaluate (all rows if not given); other rows are returned as zeros
+    dtype : data-type, optional
+        Type of the returned arrays (float32 is enough for collision screening)
+        
+    Returns:
+    --------
+    r_eci : ndarray
+        Position vectors [km], shape (n_sats, 3)
+    v_eci : ndarray
+        Velocity vectors [km/s], shape (n_sats, 3)
     """
-    out_oe = mean_oe.copy()
-    errors = np.zeros(len(mean_oe))
     
-    mean_motion = np.sqrt(param['mu'] / mean_oe[:, 0]**3)
-    out_oe[:, 5] += mean_motion * param['t']
+    oe = np.asarray(oe)
+    n_sat = oe.shape[0]
+    all_rows = rows is None
+    rows = np.arange(n_sat) if all_rows else np.asarray(rows, dtype=np.intp)
+    
+    mean_oe = oe[rows, :].copy()
+    mean_oe[:, 0] *= param['req']
+    mean_oe[:, 5] += np.sqrt(param['mu'] / mean_oe[:, 0]**3) * t
+    
+    r_eci = np.zeros((n_sat, 3), dtype=dtype)
+    v_eci = np.zeros((n_sat, 3), dtype=dtype)
+    if all_rows:
+        mean_oe2rv(mean_oe, param, out=(r_eci, v_eci))
+    else:
+        r_eci[rows, :], v_eci[rows, :] = mean_oe2rv(mean_oe, param, dtype=dtype)
     
-    return out_oe, errors
+    return r_eci, v_eci
 
-def simple_oe2rv(oe, E, param):
+def mean_oe2rv(mean_oe, param, out=None, dtype=float):
     """
-    Simple orbital elements to position/velocity conversion (placeholder for oe2rv_vec)
-    """
-    n_objects = len(oe)
-    r_eci = np.zeros((n_objects, 3))
-    v_eci = np.zeros((n_objects, 3))
+    Mean orbital elements (a in km) to ECI position/velocity
     
-    for i in range(n_objects):
-        a, e, i_ang, omega, w, M = oe[i, :]
-        mu = param['mu']
-        
-        r_eci[i, 0] = a * (1 - e**2) / (1 + e * np.cos(M))
-        r_eci[i, 1] = 0
-        r_eci[i, 2] = 0
-        
-        v_eci[i, 0] = 0
-        v_eci[i, 1] = np.sqrt(mu / a) * (1 + e * np.cos(M))
-        v_eci[i, 2] = 0
-    
-    return r_eci, v_eci 
\ No newline at end of file
+    J2 short-period terms are added (mean to osculating) before the
+    conversion, as in prop_mit_vec.m. ``out`` and ``dtype`` are passed on
+    to oe2rv_vec.
+    """
+    osc_oe, _, E_osc = mean2osc_m_vec(mean_oe, param)
+    return oe2rv_vec(osc_oe, param['mu'], E=E_osc, out=out, dtype=dtype)
@@ -0,0 +1,140 @@
+"""
+SGP4 propagator vectorized
+Population-column interface to sgp4_vec, the counterpart of prop_mit_vec_cols
+"""
+
+import numpy as np
+from sgp4_vec import getgravc_vec, kozai_mean_motion, sgp4init_vec, sgp4_vec
+
+# Julian date of the SGP4 epoch origin (1949 December 31 00:00 UT)
+JD_SGP4_EPOCH = 2433281.5
+
+def prop_sgp4_vec_cols(oe, bstar, controlled, t, param, out=None, rv_rows=None):
+    """
+    SGP4/SDP4 propagator operating on population columns
+
+    Every call starts a fresh element set from the current mean elements
+    (epoch param['jd'] - t): the semi-major axis is taken as the SGP4
+    (un-Kozai) mean semi-major axis and B* as the TLE drag term, and the
+    SGP4 mean elements at param['jd'] are written back. Controlled objects
+    only advance their mean anomaly, as in prop_mit_vec_cols.
+
+    Parameters:
+    -----------
+    oe : array-like
+        Mean orbital elements [a,ecco,inclo,nodeo,argpo,mo], shape (n_sats, 6), a in Earth radii
+    bstar : array-like
+        B* drag term [1/Earth radii], shape (n_sats,)
+    controlled : array-like
+        Controlled flag, shape (n_sats,)
+    t : float
+        Propagation time [seconds]
+    param : dict
+        Propagation parameters (req, mu, jd at the end of the step and
+        optionally whichconst of getgravc_vec, 'wgs72' by default)
+    out : tuple of ndarray, optional
+        (oe, errors, r_eci, v_eci) arrays to write the results into; may alias
+        the input ``oe`` (e.g. views of a PopulationStore)
+    rv_rows : array-like, optional
+        Rows whose positions and velocities are written (all rows if not
+        given); the other rows of r_eci/v_eci are left untouched
+
+    Returns:
+    --------
+    out_mean_oe : ndarray
+        Propagated mean orbital elements, shape (n_sats, 6), a in Earth radii
+    errors : ndarray
+        Error flags (1 for decayed, invalid or SGP4-failed orbits), shape (n_sats,)
+    r_eci : ndarray
+        TEME position vectors [km], shape (n_sats, 3)
+    v_eci : ndarray
+        TEME velocity vectors [km/s], shape (n_sats, 3)
+    """
+
+    oe = np.asarray(oe)
+    req = param['req']
+    n_sat = oe.shape[0]
+
+    out_mean_oe = np.column_stack([req * oe[:, 0], oe[:, 1:6]])
+    errors = np.zeros(n_sat)
+
+    idx_notdecay = (out_mean_oe[:, 0] * (1 - out_mean_oe[:, 1]) > req + 150) & (out_mean_oe[:, 1] < 1)
+    idx_controlled = np.asarray(controlled) == 1
+
+    controlled_mask = idx_controlled & idx_notdecay
+    if np.any(controlled_mask):
+        mean_motion = np.sqrt(param['mu'] / out_mean_oe[controlled_mask, 0]**3)
+        out_mean_oe[controlled_mask, 5] += mean_motion * t
+
+    # One SGP4 call for all objects in orbit: uncontrolled ones are
+    # propagated over the step, controlled ones evaluated at its end
+    rows = np.flatnonzero(idx_notdecay)
+    hold = idx_controlled[rows]
+    tsince = np.where(hold, 0.0, t / 60)
+    r_sgp4, v_sgp4, err, table = _sgp4_cols(out_mean_oe[rows, :], np.asarray(bstar)[rows],
+                                             param['jd'] - tsince / 1440, tsince, param)
+
+    moved = rows[~hold]
+    radiusearthkm = getgravc_vec(table['whichconst'])['radiusearthkm']
+    sgp4_oe = np.column_stack([table['am'] * radiusearthkm, table['em'], table['im'],
+                               table['Om'], table['om'], table['mm']])
+    out_mean_oe[moved, :] = sgp4_oe[~hold, :]
+    errors[rows[err != 0]] = 1
+
+    check_alt_ecc = (out_mean_oe[:, 0] * (1 - out_mean_oe[:, 1]) > req + 150) & (out_mean_oe[:, 1] < 1)
+    errors[~check_alt_ecc] = 1
+
+    if out is None:
+        r_eci = np.zeros((n_sat, 3))
+        v_eci = np.zeros((n_sat, 3))
+    else:
+        r_eci, v_eci = out[2], out[3]
+
+    r_all = np.zeros((n_sat, 3))
+    v_all = np.zeros((n_sat, 3))
+    r_all[rows, :] = r_sgp4
+    v_all[rows, :] = v_sgp4
+    r_all[errors == 1, :] = 0
+    v_all[errors == 1, :] = 0
+    rv_rows = slice(None) if rv_rows is None else np.asarray(rv_rows, dtype=np.intp)
+    r_eci[rv_rows, :] = r_all[rv_rows, :]
+    v_eci[rv_rows, :] = v_all[rv_rows, :]
+
+    out_mean_oe[:, 0] = out_mean_oe[:, 0] / req
+
+    if out is None:
+        return out_mean_oe, errors, r_eci, v_eci
+
+    out_oe, out_errors = out[0], out[1]
+    out_oe[...] = out_mean_oe
+    out_errors[...] = errors
+
+    return out_oe, out_errors, r_eci, v_eci
+
+def sgp4_mean_oe2rv(mean_oe, bstar, param):
+    """
+    Mean orbital elements (a in km) to TEME position/velocity at param['jd']
+
+    SGP4 counterpart of mean_oe2rv (the elements are taken as an element set
+    with epoch param['jd']).
+    """
+    mean_oe = np.asarray(mean_oe)
+    r_eci, v_eci, _, _ = _sgp4_cols(mean_oe, np.asarray(bstar), np.full(len(mean_oe), float(param['jd'])),
+                                    0.0, param)
+    return r_eci, v_eci
+
+def _sgp4_cols(mean_oe, bstar, jd_epoch, tsince, param):
+    """Initialize element sets from mean elements (a in km) and propagate them tsince [min]"""
+    grav = getgravc_vec(param.get('whichconst', 'wgs72'))
+    ao = mean_oe[:, 0] / grav['radiusearthkm']
+    table = {'epoch': jd_epoch - JD_SGP4_EPOCH,
+             'bstar': bstar,
+             'ecco': mean_oe[:, 1],
+             'inclo': mean_oe[:, 2],
+             'nodeo': mean_oe[:, 3],
+             'argpo': mean_oe[:, 4],
+             'mo': mean_oe[:, 5],
+             'no_kozai': kozai_mean_motion(ao, mean_oe[:, 1], mean_oe[:, 2], grav)}
+    sgp4init_vec(table, param.get('whichconst', 'wgs72'))
+    r_eci, v_eci, err = sgp4_vec(table, tsince)
+    return r_eci, v_eci, err, table
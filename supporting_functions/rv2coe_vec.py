@@ -34,109 +34,82 @@ def rv2coe_vec(r, v, mu):
         lonper : longitude of perigee (rad)
     """
     
-    r = np.array(r)
-    v = np.array(v)
+    r = np.array(r, dtype=float)
+    v = np.array(v, dtype=float)
     
     # Handle single vector case
     if r.ndim == 1:
         r = r.reshape(1, -1)
         v = v.reshape(1, -1)
     
-    n_objects = r.shape[0]
-    
-    # Initialize output arrays
-    p = np.zeros(n_objects)
-    a = np.zeros(n_objects)
-    e = np.zeros(n_objects)
-    i = np.zeros(n_objects)
-    omega = np.zeros(n_objects)
-    argp = np.zeros(n_objects)
-    nu = np.zeros(n_objects)
-    m = np.zeros(n_objects)
-    arglat = np.zeros(n_objects)
-    truelon = np.zeros(n_objects)
-    lonper = np.zeros(n_objects)
-    
-    for k in range(n_objects):
-        r_vec = r[k, :]
-        v_vec = v[k, :]
-        
-        # Magnitudes
-        r_mag = np.linalg.norm(r_vec)
-        v_mag = np.linalg.norm(v_vec)
-        
-        # Angular momentum vector
-        h_vec = np.cross(r_vec, v_vec)
-        h_mag = np.linalg.norm(h_vec)
-        
-        # Eccentricity vector
-        e_vec = np.cross(v_vec, h_vec) / mu - r_vec / r_mag
-        e_mag = np.linalg.norm(e_vec)
-        
-        # Semi-parameter
-        p[k] = h_mag**2 / mu
-        
-        # Semi-major axis
-        energy = v_mag**2 / 2 - mu / r_mag
-        if abs(energy) < 1e-10:  # Parabolic
-            a[k] = np.inf
-        else:
-            a[k] = -mu / (2 * energy)
-        
-        # Eccentricity
-        e[k] = e_mag
-        
-        # Inclination
-        i[k] = np.arccos(np.clip(h_vec[2] / h_mag, -1, 1))
-        
-        # Node vector
-        n_vec = np.cross([0, 0, 1], h_vec)
-        n_mag = np.linalg.norm(n_vec)
-        
+    # Magnitudes
+    r_mag = np.sqrt(np.einsum('ij,ij->i', r, r))
+    v_mag = np.sqrt(np.einsum('ij,ij->i', v, v))
+    rdotv = np.einsum('ij,ij->i', r, v)
+    
+    # Angular momentum vector
+    h_vec = np.cross(r, v)
+    h_mag = np.sqrt(np.einsum('ij,ij->i', h_vec, h_vec))
+    
+    # Eccentricity vector
+    e_vec = np.cross(v, h_vec) / mu - r / r_mag[:, np.newaxis]
+    e_mag = np.sqrt(np.einsum('ij,ij->i', e_vec, e_vec))
+    
+    # Semi-parameter
+    p = h_mag**2 / mu
+    
+    # Semi-major axis (infinite for parabolic orbits)
+    energy = v_mag**2 / 2 - mu / r_mag
+    parabolic = np.abs(energy) < 1e-10
+    a = np.full(len(r), np.inf)
+    a[~parabolic] = -mu / (2 * energy[~parabolic])
+    
+    # Eccentricity
+    e = e_mag
+    
+    # Inclination
+    i = np.arccos(np.clip(h_vec[:, 2] / h_mag, -1, 1))
+    
+    # Node vector: z x h
+    n_vec = np.column_stack([-h_vec[:, 1], h_vec[:, 0], np.zeros(len(r))])
+    n_mag = np.sqrt(n_vec[:, 0]**2 + n_vec[:, 1]**2)
+    has_node = n_mag > 1e-10
+    eccentric = e_mag > 1e-10
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
         # Right ascension of ascending node
-        if n_mag > 1e-10:
-            omega[k] = np.arccos(np.clip(n_vec[0] / n_mag, -1, 1))
-            if n_vec[1] < 0:
-                omega[k] = 2 * np.pi - omega[k]
-        else:
-            omega[k] = 0
+        omega = np.arccos(np.clip(n_vec[:, 0] / n_mag, -1, 1))
+        omega = np.where(n_vec[:, 1] < 0, 2 * np.pi - omega, omega)
+        omega = np.where(has_node, omega, 0.0)
         
         # Argument of perigee
-        if n_mag > 1e-10 and e_mag > 1e-10:
-            argp[k] = np.arccos(np.clip(np.dot(n_vec, e_vec) / (n_mag * e_mag), -1, 1))
-            if e_vec[2] < 0:
-                argp[k] = 2 * np.pi - argp[k]
-        else:
-            argp[k] = 0
+        argp = np.arccos(np.clip(np.einsum('ij,ij->i', n_vec, e_vec) / (n_mag * e_mag), -1, 1))
+        argp = np.where(e_vec[:, 2] < 0, 2 * np.pi - argp, argp)
+        argp = np.where(has_node & eccentric, argp, 0.0)
         
-        # True anomaly
-        if e_mag > 1e-10:
-            nu[k] = np.arccos(np.clip(np.dot(e_vec, r_vec) / (e_mag * r_mag), -1, 1))
-            if np.dot(r_vec, v_vec) < 0:
-                nu[k] = 2 * np.pi - nu[k]
-        else:
-            # Circular orbit
-            nu[k] = np.arccos(np.clip(r_vec[0] / r_mag, -1, 1))
-            if r_vec[1] < 0:
-                nu[k] = 2 * np.pi - nu[k]
+        # True anomaly (measured from the x axis for circular orbits)
+        nu_ecc = np.arccos(np.clip(np.einsum('ij,ij->i', e_vec, r) / (e_mag * r_mag), -1, 1))
+        nu_ecc = np.where(rdotv < 0, 2 * np.pi - nu_ecc, nu_ecc)
+        nu_circ = np.arccos(np.clip(r[:, 0] / r_mag, -1, 1))
+        nu_circ = np.where(r[:, 1] < 0, 2 * np.pi - nu_circ, nu_circ)
+        nu = np.where(eccentric, nu_ecc, nu_circ)
         
         # Mean anomaly (Kepler's equation)
-        if e_mag < 1e-10:  # Circular
-            m[k] = nu[k]
-        elif e_mag < 1:  # Elliptical
-            E = 2 * np.arctan(np.sqrt((1 - e_mag) / (1 + e_mag)) * np.tan(nu[k] / 2))
-            m[k] = E - e_mag * np.sin(E)
-        else:  # Hyperbolic
-            H = 2 * np.arctanh(np.sqrt((e_mag - 1) / (e_mag + 1)) * np.tan(nu[k] / 2))
-            m[k] = e_mag * np.sinh(H) - H
-        
-        # Argument of latitude
-        arglat[k] = argp[k] + nu[k]
-        
-        # True longitude
-        truelon[k] = omega[k] + argp[k] + nu[k]
-        
-        # Longitude of perigee
-        lonper[k] = omega[k] + argp[k]
+        elliptic = eccentric & (e_mag < 1)
+        hyperbolic = e_mag >= 1
+        m = nu.copy()  # Circular
+        E = 2 * np.arctan(np.sqrt((1 - e_mag[elliptic]) / (1 + e_mag[elliptic])) * np.tan(nu[elliptic] / 2))
+        m[elliptic] = E - e_mag[elliptic] * np.sin(E)
+        H = 2 * np.arctanh(np.sqrt((e_mag[hyperbolic] - 1) / (e_mag[hyperbolic] + 1)) * np.tan(nu[hyperbolic] / 2))
+        m[hyperbolic] = e_mag[hyperbolic] * np.sinh(H) - H
+    
+    # Argument of latitude
+    arglat = argp + nu
+    
+    # True longitude
+    truelon = omega + argp + nu
+    
+    # Longitude of perigee
+    lonper = omega + argp
     
-    return p, a, e, i, omega, argp, nu, m, arglat, truelon, lonper 
\ No newline at end of file
+    return p, a, e, i, omega, argp, nu, m, arglat, truelon, lonper
@@ -0,0 +1,301 @@
+"""
+Streaming output sinks for per-timestep sats_info
+Appends each timestep's (objectclass, a, controlled) snapshot to disk with
+bounded memory, and reads the result back through memory-mapped arrays
+"""
+
+import os
+import re
+import glob
+import numpy as np
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+# sats_info fields: (name, dtype)
+SATS_INFO_FIELDS = (
+    ('objclass', np.int8),
+    ('a', np.float32),
+    ('controlled', np.int8),
+)
+
+class NpyShardSink:
+    """
+    sats_info writer producing append-only .npy shards in a directory
+
+    Steps are buffered in memory and written as one shard per flush: a
+    ``sats_info_<k>_<field>.npy`` file per field holding the concatenated
+    arrays of the buffered steps, and a ``sats_info_<k>_index.npy`` file
+    holding (step, length) rows. The index is written last, so a shard
+    without index (interrupted write) is ignored by the reader. Population
+    snapshots are stored as ``mat_sats_<step>.npy``.
+
+    Parameters:
+    -----------
+    path : str
+        Output directory (created if needed)
+    flush_steps : int
+        Number of buffered steps after which a shard is written
+    """
+
+    def __init__(self, path, flush_steps=146):
+        self.path = path
+        self.flush_steps = max(int(flush_steps), 1)
+        os.makedirs(path, exist_ok=True)
+        self._buffer = []
+        self._next_shard = 1 + max(_shard_ids(path), default=-1)
+
+    def write(self, n, objclass, a, controlled):
+        """Buffer the sats_info of step n, flushing when the buffer is full"""
+        self._buffer.append((n, objclass.astype(np.int8), a.astype(np.float32),
+                             controlled.astype(np.int8)))
+        if len(self._buffer) >= self.flush_steps:
+            self.flush()
+
+    def write_matsats(self, n, mat_sats):
+        """Store a full population snapshot of step n"""
+        _atomic_save(os.path.join(self.path, f'mat_sats_{n:06d}.npy'), mat_sats)
+
+    def flush(self):
+        """Write the buffered steps as a new shard"""
+        if len(self._buffer) == 0:
+            return
+        prefix = os.path.join(self.path, f'sats_info_{self._next_shard:05d}')
+        for k, (name, dtype) in enumerate(SATS_INFO_FIELDS):
+            values = np.concatenate([step[k + 1] for step in self._buffer]).astype(dtype, copy=False)
+            _atomic_save(f'{prefix}_{name}.npy', values)
+        index = np.array([(step[0], len(step[1])) for step in self._buffer], dtype=np.int64).reshape(-1, 2)
+        _atomic_save(f'{prefix}_index.npy', index)
+        self._next_shard += 1
+        self._buffer = []
+
+    def truncate(self, n):
+        """Discard every step after n (used when resuming from a checkpoint)"""
+        self._buffer = [step for step in self._buffer if step[0] <= n]
+        for shard in _shard_ids(self.path):
+            prefix = os.path.join(self.path, f'sats_info_{shard:05d}')
+            index = np.load(f'{prefix}_index.npy')
+            keep = index[:, 0] <= n
+            if keep.all():
+                continue
+            os.remove(f'{prefix}_index.npy')
+            if not keep.any():
+                for name, _ in SATS_INFO_FIELDS:
+                    os.remove(f'{prefix}_{name}.npy')
+                continue
+            n_values = int(index[keep, 1].sum())
+            for name, _ in SATS_INFO_FIELDS:
+                values = np.load(f'{prefix}_{name}.npy')[:n_values]
+                _atomic_save(f'{prefix}_{name}.npy', values)
+            _atomic_save(f'{prefix}_index.npy', index[keep])
+        for fn in glob.glob(os.path.join(self.path, 'mat_sats_*.npy')):
+            if _step_of(fn) > n:
+                os.remove(fn)
+        self._next_shard = 1 + max(_shard_ids(self.path), default=-1)
+
+    def close(self):
+        self.flush()
+
+class HDF5Sink:
+    """
+    sats_info writer appending to chunked, gzip-compressed HDF5 datasets
+
+    One resizable 1-D dataset per field plus an (n_steps, 2) 'index' dataset
+    of (step, length) rows; population snapshots go to 'mat_sats/<step>'.
+    Requires h5py.
+
+    Parameters:
+    -----------
+    path : str
+        Output file (.h5)
+    flush_steps : int
+        Number of buffered steps after which the datasets are extended
+    chunk : int
+        Chunk length of the per-object datasets
+    """
+
+    def __init__(self, path, flush_steps=146, chunk=65536):
+        if h5py is None:
+            raise ImportError("h5py is required for the 'hdf5' output sink (pip install h5py)")
+        self.path = path
+        self.flush_steps = max(int(flush_steps), 1)
+        self._buffer = []
+        self._file = h5py.File(path, 'a')
+        for name, dtype in SATS_INFO_FIELDS:
+            if name not in self._file:
+                self._file.create_dataset(name, shape=(0,), maxshape=(None,), dtype=dtype,
+                                          chunks=(chunk,), compression='gzip')
+        if 'index' not in self._file:
+            self._file.create_dataset('index', shape=(0, 2), maxshape=(None, 2), dtype=np.int64,
+                                      chunks=(1024, 2))
+
+    def write(self, n, objclass, a, controlled):
+        """Buffer the sats_info of step n, flushing when the buffer is full"""
+        self._buffer.append((n, objclass.astype(np.int8), a.astype(np.float32),
+                             controlled.astype(np.int8)))
+        if len(self._buffer) >= self.flush_steps:
+            self.flush()
+
+    def write_matsats(self, n, mat_sats):
+        """Store a full population snapshot of step n"""
+        name = f'mat_sats/{n:06d}'
+        if name in self._file:
+            del self._file[name]
+        self._file.create_dataset(name, data=mat_sats, compression='gzip')
+
+    def flush(self):
+        """Append the buffered steps to the datasets"""
+        if len(self._buffer) == 0:
+            return
+        for k, (name, _) in enumerate(SATS_INFO_FIELDS):
+            values = np.concatenate([step[k + 1] for step in self._buffer])
+            _h5_append(self._file[name], values)
+        index = np.array([(step[0], len(step[1])) for step in self._buffer], dtype=np.int64).reshape(-1, 2)
+        _h5_append(self._file['index'], index)
+        self._file.flush()
+        self._buffer = []
+
+    def truncate(self, n):
+        """Discard every step after n (used when resuming from a checkpoint)"""
+        self._buffer = [step for step in self._buffer if step[0] <= n]
+        index = self._file['index'][...]
+        keep = index[:, 0] <= n
+        n_values = int(index[keep, 1].sum())
+        for name, _ in SATS_INFO_FIELDS:
+            self._file[name].resize((n_values,))
+        self._file['index'].resize((int(keep.sum()), 2))
+        if 'mat_sats' in self._file:
+            for name in list(self._file['mat_sats']):
+                if int(name) > n:
+                    del self._file['mat_sats'][name]
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+class SatsInfoReader:
+    """
+    Read-only access to sats_info written by an output sink
+
+    Shard files are memory-mapped (HDF5 datasets are read lazily), so only
+    the requested steps are loaded.
+
+    Parameters:
+    -----------
+    path : str
+        Output directory of an NpyShardSink or file of an HDF5Sink
+
+    Usage:
+    ------
+    reader = SatsInfoReader(path)
+    objclass, a, controlled = reader.step(n)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        if os.path.isdir(path):
+            self._fields = {name: [] for name, _ in SATS_INFO_FIELDS}
+            # Rows of (step, shard position, start, length)
+            index = [np.zeros((0, 4), dtype=np.int64)]
+            for shard_pos, shard in enumerate(_shard_ids(path)):
+                prefix = os.path.join(path, f'sats_info_{shard:05d}')
+                for name, _ in SATS_INFO_FIELDS:
+                    self._fields[name].append(np.load(f'{prefix}_{name}.npy', mmap_mode='r'))
+                index.append(_expand_index(np.load(f'{prefix}_index.npy'), shard_pos))
+            self._index = np.concatenate(index)
+        else:
+            if h5py is None:
+                raise ImportError("h5py is required to read HDF5 sats_info output (pip install h5py)")
+            self._file = h5py.File(path, 'r')
+            self._fields = {name: [self._file[name]] for name, _ in SATS_INFO_FIELDS}
+            self._index = _expand_index(self._file['index'][...], 0)
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def steps(self):
+        """Recorded step numbers, in order"""
+        return self._index[:, 0]
+
+    def __getitem__(self, i):
+        """sats_info [objclass, a, controlled] of the i-th recorded step"""
+        _, shard, start, length = self._index[i]
+        return [self._fields[name][shard][start:start + length] for name, _ in SATS_INFO_FIELDS]
+
+    def step(self, n):
+        """sats_info [objclass, a, controlled] of timestep n"""
+        found = np.flatnonzero(self._index[:, 0] == n)
+        if len(found) == 0:
+            raise KeyError(f'Step {n} not recorded in {self.path}')
+        return self[found[-1]]
+
+    def matsats_steps(self):
+        """Steps with a stored population snapshot"""
+        if self._file is not None:
+            return sorted(int(name) for name in self._file.get('mat_sats', {}))
+        return sorted(_step_of(fn) for fn in glob.glob(os.path.join(self.path, 'mat_sats_*.npy')))
+
+    def matsats(self, n):
+        """Population snapshot (mat_sats) of step n"""
+        if self._file is not None:
+            return self._file[f'mat_sats/{n:06d}']
+        return np.load(os.path.join(self.path, f'mat_sats_{n:06d}.npy'), mmap_mode='r')
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+def open_sink(kind, path, flush_steps=146):
+    """
+    Create an output sink
+
+    Parameters:
+    -----------
+    kind : str
+        'npy' (directory of .npy shards) or 'hdf5'
+    path : str
+        Output directory or file
+    flush_steps : int
+        Number of buffered steps per write (output_flush_steps of main_mc)
+    """
+    kind = kind.lower()
+    if kind == 'npy':
+        return NpyShardSink(path, flush_steps)
+    elif kind in ['hdf5', 'h5']:
+        return HDF5Sink(path, flush_steps)
+    raise ValueError(f"Unknown output sink '{kind}' (use 'memory', 'npy' or 'hdf5')")
+
+def _atomic_save(filename, arr):
+    tmp_name = filename + '.tmp'
+    with open(tmp_name, 'wb') as f:
+        np.save(f, arr)
+    os.replace(tmp_name, filename)
+
+def _shard_ids(path):
+    """Ids of the complete shards (index written) in a directory"""
+    ids = []
+    for fn in glob.glob(os.path.join(path, 'sats_info_*_index.npy')):
+        match = re.search(r'sats_info_(\d+)_index\.npy$', fn)
+        if match:
+            ids.append(int(match.group(1)))
+    return sorted(ids)
+
+def _step_of(filename):
+    return int(re.search(r'mat_sats_(\d+)\.npy$', filename).group(1))
+
+def _expand_index(index, shard_pos):
+    """(step, length) rows -> (step, shard position, start, length) rows"""
+    index = np.asarray(index, dtype=np.int64).reshape(-1, 2)
+    starts = np.cumsum(index[:, 1]) - index[:, 1]
+    return np.column_stack([index[:, 0], np.full(len(index), shard_pos, dtype=np.int64),
+                            starts, index[:, 1]])
+
+def _h5_append(dataset, values):
+    start = dataset.shape[0]
+    dataset.resize((start + len(values),) + dataset.shape[1:])
+    dataset[start:] = values
@@ -0,0 +1,565 @@
+"""
+Deep-space (SDP4) terms of the vectorized SGP4 propagator
+Lunar-solar secular and periodic terms and the 12 h / 24 h resonance
+integrator of Vallado et al. (2006), evaluated for many satellites at once
+"""
+
+import numpy as np
+
+TWOPI = 2.0 * np.pi
+
+# Solar and lunar constants
+ZES = 0.01675
+ZEL = 0.05490
+ZNS = 1.19459e-5
+ZNL = 1.5835218e-4
+RPTIM = 4.37526908801129966e-3  # Earth rotation rate [rad/min]
+
+# Deep-space coefficients filled by dscom_vec and dsinit_vec (satrec field names)
+DS_FIELDS = ('e3', 'ee2', 'peo', 'pgho', 'pho', 'pinco', 'plo', 'se2', 'se3', 'sgh2', 'sgh3',
+             'sgh4', 'sh2', 'sh3', 'si2', 'si3', 'sl2', 'sl3', 'sl4', 'xgh2', 'xgh3', 'xgh4',
+             'xh2', 'xh3', 'xi2', 'xi3', 'xl2', 'xl3', 'xl4', 'zmol', 'zmos', 'irez', 'd2201',
+             'd2211', 'd3210', 'd3222', 'd4410', 'd4422', 'd5220', 'd5232', 'd5421', 'd5433',
+             'dedt', 'didt', 'dmdt', 'dnodt', 'domdt', 'del1', 'del2', 'del3', 'xfact', 'xlamo')
+
+def dscom_vec(epoch, ep, argpp, tc, inclp, nodep, np_):
+    """
+    Lunar-solar terms common to the secular and periodic deep-space effects
+
+    Parameters:
+    -----------
+    epoch : ndarray
+        Epoch [days since 1949 December 31 00:00 UT]
+    ep, argpp, inclp, nodep : ndarray
+        Eccentricity, argument of perigee, inclination and RAAN [rad]
+    tc : float
+        Time since epoch [min]
+    np_ : ndarray
+        Mean motion [rad/min]
+
+    Returns:
+    --------
+    ds : dict
+        Periodic coefficients (e3 ... zmos of DS_FIELDS) and the
+        intermediate s*, ss*, z*, sz* terms needed by dsinit_vec
+    """
+    c1ss = 2.9864797e-6
+    c1l = 4.7968065e-7
+    zsinis = 0.39785416
+    zcosis = 0.91744867
+    zcosgs = 0.1945905
+    zsings = -0.98088458
+
+    nm = np_
+    em = ep
+    snodm = np.sin(nodep)
+    cnodm = np.cos(nodep)
+    sinomm = np.sin(argpp)
+    cosomm = np.cos(argpp)
+    sinim = np.sin(inclp)
+    cosim = np.cos(inclp)
+    emsq = em * em
+    betasq = 1.0 - emsq
+    rtemsq = np.sqrt(betasq)
+
+    # Initialize lunar-solar terms
+    day = epoch + 18261.5 + tc / 1440.0
+    xnodce = np.mod(4.5236020 - 9.2422029e-4 * day, TWOPI)
+    stem = np.sin(xnodce)
+    ctem = np.cos(xnodce)
+    zcosil = 0.91375164 - 0.03568096 * ctem
+    zsinil = np.sqrt(1.0 - zcosil * zcosil)
+    zsinhl = 0.089683511 * stem / zsinil
+    zcoshl = np.sqrt(1.0 - zsinhl * zsinhl)
+    gam = 5.8351514 + 0.0019443680 * day
+    zx = 0.39785416 * stem / zsinil
+    zy = zcoshl * ctem + 0.91744867 * zsinhl * stem
+    zx = np.arctan2(zx, zy)
+    zx = gam + zx - xnodce
+    zcosgl = np.cos(zx)
+    zsingl = np.sin(zx)
+
+    # Solar terms first, then lunar terms
+    zcosg = zcosgs
+    zsing = zsings
+    zcosi = zcosis
+    zsini = zsinis
+    zcosh = cnodm
+    zsinh = snodm
+    cc = c1ss
+    xnoi = 1.0 / nm
+
+    out = {}
+    for lsflg in (1, 2):
+        a1 = zcosg * zcosh + zsing * zcosi * zsinh
+        a3 = -zsing * zcosh + zcosg * zcosi * zsinh
+        a7 = -zcosg * zsinh + zsing * zcosi * zcosh
+        a8 = zsing * zsini
+        a9 = zsing * zsinh + zcosg * zcosi * zcosh
+        a10 = zcosg * zsini
+        a2 = cosim * a7 + sinim * a8
+        a4 = cosim * a9 + sinim * a10
+        a5 = -sinim * a7 + cosim * a8
+        a6 = -sinim * a9 + cosim * a10
+
+        x1 = a1 * cosomm + a2 * sinomm
+        x2 = a3 * cosomm + a4 * sinomm
+        x3 = -a1 * sinomm + a2 * cosomm
+        x4 = -a3 * sinomm + a4 * cosomm
+        x5 = a5 * sinomm
+        x6 = a6 * sinomm
+        x7 = a5 * cosomm
+        x8 = a6 * cosomm
+
+        z31 = 12.0 * x1 * x1 - 3.0 * x3 * x3
+        z32 = 24.0 * x1 * x2 - 6.0 * x3 * x4
+        z33 = 12.0 * x2 * x2 - 3.0 * x4 * x4
+        z1 = 3.0 * (a1 * a1 + a2 * a2) + z31 * emsq
+        z2 = 6.0 * (a1 * a3 + a2 * a4) + z32 * emsq
+        z3 = 3.0 * (a3 * a3 + a4 * a4) + z33 * emsq
+        z11 = -6.0 * a1 * a5 + emsq * (-24.0 * x1 * x7 - 6.0 * x3 * x5)
+        z12 = -6.0 * (a1 * a6 + a3 * a5) + emsq * (-24.0 * (x2 * x7 + x1 * x8) - 6.0 * (x3 * x6 + x4 * x5))
+        z13 = -6.0 * a3 * a6 + emsq * (-24.0 * x2 * x8 - 6.0 * x4 * x6)
+        z21 = 6.0 * a2 * a5 + emsq * (24.0 * x1 * x5 - 6.0 * x3 * x7)
+        z22 = 6.0 * (a4 * a5 + a2 * a6) + emsq * (24.0 * (x2 * x5 + x1 * x6) - 6.0 * (x4 * x7 + x3 * x8))
+        z23 = 6.0 * a4 * a6 + emsq * (24.0 * x2 * x6 - 6.0 * x4 * x8)
+        z1 = z1 + z1 + betasq * z31
+        z2 = z2 + z2 + betasq * z32
+        z3 = z3 + z3 + betasq * z33
+        s3 = cc * xnoi
+        s2 = -0.5 * s3 / rtemsq
+        s4 = s3 * rtemsq
+        s1 = -15.0 * em * s4
+        s5 = x1 * x3 + x2 * x4
+        s6 = x2 * x3 + x1 * x4
+        s7 = x2 * x4 - x1 * x3
+
+        if lsflg == 1:
+            ss1, ss2, ss3, ss4, ss5, ss6, ss7 = s1, s2, s3, s4, s5, s6, s7
+            sz1, sz2, sz3 = z1, z2, z3
+            sz11, sz12, sz13 = z11, z12, z13
+            sz21, sz22, sz23 = z21, z22, z23
+            sz31, sz32, sz33 = z31, z32, z33
+            zcosg = zcosgl
+            zsing = zsingl
+            zcosi = zcosil
+            zsini = zsinil
+            zcosh = zcoshl * cnodm + zsinhl * snodm
+            zsinh = snodm * zcoshl - cnodm * zsinhl
+            cc = c1l
+
+    zero = np.zeros_like(em)
+    out.update(
+        zmol=np.mod(4.7199672 + 0.22997150 * day - gam, TWOPI),
+        zmos=np.mod(6.2565837 + 0.017201977 * day, TWOPI),
+        peo=zero, pinco=zero, plo=zero, pgho=zero, pho=zero,
+        # Solar terms
+        se2=2.0 * ss1 * ss6,
+        se3=2.0 * ss1 * ss7,
+        si2=2.0 * ss2 * sz12,
+        si3=2.0 * ss2 * (sz13 - sz11),
+        sl2=-2.0 * ss3 * sz2,
+        sl3=-2.0 * ss3 * (sz3 - sz1),
+        sl4=-2.0 * ss3 * (-21.0 - 9.0 * emsq) * ZES,
+        sgh2=2.0 * ss4 * sz32,
+        sgh3=2.0 * ss4 * (sz33 - sz31),
+        sgh4=-18.0 * ss4 * ZES,
+        sh2=-2.0 * ss2 * sz22,
+        sh3=-2.0 * ss2 * (sz23 - sz21),
+        # Lunar terms
+        ee2=2.0 * s1 * s6,
+        e3=2.0 * s1 * s7,
+        xi2=2.0 * s2 * z12,
+        xi3=2.0 * s2 * (z13 - z11),
+        xl2=-2.0 * s3 * z2,
+        xl3=-2.0 * s3 * (z3 - z1),
+        xl4=-2.0 * s3 * (-21.0 - 9.0 * emsq) * ZEL,
+        xgh2=2.0 * s4 * z32,
+        xgh3=2.0 * s4 * (z33 - z31),
+        xgh4=-18.0 * s4 * ZEL,
+        xh2=-2.0 * s2 * z22,
+        xh3=-2.0 * s2 * (z23 - z21),
+        # Intermediate terms for dsinit_vec
+        sinim=sinim, cosim=cosim, emsq=emsq,
+        s1=s1, s2=s2, s3=s3, s4=s4, s5=s5,
+        ss1=ss1, ss2=ss2, ss3=ss3, ss4=ss4, ss5=ss5,
+        z1=z1, z3=z3, z11=z11, z13=z13, z21=z21, z23=z23, z31=z31, z33=z33,
+        sz1=sz1, sz3=sz3, sz11=sz11, sz13=sz13, sz21=sz21, sz23=sz23, sz31=sz31, sz33=sz33)
+    return out
+
+def dsinit_vec(xke, ds, argpo, gsto, mo, mdot, no, nodeo, nodedot, xpidot, ecco, inclo):
+    """
+    Deep-space secular rates and resonance coefficients at epoch
+
+    Parameters:
+    -----------
+    xke : float
+        sqrt(GM) in Earth radii^1.5 / min
+    ds : dict
+        Output of dscom_vec at epoch (tc = 0)
+    argpo, mo, nodeo, inclo : ndarray
+        Epoch elements [rad]
+    gsto : ndarray
+        Greenwich sidereal time at epoch [rad]
+    mdot, nodedot, xpidot : ndarray
+        Secular rates of mean anomaly, RAAN and longitude of perigee [rad/min]
+    no : ndarray
+        Un-Kozai mean motion [rad/min]
+    ecco : ndarray
+        Eccentricity
+
+    Returns:
+    --------
+    coef : dict
+        irez (0: none, 1: 24 h synchronous, 2: 12 h half-day resonance) and
+        the secular and resonance coefficients of DS_FIELDS
+    """
+    q22 = 1.7891679e-6
+    q31 = 2.1460748e-6
+    q33 = 2.2123015e-7
+    root22 = 1.7891679e-6
+    root44 = 7.3636953e-9
+    root54 = 2.1765803e-9
+    root32 = 3.7393792e-7
+    root52 = 1.1428639e-7
+    x2o3 = 2.0 / 3.0
+
+    sinim = ds['sinim']
+    cosim = ds['cosim']
+    emsq = ds['emsq']
+    nm = no
+    em = ecco
+
+    # Deep-space resonance effects
+    irez = np.zeros(len(no), dtype=np.int8)
+    irez[(0.0034906585 < nm) & (nm < 0.0052359877)] = 1
+    irez[(8.26e-3 <= nm) & (nm <= 9.24e-3) & (em >= 0.5)] = 2
+
+    # Solar terms
+    equatorial = (inclo < 5.2359877e-2) | (inclo > np.pi - 5.2359877e-2)
+    nonzero = sinim != 0.0
+    safe_sinim = np.where(nonzero, sinim, 1.0)
+    ses = ds['ss1'] * ZNS * ds['ss5']
+    sis = ds['ss2'] * ZNS * (ds['sz11'] + ds['sz13'])
+    sls = -ZNS * ds['ss3'] * (ds['sz1'] + ds['sz3'] - 14.0 - 6.0 * emsq)
+    sghs = ds['ss4'] * ZNS * (ds['sz31'] + ds['sz33'] - 6.0)
+    shs = np.where(equatorial, 0.0, -ZNS * ds['ss2'] * (ds['sz21'] + ds['sz23']))
+    shs = np.where(nonzero, shs / safe_sinim, shs)
+    sgs = sghs - cosim * shs
+
+    # Lunar terms
+    dedt = ses + ds['s1'] * ZNL * ds['s5']
+    didt = sis + ds['s2'] * ZNL * (ds['z11'] + ds['z13'])
+    dmdt = sls - ZNL * ds['s3'] * (ds['z1'] + ds['z3'] - 14.0 - 6.0 * emsq)
+    sghl = ds['s4'] * ZNL * (ds['z31'] + ds['z33'] - 6.0)
+    shll = np.where(equatorial, 0.0, -ZNL * ds['s2'] * (ds['z21'] + ds['z23']))
+    domdt = sgs + sghl
+    dnodt = shs
+    domdt = np.where(nonzero, domdt - cosim / safe_sinim * shll, domdt)
+    dnodt = np.where(nonzero, dnodt + shll / safe_sinim, dnodt)
+
+    theta = np.mod(gsto, TWOPI)
+    zero = np.zeros_like(no)
+    coef = {name: zero.copy() for name in ('d2201', 'd2211', 'd3210', 'd3222', 'd4410', 'd4422', 'd5220',
+                                           'd5232', 'd5421', 'd5433', 'del1', 'del2', 'del3',
+                                           'xfact', 'xlamo')}
+    coef.update(irez=irez, dedt=dedt, didt=didt, dmdt=dmdt, dnodt=dnodt, domdt=domdt)
+
+    aonv = (nm / xke) ** x2o3
+
+    # Geopotential resonance for 12 hour orbits
+    k = np.flatnonzero(irez == 2)
+    if len(k) > 0:
+        cosi = cosim[k]
+        sini = sinim[k]
+        cosisq = cosi * cosi
+        e = ecco[k]
+        esq = e * e
+        eoc = e * esq
+        low = e <= 0.65
+        g201 = -0.306 - (e - 0.64) * 0.440
+        g211 = np.where(low, 3.616 - 13.2470 * e + 16.2900 * esq,
+                        -72.099 + 331.819 * e - 508.738 * esq + 266.724 * eoc)
+        g310 = np.where(low, -19.302 + 117.3900 * e - 228.4190 * esq + 156.5910 * eoc,
+                        -346.844 + 1582.851 * e - 2415.925 * esq + 1246.113 * eoc)
+        g322 = np.where(low, -18.9068 + 109.7927 * e - 214.6334 * esq + 146.5816 * eoc,
+                        -342.585 + 1554.908 * e - 2366.899 * esq + 1215.972 * eoc)
+        g410 = np.where(low, -41.122 + 242.6940 * e - 471.0940 * esq + 313.9530 * eoc,
+                        -1052.797 + 4758.686 * e - 7193.992 * esq + 3651.957 * eoc)
+        g422 = np.where(low, -146.407 + 841.8800 * e - 1629.014 * esq + 1083.4350 * eoc,
+                        -3581.690 + 16178.110 * e - 24462.770 * esq + 12422.520 * eoc)
+        g520 = np.where(low, -532.114 + 3017.977 * e - 5740.032 * esq + 3708.2760 * eoc,
+                        np.where(e > 0.715, -5149.66 + 29936.92 * e - 54087.36 * esq + 31324.56 * eoc,
+                                 1464.74 - 4664.75 * e + 3763.64 * esq))
+        below = e < 0.7
+        g533 = np.where(below, -919.22770 + 4988.6100 * e - 9064.7700 * esq + 5542.21 * eoc,
+                        -37995.780 + 161616.52 * e - 229838.20 * esq + 109377.94 * eoc)
+        g521 = np.where(below, -822.71072 + 4568.6173 * e - 8491.4146 * esq + 5337.524 * eoc,
+                        -51752.104 + 218913.95 * e - 309468.16 * esq + 146349.42 * eoc)
+        g532 = np.where(below, -853.66600 + 4690.2500 * e - 8624.7700 * esq + 5341.4 * eoc,
+                        -40023.880 + 170470.89 * e - 242699.48 * esq + 115605.82 * eoc)
+
+        sini2 = sini * sini
+        f220 = 0.75 * (1.0 + 2.0 * cosi + cosisq)
+        f221 = 1.5 * sini2
+        f321 = 1.875 * sini * (1.0 - 2.0 * cosi - 3.0 * cosisq)
+        f322 = -1.875 * sini * (1.0 + 2.0 * cosi - 3.0 * cosisq)
+        f441 = 35.0 * sini2 * f220
+        f442 = 39.3750 * sini2 * sini2
+        f522 = 9.84375 * sini * (sini2 * (1.0 - 2.0 * cosi - 5.0 * cosisq) +
+                                 0.33333333 * (-2.0 + 4.0 * cosi + 6.0 * cosisq))
+        f523 = sini * (4.92187512 * sini2 * (-2.0 - 4.0 * cosi + 10.0 * cosisq) +
+                       6.56250012 * (1.0 + 2.0 * cosi - 3.0 * cosisq))
+        f542 = 29.53125 * sini * (2.0 - 8.0 * cosi + cosisq * (-12.0 + 8.0 * cosi + 10.0 * cosisq))
+        f543 = 29.53125 * sini * (-2.0 - 8.0 * cosi + cosisq * (12.0 + 8.0 * cosi - 10.0 * cosisq))
+
+        a = aonv[k]
+        xno2 = nm[k] * nm[k]
+        ainv2 = a * a
+        temp1 = 3.0 * xno2 * ainv2
+        temp = temp1 * root22
+        coef['d2201'][k] = temp * f220 * g201
+        coef['d2211'][k] = temp * f221 * g211
+        temp1 = temp1 * a
+        temp = temp1 * root32
+        coef['d3210'][k] = temp * f321 * g310
+        coef['d3222'][k] = temp * f322 * g322
+        temp1 = temp1 * a
+        temp = 2.0 * temp1 * root44
+        coef['d4410'][k] = temp * f441 * g410
+        coef['d4422'][k] = temp * f442 * g422
+        temp1 = temp1 * a
+        temp = temp1 * root52
+        coef['d5220'][k] = temp * f522 * g520
+        coef['d5232'][k] = temp * f523 * g532
+        temp = 2.0 * temp1 * root54
+        coef['d5421'][k] = temp * f542 * g521
+        coef['d5433'][k] = temp * f543 * g533
+        coef['xlamo'][k] = np.mod(mo[k] + nodeo[k] + nodeo[k] - theta[k] - theta[k], TWOPI)
+        coef['xfact'][k] = mdot[k] + dmdt[k] + 2.0 * (nodedot[k] + dnodt[k] - RPTIM) - no[k]
+
+    # Synchronous resonance terms
+    k = np.flatnonzero(irez == 1)
+    if len(k) > 0:
+        cosi = cosim[k]
+        esq = emsq[k]
+        a = aonv[k]
+        g200 = 1.0 + esq * (-2.5 + 0.8125 * esq)
+        g310 = 1.0 + 2.0 * esq
+        g300 = 1.0 + esq * (-6.0 + 6.60937 * esq)
+        f220 = 0.75 * (1.0 + cosi) * (1.0 + cosi)
+        f311 = 0.9375 * sinim[k] * sinim[k] * (1.0 + 3.0 * cosi) - 0.75 * (1.0 + cosi)
+        f330 = 1.0 + cosi
+        f330 = 1.875 * f330 * f330 * f330
+        del1 = 3.0 * nm[k] * nm[k] * a * a
+        coef['del2'][k] = 2.0 * del1 * f220 * g200 * q22
+        coef['del3'][k] = 3.0 * del1 * f330 * g300 * q33 * a
+        coef['del1'][k] = del1 * f311 * g310 * q31 * a
+        coef['xlamo'][k] = np.mod(mo[k] + nodeo[k] + argpo[k] - theta[k], TWOPI)
+        coef['xfact'][k] = mdot[k] + xpidot[k] - RPTIM + dmdt[k] + domdt[k] + dnodt[k] - no[k]
+
+    return coef
+
+def dpper_vec(sat, t, ep, inclp, nodep, argpp, mp, opsmode='i'):
+    """
+    Lunar-solar long-period periodics
+
+    Parameters:
+    -----------
+    sat : dict
+        Deep-space coefficients (DS_FIELDS) of the satellites
+    t : ndarray
+        Time since epoch [min]
+    ep, inclp, nodep, argpp, mp : ndarray
+        Mean elements after the secular update [rad]
+    opsmode : str
+        'a' for the original AFSPC node handling, 'i' for the improved mode
+
+    Returns:
+    --------
+    ep, inclp, nodep, argpp, mp : ndarray
+        Elements with the periodics applied
+    """
+    # Solar periodics
+    zm = sat['zmos'] + ZNS * t
+    zf = zm + 2.0 * ZES * np.sin(zm)
+    sinzf = np.sin(zf)
+    f2 = 0.5 * sinzf * sinzf - 0.25
+    f3 = -0.5 * sinzf * np.cos(zf)
+    ses = sat['se2'] * f2 + sat['se3'] * f3
+    sis = sat['si2'] * f2 + sat['si3'] * f3
+    sls = sat['sl2'] * f2 + sat['sl3'] * f3 + sat['sl4'] * sinzf
+    sghs = sat['sgh2'] * f2 + sat['sgh3'] * f3 + sat['sgh4'] * sinzf
+    shs = sat['sh2'] * f2 + sat['sh3'] * f3
+
+    # Lunar periodics
+    zm = sat['zmol'] + ZNL * t
+    zf = zm + 2.0 * ZEL * np.sin(zm)
+    sinzf = np.sin(zf)
+    f2 = 0.5 * sinzf * sinzf - 0.25
+    f3 = -0.5 * sinzf * np.cos(zf)
+    sel = sat['ee2'] * f2 + sat['e3'] * f3
+    sil = sat['xi2'] * f2 + sat['xi3'] * f3
+    sll = sat['xl2'] * f2 + sat['xl3'] * f3 + sat['xl4'] * sinzf
+    sghl = sat['xgh2'] * f2 + sat['xgh3'] * f3 + sat['xgh4'] * sinzf
+    shll = sat['xh2'] * f2 + sat['xh3'] * f3
+
+    pe = ses + sel - sat['peo']
+    pinc = sis + sil - sat['pinco']
+    pl = sls + sll - sat['plo']
+    pgh = sghs + sghl - sat['pgho']
+    ph = shs + shll - sat['pho']
+
+    inclp = inclp + pinc
+    ep = ep + pe
+    sinip = np.sin(inclp)
+    cosip = np.cos(inclp)
+
+    # Apply periodics directly above 0.2 rad, Lyddane modification below
+    direct = inclp >= 0.2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ph_d = ph / sinip
+    pgh_d = pgh - cosip * ph_d
+    argpp_d = argpp + pgh_d
+    nodep_d = nodep + ph_d
+
+    sinop = np.sin(nodep)
+    cosop = np.cos(nodep)
+    alfdp = sinip * sinop + (ph * cosop + pinc * cosip * sinop)
+    betdp = sinip * cosop + (-ph * sinop + pinc * cosip * cosop)
+    nodep_l = np.fmod(nodep, TWOPI)
+    if opsmode == 'a':
+        nodep_l = np.where(nodep_l < 0.0, nodep_l + TWOPI, nodep_l)
+    xls = mp + argpp + pl + pgh + (cosip - pinc * sinip) * nodep_l
+    xnoh = nodep_l
+    nodep_l = np.arctan2(alfdp, betdp)
+    if opsmode == 'a':
+        nodep_l = np.where(nodep_l < 0.0, nodep_l + TWOPI, nodep_l)
+    wrap = np.abs(xnoh - nodep_l) > np.pi
+    nodep_l = np.where(wrap & (nodep_l < xnoh), nodep_l + TWOPI,
+                       np.where(wrap, nodep_l - TWOPI, nodep_l))
+    mp = mp + pl
+    argpp_l = xls - mp - cosip * nodep_l
+
+    return (ep, inclp, np.where(direct, nodep_d, nodep_l),
+            np.where(direct, argpp_d, argpp_l), mp)
+
+def dspace_vec(sat, t, em, argpm, inclm, mm, nodem, nm):
+    """
+    Deep-space secular effects and resonance integration
+
+    The resonant mean motion and longitude are integrated from epoch in
+    720 min Euler-Maclaurin steps; all satellites advance together and leave
+    the loop once they are within one step of their target time.
+
+    Parameters:
+    -----------
+    sat : dict
+        Satrec columns of the satellites (gsto, no_unkozai, argpo, argpdot and DS_FIELDS)
+    t : ndarray
+        Time since epoch [min]
+    em, argpm, inclm, mm, nodem, nm : ndarray
+        Elements after the near-earth secular update
+
+    Returns:
+    --------
+    em, argpm, inclm, mm, nodem, nm : ndarray
+        Elements with the deep-space secular and resonance terms
+    """
+    fasx2 = 0.13130908
+    fasx4 = 2.8843198
+    fasx6 = 0.37448087
+    g22 = 5.7686396
+    g32 = 0.95240898
+    g44 = 1.8014998
+    g52 = 1.0508330
+    g54 = 4.4108898
+    stepp = 720.0
+    step2 = 259200.0
+
+    theta = np.mod(sat['gsto'] + t * RPTIM, TWOPI)
+    em = em + sat['dedt'] * t
+    inclm = inclm + sat['didt'] * t
+    argpm = argpm + sat['domdt'] * t
+    nodem = nodem + sat['dnodt'] * t
+    mm = mm + sat['dmdt'] * t
+
+    res = np.flatnonzero(sat['irez'] != 0)
+    if len(res) == 0:
+        return em, argpm, inclm, mm, nodem, nm
+
+    # Resonance integrator, restarted from epoch
+    no = sat['no_unkozai'][res]
+    irez = sat['irez'][res]
+    tr = t[res]
+    atime = np.zeros(len(res))
+    xni = no.copy()
+    xli = sat['xlamo'][res].copy()
+    delt = np.where(tr > 0.0, stepp, -stepp)
+    ft = np.zeros(len(res))
+    xndt = np.zeros(len(res))
+    xldot = np.zeros(len(res))
+    xnddt = np.zeros(len(res))
+
+    d = {name: sat[name][res] for name in ('del1', 'del2', 'del3', 'd2201', 'd2211', 'd3210', 'd3222',
+                                           'd4410', 'd4422', 'd5220', 'd5232', 'd5421', 'd5433',
+                                           'xfact', 'argpo', 'argpdot')}
+    active = np.arange(len(res))
+    while len(active) > 0:
+        li = xli[active]
+        ni = xni[active]
+        sync = irez[active] != 2
+        xdot = np.empty(len(active))
+        xddt = np.empty(len(active))
+
+        k = np.flatnonzero(sync)
+        if len(k) > 0:
+            a = active[k]
+            l = li[k]
+            xdot[k] = (d['del1'][a] * np.sin(l - fasx2) + d['del2'][a] * np.sin(2.0 * (l - fasx4)) +
+                       d['del3'][a] * np.sin(3.0 * (l - fasx6)))
+            xddt[k] = (d['del1'][a] * np.cos(l - fasx2) + 2.0 * d['del2'][a] * np.cos(2.0 * (l - fasx4)) +
+                       3.0 * d['del3'][a] * np.cos(3.0 * (l - fasx6)))
+        k = np.flatnonzero(~sync)
+        if len(k) > 0:
+            a = active[k]
+            l = li[k]
+            xomi = d['argpo'][a] + d['argpdot'][a] * atime[a]
+            x2omi = xomi + xomi
+            x2li = l + l
+            xdot[k] = (d['d2201'][a] * np.sin(x2omi + l - g22) + d['d2211'][a] * np.sin(l - g22) +
+                       d['d3210'][a] * np.sin(xomi + l - g32) + d['d3222'][a] * np.sin(-xomi + l - g32) +
+                       d['d4410'][a] * np.sin(x2omi + x2li - g44) + d['d4422'][a] * np.sin(x2li - g44) +
+                       d['d5220'][a] * np.sin(xomi + l - g52) + d['d5232'][a] * np.sin(-xomi + l - g52) +
+                       d['d5421'][a] * np.sin(xomi + x2li - g54) + d['d5433'][a] * np.sin(-xomi + x2li - g54))
+            xddt[k] = (d['d2201'][a] * np.cos(x2omi + l - g22) + d['d2211'][a] * np.cos(l - g22) +
+                       d['d3210'][a] * np.cos(xomi + l - g32) + d['d3222'][a] * np.cos(-xomi + l - g32) +
+                       d['d5220'][a] * np.cos(xomi + l - g52) + d['d5232'][a] * np.cos(-xomi + l - g52) +
+                       2.0 * (d['d4410'][a] * np.cos(x2omi + x2li - g44) +
+                              d['d4422'][a] * np.cos(x2li - g44) + d['d5421'][a] * np.cos(xomi + x2li - g54) +
+                              d['d5433'][a] * np.cos(-xomi + x2li - g54)))
+        ldot = ni + d['xfact'][active]
+        xddt = xddt * ldot
+
+        xndt[active] = xdot
+        xldot[active] = ldot
+        xnddt[active] = xddt
+
+        done = np.abs(tr[active] - atime[active]) < stepp
+        ft[active[done]] = tr[active[done]] - atime[active[done]]
+        active = active[~done]
+        step = delt[active]
+        xli[active] = xli[active] + xldot[active] * step + xndt[active] * step2
+        xni[active] = xni[active] + xndt[active] * step + xnddt[active] * step2
+        atime[active] = atime[active] + step
+
+    nm_r = xni + xndt * ft + xnddt * ft * ft * 0.5
+    xl = xli + xldot * ft + xndt * ft * ft * 0.5
+    mm_r = np.where(irez != 1, xl - 2.0 * nodem[res] + 2.0 * theta[res],
+                    xl - nodem[res] - argpm[res] + theta[res])
+
+    nm = nm.copy()
+    mm = mm.copy()
+    nm[res] = no + (nm_r - no)
+    mm[res] = mm_r
+    return em, argpm, inclm, mm, nodem, nm
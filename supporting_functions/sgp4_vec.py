@@ -0,0 +1,569 @@
+"""
+Vectorized SGP4/SDP4 propagator
+Columnar port of the Vallado et al. (2006) SGP4 (sgp4init, sgp4, twoline2rv):
+a satrec table holds one array per satrec field and every call initializes
+or propagates all of its satellites at once
+"""
+
+import numpy as np
+from sdp4_vec import DS_FIELDS, dscom_vec, dsinit_vec, dpper_vec, dspace_vec
+
+TWOPI = 2.0 * np.pi
+X2O3 = 2.0 / 3.0
+TEMP4 = 1.5e-12
+XPDOTP = 1440.0 / TWOPI  # rev/day per rad/min
+
+# Element set read from a TLE (sgp4init inputs)
+SATREC_INPUTS = ('epoch', 'bstar', 'ecco', 'argpo', 'inclo', 'mo', 'no_kozai', 'nodeo')
+
+def getgravc_vec(whichconst='wgs72'):
+    """
+    Gravity constants of SGP4
+
+    Parameters:
+    -----------
+    whichconst : str
+        'wgs72old', 'wgs72' or 'wgs84'
+
+    Returns:
+    --------
+    grav : dict
+        tumin, mu [km^3/s^2], radiusearthkm [km], xke [ER^1.5/min], j2, j3, j4, j3oj2
+    """
+    if whichconst == 'wgs72old':
+        mu = 398600.79964
+        radiusearthkm = 6378.135
+        xke = 0.0743669161
+        j2, j3, j4 = 0.001082616, -0.00000253881, -0.00000165597
+    elif whichconst == 'wgs72':
+        mu = 398600.8
+        radiusearthkm = 6378.135
+        xke = 60.0 / np.sqrt(radiusearthkm**3 / mu)
+        j2, j3, j4 = 0.001082616, -0.00000253881, -0.00000165597
+    elif whichconst == 'wgs84':
+        mu = 398600.5
+        radiusearthkm = 6378.137
+        xke = 60.0 / np.sqrt(radiusearthkm**3 / mu)
+        j2, j3, j4 = 0.00108262998905, -0.00000253215306, -0.00000161098761
+    else:
+        raise ValueError(f"Unknown gravity model '{whichconst}'")
+    return {'tumin': 1.0 / xke, 'mu': mu, 'radiusearthkm': radiusearthkm, 'xke': xke,
+            'j2': j2, 'j3': j3, 'j4': j4, 'j3oj2': j3 / j2}
+
+def gstime_vec(jdut1):
+    """
+    Greenwich sidereal time [rad] of UT1 Julian dates
+    """
+    tut1 = (np.asarray(jdut1, dtype=float) - 2451545.0) / 36525.0
+    temp = (-6.2e-6 * tut1**3 + 0.093104 * tut1**2 +
+            (876600.0 * 3600 + 8640184.812866) * tut1 + 67310.54841)
+    return np.mod(temp * np.pi / 180.0 / 240.0, TWOPI)
+
+def _tle_float(field):
+    """Decimal field with an implied leading point and exponent, e.g. ' 12345-3'"""
+    field = field.strip()
+    if not field:
+        return 0.0
+    sign = -1.0 if field[0] == '-' else 1.0
+    field = field.lstrip('+-')
+    mantissa, exponent = field[:-2], field[-2:]
+    return sign * float('0.' + mantissa.strip()) * 10.0**int(exponent)
+
+def twoline2satrec_vec(lines1, lines2):
+    """
+    Parse two-line element sets into a satrec table
+
+    Parameters:
+    -----------
+    lines1, lines2 : list of str
+        First and second lines of the element sets
+
+    Returns:
+    --------
+    table : dict
+        satnum and jdsatepoch plus the sgp4init inputs (SATREC_INPUTS):
+        epoch [days since 1949 December 31 00:00 UT], angles [rad],
+        no_kozai [rad/min]
+    """
+    n = len(lines1)
+    satnum = np.empty(n, dtype=np.int64)
+    epochyr = np.empty(n)
+    epochdays = np.empty(n)
+    bstar = np.empty(n)
+    elements = np.empty((n, 6))
+    for k, (line1, line2) in enumerate(zip(lines1, lines2)):
+        satnum[k] = int(line1[2:7])
+        epochyr[k] = int(line1[18:20])
+        epochdays[k] = float(line1[20:32])
+        bstar[k] = _tle_float(line1[53:61])
+        elements[k] = (float(line2[8:16]), float(line2[17:25]), float('0.' + line2[26:33].strip()),
+                       float(line2[34:42]), float(line2[43:51]), float(line2[52:63]))
+
+    year = np.where(epochyr < 57, epochyr + 2000, epochyr + 1900)
+    # Julian date of 0 January of the epoch year
+    jan0 = 367.0 * year - np.floor(7.0 * year * 0.25) + 30.0 + 1721013.5
+    deg2rad = np.pi / 180.0
+    return {'satnum': satnum,
+            'jdsatepoch': jan0 + epochdays,
+            'epoch': (jan0 - 2433281.5) + epochdays,
+            'bstar': bstar,
+            'inclo': elements[:, 0] * deg2rad,
+            'nodeo': elements[:, 1] * deg2rad,
+            'ecco': elements[:, 2],
+            'argpo': elements[:, 3] * deg2rad,
+            'mo': elements[:, 4] * deg2rad,
+            'no_kozai': elements[:, 5] / XPDOTP}
+
+def read_tle_file(filename):
+    """
+    Read the two-line element sets of a file into a satrec table
+
+    Lines other than element lines (names, comments) are skipped.
+
+    Parameters:
+    -----------
+    filename : str
+        TLE file
+
+    Returns:
+    --------
+    table : dict
+        Output of twoline2satrec_vec
+    """
+    lines1, lines2 = [], []
+    with open(filename) as f:
+        line1 = None
+        for line in f:
+            if line.startswith('1 ') and len(line) >= 64:
+                line1 = line
+            elif line.startswith('2 ') and line1 is not None and len(line) >= 63:
+                lines1.append(line1)
+                lines2.append(line)
+                line1 = None
+    return twoline2satrec_vec(lines1, lines2)
+
+def unkozai_mean_motion(no_kozai, ecco, inclo, grav):
+    """
+    Brouwer (un-Kozai) mean motion and semi-major axis of SGP4 initialization
+
+    Parameters:
+    -----------
+    no_kozai : ndarray
+        Kozai mean motion [rad/min]
+    ecco, inclo : ndarray
+        Eccentricity and inclination [rad]
+    grav : dict
+        Output of getgravc_vec
+
+    Returns:
+    --------
+    no_unkozai : ndarray
+        Mean motion [rad/min]
+    ao : ndarray
+        Semi-major axis [Earth radii]
+    """
+    omeosq = 1.0 - ecco * ecco
+    cosio2 = np.cos(inclo)**2
+    ak = (grav['xke'] / no_kozai)**X2O3
+    d1 = 0.75 * grav['j2'] * (3.0 * cosio2 - 1.0) / (np.sqrt(omeosq) * omeosq)
+    del_ = d1 / (ak * ak)
+    adel = ak * (1.0 - del_ * del_ - del_ * (1.0 / 3.0 + 134.0 * del_ * del_ / 81.0))
+    del_ = d1 / (adel * adel)
+    no_unkozai = no_kozai / (1.0 + del_)
+    return no_unkozai, (grav['xke'] / no_unkozai)**X2O3
+
+def kozai_mean_motion(ao, ecco, inclo, grav, n_iter=8):
+    """
+    Kozai mean motion whose SGP4 initialization gives the semi-major axis ao
+
+    Inverts unkozai_mean_motion by fixed-point iteration on the Brouwer
+    correction (relative change of order J2 per iteration).
+
+    Parameters:
+    -----------
+    ao : ndarray
+        Semi-major axis [Earth radii of grav]
+    ecco, inclo : ndarray
+        Eccentricity and inclination [rad]
+    grav : dict
+        Output of getgravc_vec
+    n_iter : int
+        Iterations
+
+    Returns:
+    --------
+    no_kozai : ndarray
+        Kozai mean motion [rad/min]
+    """
+    no_unkozai = grav['xke'] / ao**1.5
+    no_kozai = no_unkozai.copy()
+    for _ in range(n_iter):
+        no_test, _ = unkozai_mean_motion(no_kozai, ecco, inclo, grav)
+        no_kozai = no_kozai * no_unkozai / no_test
+    return no_kozai
+
+def sgp4init_vec(table, whichconst='wgs72', opsmode='i'):
+    """
+    Initialize a satrec table for SGP4
+
+    Parameters:
+    -----------
+    table : dict
+        Columns of SATREC_INPUTS (arrays of one length)
+    whichconst : str
+        Gravity model of getgravc_vec
+    opsmode : str
+        'a' (AFSPC) or 'i' (improved) operation mode
+
+    Returns:
+    --------
+    table : dict
+        The same dict with the derived satrec columns added (isimp, method
+        'd' flag ``deep``, drag and secular coefficients, deep-space terms)
+        and the error code and mean elements at epoch
+    """
+    grav = getgravc_vec(whichconst)
+    xke, j2, j4, j3oj2 = grav['xke'], grav['j2'], grav['j4'], grav['j3oj2']
+    radiusearthkm = grav['radiusearthkm']
+
+    for name in SATREC_INPUTS:
+        table[name] = np.asarray(table[name], dtype=float)
+    epoch, bstar, ecco = table['epoch'], table['bstar'], table['ecco']
+    argpo, inclo, mo, nodeo = table['argpo'], table['inclo'], table['mo'], table['nodeo']
+    n = len(ecco)
+    table['whichconst'] = whichconst
+    table['opsmode'] = opsmode
+
+    ss = 78.0 / radiusearthkm + 1.0
+    qzms2t = ((120.0 - 78.0) / radiusearthkm)**4
+
+    # initl
+    eccsq = ecco * ecco
+    omeosq = 1.0 - eccsq
+    rteosq = np.sqrt(omeosq)
+    cosio = np.cos(inclo)
+    cosio2 = cosio * cosio
+    no, ao = unkozai_mean_motion(table['no_kozai'], ecco, inclo, grav)
+    sinio = np.sin(inclo)
+    po = ao * omeosq
+    con42 = 1.0 - 5.0 * cosio2
+    con41 = -con42 - cosio2 - cosio2
+    posq = po * po
+    rp = ao * (1.0 - ecco)
+    if opsmode == 'a':
+        ts70 = epoch - 7305.0
+        ds70 = np.floor(ts70 + 1.0e-8)
+        tfrac = ts70 - ds70
+        c1 = 1.72027916940703639e-2
+        gsto = np.mod(1.7321343856509374 + c1 * ds70 + (c1 + TWOPI) * tfrac +
+                      ts70 * ts70 * 5.07551419432269442e-15, TWOPI)
+    else:
+        gsto = gstime_vec(epoch + 2433281.5)
+
+    table['no_unkozai'] = no
+    table['gsto'] = gsto
+    table['con41'] = con41
+    table['a'] = (no * grav['tumin'])**(-X2O3)
+    table['alta'] = table['a'] * (1.0 + ecco) - 1.0
+    table['altp'] = table['a'] * (1.0 - ecco) - 1.0
+
+    isimp = rp < 220.0 / radiusearthkm + 1.0
+
+    # Perigee-dependent atmosphere parameters
+    perige = (rp - 1.0) * radiusearthkm
+    low = perige < 156.0
+    sfour = np.where(perige < 98.0, 20.0, perige - 78.0)
+    qzms24 = np.where(low, ((120.0 - sfour) / radiusearthkm)**4, qzms2t)
+    sfour = np.where(low, sfour / radiusearthkm + 1.0, ss)
+
+    pinvsq = 1.0 / posq
+    tsi = 1.0 / (ao - sfour)
+    eta = ao * ecco * tsi
+    etasq = eta * eta
+    eeta = ecco * eta
+    psisq = np.abs(1.0 - etasq)
+    coef = qzms24 * tsi**4
+    coef1 = coef / psisq**3.5
+    cc2 = coef1 * no * (ao * (1.0 + 1.5 * etasq + eeta * (4.0 + etasq)) +
+                        0.375 * j2 * tsi / psisq * con41 * (8.0 + 3.0 * etasq * (8.0 + etasq)))
+    cc1 = bstar * cc2
+    eccentric = ecco > 1.0e-4
+    safe_ecco = np.where(eccentric, ecco, 1.0)
+    cc3 = np.where(eccentric, -2.0 * coef * tsi * j3oj2 * no * sinio / safe_ecco, 0.0)
+    x1mth2 = 1.0 - cosio2
+    cc4 = 2.0 * no * coef1 * ao * omeosq * (
+        eta * (2.0 + 0.5 * etasq) + ecco * (0.5 + 2.0 * etasq) -
+        j2 * tsi / (ao * psisq) * (-3.0 * con41 * (1.0 - 2.0 * eeta + etasq * (1.5 - 0.5 * eeta)) +
+                                   0.75 * x1mth2 * (2.0 * etasq - eeta * (1.0 + etasq)) * np.cos(2.0 * argpo)))
+    cc5 = 2.0 * coef1 * ao * omeosq * (1.0 + 2.75 * (etasq + eeta) + eeta * etasq)
+    cosio4 = cosio2 * cosio2
+    temp1 = 1.5 * j2 * pinvsq * no
+    temp2 = 0.5 * temp1 * j2 * pinvsq
+    temp3 = -0.46875 * j4 * pinvsq * pinvsq * no
+    mdot = (no + 0.5 * temp1 * rteosq * con41 +
+            0.0625 * temp2 * rteosq * (13.0 - 78.0 * cosio2 + 137.0 * cosio4))
+    argpdot = (-0.5 * temp1 * con42 + 0.0625 * temp2 * (7.0 - 114.0 * cosio2 + 395.0 * cosio4) +
+               temp3 * (3.0 - 36.0 * cosio2 + 49.0 * cosio4))
+    xhdot1 = -temp1 * cosio
+    nodedot = xhdot1 + (0.5 * temp2 * (4.0 - 19.0 * cosio2) + 2.0 * temp3 * (3.0 - 7.0 * cosio2)) * cosio
+    xpidot = argpdot + nodedot
+    safe_eeta = np.where(eccentric, eeta, 1.0)
+    denom = np.where(np.abs(cosio + 1.0) > 1.5e-12, 1.0 + cosio, TEMP4)
+
+    table.update(
+        eta=eta, cc1=cc1, cc4=cc4, cc5=cc5, x1mth2=x1mth2, mdot=mdot, argpdot=argpdot,
+        nodedot=nodedot,
+        omgcof=bstar * cc3 * np.cos(argpo),
+        xmcof=np.where(eccentric, -X2O3 * coef * bstar / safe_eeta, 0.0),
+        nodecf=3.5 * omeosq * xhdot1 * cc1,
+        t2cof=1.5 * cc1,
+        xlcof=-0.25 * j3oj2 * sinio * (3.0 + 5.0 * cosio) / denom,
+        aycof=-0.5 * j3oj2 * sinio,
+        delmo=(1.0 + eta * np.cos(mo))**3,
+        sinmao=np.sin(mo),
+        x7thm1=7.0 * cosio2 - 1.0)
+
+    # Deep space for periods of 225 min and longer
+    deep = TWOPI / no >= 225.0
+    isimp = isimp | deep
+    for name in DS_FIELDS:
+        table[name] = np.zeros(n, dtype=np.int8 if name == 'irez' else float)
+    d = np.flatnonzero(deep)
+    if len(d) > 0:
+        ds = dscom_vec(epoch[d], ecco[d], argpo[d], 0.0, inclo[d], nodeo[d], no[d])
+        coef_ds = dsinit_vec(xke, ds, argpo[d], gsto[d], mo[d], mdot[d], no[d], nodeo[d],
+                             nodedot[d], xpidot[d], ecco[d], inclo[d])
+        for name in DS_FIELDS:
+            table[name][d] = ds[name] if name in ds else coef_ds[name]
+    table['deep'] = deep
+    table['isimp'] = isimp
+
+    # Higher-order drag terms of the full (non-simplified) model
+    cc1sq = cc1 * cc1
+    d2 = 4.0 * ao * tsi * cc1sq
+    temp = d2 * tsi * cc1 / 3.0
+    d3 = (17.0 * ao + sfour) * temp
+    d4 = 0.5 * temp * ao * tsi * (221.0 * ao + 31.0 * sfour) * cc1
+    full = ~isimp
+    table['d2'] = np.where(full, d2, 0.0)
+    table['d3'] = np.where(full, d3, 0.0)
+    table['d4'] = np.where(full, d4, 0.0)
+    table['t3cof'] = np.where(full, d2 + 2.0 * cc1sq, 0.0)
+    table['t4cof'] = np.where(full, 0.25 * (3.0 * d3 + cc1 * (12.0 * d2 + 10.0 * cc1sq)), 0.0)
+    table['t5cof'] = np.where(full, 0.2 * (3.0 * d4 + 12.0 * cc1 * d3 + 6.0 * d2 * d2 +
+                                           15.0 * cc1sq * (2.0 * d2 + cc1sq)), 0.0)
+
+    sgp4_vec(table, 0.0)
+    return table
+
+def sgp4_vec(table, tsince, out=None):
+    """
+    Propagate a satrec table with SGP4/SDP4
+
+    Parameters:
+    -----------
+    table : dict
+        Satrec table initialized by sgp4init_vec
+    tsince : float or ndarray
+        Time since epoch [min], scalar or one per satellite
+    out : tuple, optional
+        Buffers (r, v) of shape (n, 3) to write into
+
+    Returns:
+    --------
+    r : ndarray
+        TEME position [km], shape (n, 3); zero where error is 1-4
+    v : ndarray
+        TEME velocity [km/s], shape (n, 3); zero where error is 1-4
+    error : ndarray
+        0 ok, 1 mean eccentricity out of range, 2 mean motion <= 0,
+        3 perturbed eccentricity out of range, 4 semi-latus rectum < 0,
+        6 decayed (radius below one Earth radius), shape (n,)
+
+    The mean elements at tsince are stored in the table as in the satrec:
+    am [Earth radii], em, im, Om, om, mm [rad], nm [rad/min], and the error
+    code as table['error'].
+    """
+    grav = getgravc_vec(table['whichconst'])
+    xke, j2, j3oj2 = grav['xke'], grav['j2'], grav['j3oj2']
+    radiusearthkm = grav['radiusearthkm']
+    vkmpersec = radiusearthkm * xke / 60.0
+    opsmode = table['opsmode']
+
+    n = len(table['ecco'])
+    t = np.broadcast_to(np.asarray(tsince, dtype=float), (n,))
+    error = np.zeros(n, dtype=np.int8)
+    isimp = table['isimp']
+    full = ~isimp
+
+    # Secular gravity and atmospheric drag
+    xmdf = table['mo'] + table['mdot'] * t
+    argpdf = table['argpo'] + table['argpdot'] * t
+    nodedf = table['nodeo'] + table['nodedot'] * t
+    t2 = t * t
+    nodem = nodedf + table['nodecf'] * t2
+    tempa = 1.0 - table['cc1'] * t
+    tempe = table['bstar'] * table['cc4'] * t
+    templ = table['t2cof'] * t2
+
+    delomg = table['omgcof'] * t
+    delm = table['xmcof'] * ((1.0 + table['eta'] * np.cos(xmdf))**3 - table['delmo'])
+    temp = np.where(full, delomg + delm, 0.0)
+    mm = xmdf + temp
+    argpm = argpdf - temp
+    t3 = t2 * t
+    t4 = t3 * t
+    tempa = np.where(full, tempa - table['d2'] * t2 - table['d3'] * t3 - table['d4'] * t4, tempa)
+    tempe = np.where(full, tempe + table['bstar'] * table['cc5'] * (np.sin(mm) - table['sinmao']), tempe)
+    templ = np.where(full, templ + table['t3cof'] * t3 + t4 * (table['t4cof'] + t * table['t5cof']), templ)
+
+    nm = table['no_unkozai']
+    em = table['ecco']
+    inclm = table['inclo']
+
+    deep = np.flatnonzero(table['deep'])
+    if len(deep) > 0:
+        sat = {name: table[name][deep] for name in DS_FIELDS + ('gsto', 'no_unkozai', 'argpo', 'argpdot')}
+        em_d, argpm_d, inclm_d, mm_d, nodem_d, nm_d = dspace_vec(
+            sat, t[deep], em[deep], argpm[deep], inclm[deep], mm[deep], nodem[deep], nm[deep])
+        em, inclm, nm = em.copy(), inclm.copy(), nm.copy()
+        em[deep], argpm[deep], inclm[deep] = em_d, argpm_d, inclm_d
+        mm[deep], nodem[deep], nm[deep] = mm_d, nodem_d, nm_d
+
+    error[nm <= 0.0] = 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        am = (xke / nm)**X2O3 * tempa * tempa
+        nm = xke / am**1.5
+    em = em - tempe
+    error[(error == 0) & ((em >= 1.0) | (em < -0.001) | ~np.isfinite(am))] = 1
+    em = np.maximum(em, 1.0e-6)
+    mm = mm + table['no_unkozai'] * templ
+    xlm = mm + argpm + nodem
+    nodem = np.fmod(nodem, TWOPI)
+    argpm = np.mod(argpm, TWOPI)
+    xlm = np.mod(xlm, TWOPI)
+    mm = np.mod(xlm - argpm - nodem, TWOPI)
+
+    table.update(am=am, em=em, im=inclm, Om=nodem, om=argpm, mm=mm, nm=nm)
+
+    # Lunar-solar periodics
+    ep = em
+    xincp = inclm
+    argpp = argpm
+    nodep = nodem
+    mp = mm
+    aycof = table['aycof']
+    xlcof = table['xlcof']
+    con41 = table['con41']
+    x1mth2 = table['x1mth2']
+    x7thm1 = table['x7thm1']
+    if len(deep) > 0:
+        ep_d, xincp_d, nodep_d, argpp_d, mp_d = dpper_vec(
+            sat, t[deep], ep[deep], xincp[deep], nodep[deep], argpp[deep], mp[deep], opsmode)
+        flip = xincp_d < 0.0
+        xincp_d = np.where(flip, -xincp_d, xincp_d)
+        nodep_d = np.where(flip, nodep_d + np.pi, nodep_d)
+        argpp_d = np.where(flip, argpp_d - np.pi, argpp_d)
+        bad = (ep_d < 0.0) | (ep_d > 1.0)
+        error[deep[bad & (error[deep] == 0)]] = 3
+
+        ep, xincp, nodep, argpp, mp = ep.copy(), xincp.copy(), nodep.copy(), argpp.copy(), mp.copy()
+        ep[deep], xincp[deep], nodep[deep], argpp[deep], mp[deep] = ep_d, xincp_d, nodep_d, argpp_d, mp_d
+
+        # Long-period and short-period coefficients of the perturbed inclination
+        sinip = np.sin(xincp_d)
+        cosip = np.cos(xincp_d)
+        aycof, xlcof = aycof.copy(), xlcof.copy()
+        con41, x1mth2, x7thm1 = con41.copy(), x1mth2.copy(), x7thm1.copy()
+        aycof[deep] = -0.5 * j3oj2 * sinip
+        denom = np.where(np.abs(cosip + 1.0) > 1.5e-12, 1.0 + cosip, TEMP4)
+        xlcof[deep] = -0.25 * j3oj2 * sinip * (3.0 + 5.0 * cosip) / denom
+        cosisq = cosip * cosip
+        con41[deep] = 3.0 * cosisq - 1.0
+        x1mth2[deep] = 1.0 - cosisq
+        x7thm1[deep] = 7.0 * cosisq - 1.0
+
+    # Long-period periodics
+    with np.errstate(invalid='ignore', divide='ignore'):
+        axnl = ep * np.cos(argpp)
+        temp = 1.0 / (am * (1.0 - ep * ep))
+        aynl = ep * np.sin(argpp) + temp * aycof
+        xl = mp + argpp + nodep + temp * xlcof * axnl
+
+        # Kepler's equation for the modified eccentric anomaly
+        u = np.mod(xl - nodep, TWOPI)
+        eo1 = u.copy()
+        sineo1 = np.zeros(n)
+        coseo1 = np.zeros(n)
+        active = np.flatnonzero(np.isfinite(u))
+        for _ in range(10):
+            if len(active) == 0:
+                break
+            s = np.sin(eo1[active])
+            c = np.cos(eo1[active])
+            sineo1[active] = s
+            coseo1[active] = c
+            ax = axnl[active]
+            ay = aynl[active]
+            tem5 = (u[active] - ay * c + ax * s - eo1[active]) / (1.0 - c * ax - s * ay)
+            tem5 = np.clip(tem5, -0.95, 0.95)
+            eo1[active] += tem5
+            active = active[np.abs(tem5) >= 1.0e-12]
+
+        # Short-period periodics
+        ecose = axnl * coseo1 + aynl * sineo1
+        esine = axnl * sineo1 - aynl * coseo1
+        el2 = axnl * axnl + aynl * aynl
+        pl = am * (1.0 - el2)
+        error[(error == 0) & ~(pl >= 0.0)] = 4
+
+        rl = am * (1.0 - ecose)
+        rdotl = np.sqrt(am) * esine / rl
+        rvdotl = np.sqrt(pl) / rl
+        betal = np.sqrt(1.0 - el2)
+        temp = esine / (1.0 + betal)
+        sinu = am / rl * (sineo1 - aynl - axnl * temp)
+        cosu = am / rl * (coseo1 - axnl + aynl * temp)
+        su = np.arctan2(sinu, cosu)
+        sin2u = (cosu + cosu) * sinu
+        cos2u = 1.0 - 2.0 * sinu * sinu
+        temp = 1.0 / pl
+        temp1 = 0.5 * j2 * temp
+        temp2 = temp1 * temp
+
+        mrt = rl * (1.0 - 1.5 * temp2 * betal * con41) + 0.5 * temp1 * x1mth2 * cos2u
+        su = su - 0.25 * temp2 * x7thm1 * sin2u
+        cosip = np.cos(xincp)
+        sinip = np.sin(xincp)
+        xnode = nodep + 1.5 * temp2 * cosip * sin2u
+        xinc = xincp + 1.5 * temp2 * cosip * sinip * cos2u
+        mvt = rdotl - nm * temp1 * x1mth2 * sin2u / xke
+        rvdot = rvdotl + nm * temp1 * (x1mth2 * cos2u + 1.5 * con41) / xke
+
+    # Orientation vectors
+    sinsu = np.sin(su)
+    cossu = np.cos(su)
+    snod = np.sin(xnode)
+    cnod = np.cos(xnode)
+    sini = np.sin(xinc)
+    cosi = np.cos(xinc)
+    xmx = -snod * cosi
+    xmy = cnod * cosi
+    uvec = np.stack([xmx * sinsu + cnod * cossu, xmy * sinsu + snod * cossu, sini * sinsu], axis=1)
+    vvec = np.stack([xmx * cossu - cnod * sinsu, xmy * cossu - snod * sinsu, sini * cossu], axis=1)
+
+    if out is None:
+        r = np.empty((n, 3))
+        v = np.empty((n, 3))
+    else:
+        r, v = out
+    np.multiply((mrt * radiusearthkm)[:, None], uvec, out=r)
+    np.multiply(vkmpersec, mvt[:, None] * uvec + rvdot[:, None] * vvec, out=v)
+
+    failed = error != 0
+    r[failed] = 0.0
+    v[failed] = 0.0
+    error[~failed & (mrt < 1.0)] = 6
+
+    table['error'] = error
+    return r, v, error
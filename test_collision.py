@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Collision screening tests for MOCAT-MC Python conversion
+Checks candidate pair generation against brute-force references
+"""
+
+import sys
+import tempfile
+
+sys.path.append('supporting_functions')
+sys.path.append('Examples/Quick_Start')
+
+def _brute_force_pairs(X, CUBE_RES, collision_alt_limit, valid):
+    """All (i, j), i < j, of valid rows sharing a cube, ordered by cube then row"""
+    import numpy as np
+
+    ok = valid & np.all(np.abs(X) <= collision_alt_limit, axis=1)
+    cells = np.floor(X / CUBE_RES).astype(np.int64)
+    pairs = [(i, j) for i in range(len(X)) for j in range(i + 1, len(X))
+             if ok[i] and ok[j] and np.array_equal(cells[i], cells[j])]
+    pairs.sort(key=lambda p: (tuple(cells[p[0]]), p))
+    return np.array(pairs, dtype=np.intp).reshape(-1, 2)
+
+def test_cube_pairs():
+    """Test sort-based cube grouping against a brute-force search"""
+    print("Testing cube_vec_v3 candidate pairs...")
+
+    import numpy as np
+    from cube_vec_v3 import cube_vec_v3
+
+    rng = np.random.RandomState(0)
+    X = rng.uniform(-60, 60, (400, 3))
+    X[::9] *= 200  # beyond the altitude limit
+    valid = rng.random(len(X)) > 0.1
+
+    pairs = cube_vec_v3(X, 20, 8000, valid)
+    reference = _brute_force_pairs(X, 20, 8000, valid)
+    assert pairs.shape == reference.shape and pairs.shape[0] > 100
+    assert np.array_equal(pairs, reference)
+    assert np.all(pairs[:, 0] < pairs[:, 1])
+
+    assert cube_vec_v3(X, 20, 8000, np.zeros(len(X), dtype=bool)).shape == (0, 2)
+
+    # Neighbouring 1 m cubes far from the origin stay distinct (float keys
+    # lose the z coordinate here); NaN positions are ignored
+    X = np.array([[40000, -40000, 39999.9994], [40000, -40000, 40000.0004],
+                  [-40000, 40000, 0], [np.nan, np.nan, np.nan]])
+    assert cube_vec_v3(X, 1e-3, 45000).shape == (0, 2)
+    X[1, 2] = 39999.9996
+    assert np.array_equal(cube_vec_v3(X, 1e-3, 45000), [[0, 1]])
+
+    print("✓ Every pair sharing a cube is found once, in cube order")
+    return True
+
+def test_pair_sampling():
+    """Test that capped cubes give unbiased, weighted pair samples"""
+    print("\nTesting pair sampling in over-dense cubes...")
+
+    import numpy as np
+    from cube_vec_v3 import cube_vec_v3, effective_sample_size
+
+    rng = np.random.RandomState(1)
+    X = rng.uniform(-100, 100, (600, 3))
+    X[:200] = rng.uniform(0, 10, (200, 3))  # one cube with 19900 pairs
+    full = cube_vec_v3(X, 50, 8000)
+
+    pairs, weight = cube_vec_v3(X, 50, 8000, max_pairs=len(full))
+    assert np.array_equal(pairs, full) and np.all(weight == 1)
+    assert effective_sample_size(weight) == len(full)
+
+    f = lambda p: np.sin(p[:, 0]) + np.sqrt(p[:, 1])
+    estimates = []
+    for _ in range(200):
+        pairs, weight = cube_vec_v3(X, 50, 8000, max_pairs=50, rng=rng)
+        assert np.all(pairs[:, 0] < pairs[:, 1])
+        assert np.isclose(weight.sum(), len(full))
+        estimates.append(np.sum(weight * f(pairs)))
+    assert len(pairs) < len(full) / 10
+    assert effective_sample_size(weight) < len(pairs)
+    assert abs(np.mean(estimates) - f(full).sum()) < 4 * np.std(estimates) / np.sqrt(len(estimates))
+
+    # Sampled pairs carry the members of their cube, on shifted grids too
+    for n_grids in [1, 3]:
+        pairs, weight, runs, members = cube_vec_v3(X, 50, 8000, max_pairs=50, rng=rng, n_grids=n_grids,
+                                                   return_runs=True)
+        sampled = runs[:, 1] > 0
+        assert sampled.any() and np.all(weight[~sampled] <= 1)
+        for (i, j), (start, length) in zip(pairs[sampled], runs[sampled]):
+            cube = members[start:start + length]
+            assert i in cube and j in cube and len(np.unique(cube)) == length and length * (length - 1) // 2 > 50
+
+    print("✓ Weighted samples reproduce the full pair sum on average")
+    return True
+
+def test_shifted_grids():
+    """Test random-offset grid averaging against the exact co-location probability"""
+    print("\nTesting shifted-grid averaging...")
+
+    import numpy as np
+    from cube_vec_v3 import cube_vec_v3
+
+    rng = np.random.RandomState(2)
+    X = np.array([[0.0, 0.0, 0.0], [10.0, -5.0, 20.0], [1000.0, 0.0, 0.0]])
+
+    pairs, weight = cube_vec_v3(X, 50, 8000, rng=rng, n_grids=2000)
+    assert np.array_equal(pairs, [[0, 1]])
+    # A randomly placed grid puts both objects in one cube with probability
+    # prod(1 - |dx| / CUBE_RES)
+    expected = (1 - 10 / 50) * (1 - 5 / 50) * (1 - 20 / 50)
+    assert abs(weight[0] - expected) < 0.03
+
+    pairs, weight = cube_vec_v3(X, 50, 8000, rng=rng, n_grids=4)
+    assert np.all(np.isin(weight, [0.25, 0.5, 0.75, 1.0]))
+
+    print("✓ Grid-averaged weights match the co-location probability")
+    return True
+
+def test_altitude_bands():
+    """Test the band-group prefilter: same cube pairs, consistent incremental updates"""
+    print("\nTesting altitude-band prefilter...")
+
+    import numpy as np
+    from altitude_bands import AltitudeBands
+    from cube_vec_v3 import cube_vec_v3
+    from prop_mit_vec import prop_mean_anomaly_cols
+
+    req = 6378.137
+    param = {'mu': 398600.4418, 'req': req, 'j2': 1.08262668e-3}
+    rng = np.random.RandomState(3)
+    n = 3000
+    oe = np.zeros((n, 6))
+    shells = rng.choice([550, 1200, 20000, 35786], n, p=[0.7, 0.25, 0.03, 0.02])
+    oe[:, 0] = 1 + (shells + rng.uniform(0, 2, n)) / req
+    oe[:, 1] = rng.uniform(0, 0.001, n)
+    oe[:20, 0] = 1 + rng.uniform(2000, 19000, 20) / req  # isolated objects
+    oe[:, 2:] = rng.uniform(0, 2 * np.pi, (n, 4))
+    live = rng.random(n) > 0.05
+
+    CUBE_RES = 10
+    bands = AltitudeBands(CUBE_RES, np.sqrt(3) / 2 * CUBE_RES, np.sqrt(3) * 45000)
+    groups = bands.update(oe, live, req)
+    candidates = groups >= 0
+    assert candidates.sum() < live.sum() and not np.any(candidates & ~live)
+    # One group per populated shell
+    shell_groups = [np.unique(groups[20:][candidates[20:] & (shells[20:] == shell)])
+                    for shell in [550, 1200, 20000, 35786]]
+    assert all(len(g) == 1 for g in shell_groups) and len(np.unique(shell_groups)) == 4
+    r, _ = prop_mean_anomaly_cols(oe, 0.0, param)
+    assert np.array_equal(cube_vec_v3(r, CUBE_RES, 45000, groups=groups), cube_vec_v3(r, CUBE_RES, 45000, live))
+
+    # Only touched and removed slots are refreshed; incremental updates
+    # match a fresh tracker after decay, removals and compaction
+    oe[:500, 0] -= 30 / req
+    assert np.array_equal(bands.update(oe, live, req), groups)
+    bands.touch(np.arange(500))
+    live[rng.choice(n, 300)] = False
+    keep = np.flatnonzero(live)
+    remap = np.full(n, -1)
+    remap[keep] = np.arange(len(keep))
+    bands.update(oe, live, req)
+    bands.remap(remap)
+    fresh = AltitudeBands(CUBE_RES, np.sqrt(3) / 2 * CUBE_RES, np.sqrt(3) * 45000)
+    ones = np.ones(len(keep), dtype=bool)
+    assert np.array_equal(bands.update(oe[keep], ones, req), fresh.update(oe[keep], ones, req))
+
+    print("✓ Prefilter keeps every cube pair and tracks the band groups incrementally")
+    return True
+
+def test_substep_screening():
+    """Test multi-epoch screening against the single-epoch cube test"""
+    print("\nTesting sub-step collision screening...")
+
+    import numpy as np
+    from main_mc import Simulation
+    from prop_mit_vec import prop_mean_anomaly_cols
+    from test_simulation import _make_config
+
+    with tempfile.TemporaryDirectory() as ic_dir:
+        cfg = _make_config(ic_dir, n_sats=400, n_time=3)
+    cfg['CUBE_RES'] = 1000
+    sim = Simulation(cfg, 1)
+    sim.step()
+    pop = sim.state.pop
+    rows = pop.live_rows()
+
+    # Zero offset reproduces the propagated state
+    r, v = prop_mean_anomaly_cols(pop['oe'], 0.0, sim.state.param, rows=rows)
+    assert np.allclose(r[rows], pop['r'][rows]) and np.allclose(v[rows], pop['v'][rows])
+
+    pairs1, prob1 = sim._collision_candidates(1)[:2]
+    sim.n_collision_samples = 4
+    pairs4, prob4 = sim._collision_candidates(1)[:2]
+    assert len(pairs1) > 0 and len(np.unique(pairs4, axis=0)) == len(pairs4)
+    assert np.array_equal(pairs4[:len(pairs1)], pairs1)
+    assert np.all(prob4[:len(pairs1)] >= prob1 / 4 * (1 - 1e-12))
+
+    print("✓ Sub-step samples accumulate probability per pair")
+    return True
+
+def test_expected_collisions():
+    """Test the expected-rate accounting of sampling and expected-only runs"""
+    print("\nTesting expected collision rates...")
+
+    import numpy as np
+    from main_mc import main_mc, Simulation
+    from ensemble_mc import run_ensemble
+    from test_simulation import _make_config
+
+    with tempfile.TemporaryDirectory() as ic_dir:
+        cfg = _make_config(ic_dir, n_sats=400, n_time=6)
+    # A tight train of large objects on one orbit: certain collisions
+    mat_sats = cfg['mat_sats']
+    mat_sats[:, 0] = 1 + 550 / 6378.137
+    mat_sats[:, 1:6] = [1e-3, 0.9, 1.0, 0.0, 0.0]
+    mat_sats[:, 5] = np.random.RandomState(5).uniform(0, 0.05, len(mat_sats))
+    mat_sats[:, 8] *= 1000
+
+    sampled = Simulation(cfg, 1)
+    sampled.run()
+    cfg['collision_mode'] = 'expected'
+    expected = Simulation(cfg, 1)
+    expected.run()
+
+    state = expected.state
+    assert state.count_coll.sum() == 0 and sampled.state.count_coll.sum() > 0
+    assert state.expected_coll.sum() > 0
+    assert np.allclose(state.expected_coll_species.sum(axis=(1, 2)), state.expected_coll)
+    assert np.all(state.expected_coll_shell.sum(axis=1) <= state.expected_coll + 1e-12)
+    assert np.all(np.tril(state.expected_coll_species, -1) == 0)
+    # Same population until the first sampled breakup
+    assert state.expected_coll[1] == sampled.state.expected_coll[1]
+
+    # The series are part of the main_mc and ensemble results
+    result = main_mc(cfg, 1)
+    assert all(np.array_equal(x, y) for x, y in zip(result[-3:], (
+        state.expected_coll, state.expected_coll_shell, state.expected_coll_species)))
+    (seed, result), = run_ensemble(cfg, [1], max_workers=1)
+    assert all(np.array_equal(x, y) for x, y in zip(result[-3:], (
+        state.expected_coll, state.expected_coll_shell, state.expected_coll_species)))
+
+    print("✓ Expected collisions are accounted per shell and species pair")
+    return True
+
+def test_conjunction_screen():
+    """Test k-d tree conjunction screening against an all-pairs search"""
+    print("\nTesting conjunction screening...")
+
+    import numpy as np
+    from conjunction_screen import conjunction_screen, conjunction_screen_window
+    from prop_mit_vec import prop_mean_anomaly_cols
+
+    rng = np.random.RandomState(4)
+    r = rng.uniform(-300, 300, (500, 3))
+    v = rng.normal(0, 7, (500, 3))
+    dist = np.sqrt(np.sum((r[:, None] - r[None]) ** 2, axis=2))
+    reference = np.argwhere(np.triu(dist < 30, 1))
+
+    pairs, miss, vrel = conjunction_screen(r, v, 30)
+    assert np.array_equal(pairs, reference)
+    assert np.allclose(miss, dist[pairs[:, 0], pairs[:, 1]])
+    assert np.allclose(vrel, np.linalg.norm(v[pairs[:, 0]] - v[pairs[:, 1]], axis=1))
+
+    primary = np.arange(0, 500, 7)
+    pairs_p, miss_p, _ = conjunction_screen(r, v, 30, primary=primary)
+    involved = np.isin(reference, primary).any(axis=1)
+    assert np.array_equal(pairs_p, reference[involved]) and np.allclose(miss_p, miss[involved])
+
+    # Over a window, every pair is reported once at its closest sampled epoch
+    param = {'mu': 398600.4418, 'req': 6378.137, 'j2': 1.08262668e-3}
+    oe = np.column_stack([1 + rng.uniform(500, 510, 300) / param['req'], rng.uniform(0, 1e-3, 300),
+                          np.tile([0.9, 1.0, 0.0], (300, 1)) + rng.normal(0, 1e-3, (300, 3)),
+                          rng.uniform(0, 0.2, 300)])
+    t = [0, -60, -120]
+    primary = primary[primary < len(oe)]
+    pairs_w, miss_w, _, t_w = conjunction_screen_window(oe, t, 10, param, primary=primary)
+    closest = {}
+    for t_k in t:
+        pairs_k, miss_k, _, _ = conjunction_screen_window(oe, [t_k], 10, param, primary=primary)
+        for pair, d in zip(map(tuple, pairs_k), miss_k):
+            closest[pair] = min(d, closest.get(pair, np.inf))
+    assert sorted(closest) == list(map(tuple, pairs_w)) and len(pairs_w) > 0
+    assert np.all(miss_w <= np.array([closest[pair] for pair in map(tuple, pairs_w)]) + 1e-9)
+    assert np.all((t_w >= -120) & (t_w <= 0))
+
+    # On a grid finer than threshold / v_rel the refined approaches match a dense search
+    n = 100
+    oe = np.column_stack([np.full(n, 1 + 600 / param['req']), np.zeros(n), np.repeat([0.9, 1.2], n // 2),
+                          np.zeros((n, 2)), rng.uniform(0, 0.3, n)])
+    plane_a = np.arange(n // 2)
+    pairs_w, miss_w, vrel_w, t_w = conjunction_screen_window(oe, np.arange(-300, 0.1, 4.0), 10, param,
+                                                             primary=plane_a)
+    crossing = pairs_w[:, 1] >= n // 2
+    pairs_w, miss_w, t_w = pairs_w[crossing], miss_w[crossing], t_w[crossing]
+    assert np.all(4.0 <= 10 / vrel_w[crossing])
+
+    t_dense = np.arange(-300, 0.01, 0.1)
+    dist = np.array([np.linalg.norm(r[plane_a, None] - r[None, n // 2:], axis=2)
+                     for r in (prop_mean_anomaly_cols(oe, t_k, param)[0] for t_k in t_dense)])
+    approach = np.argwhere(dist.min(axis=0) < 8.5) + [0, n // 2]
+    assert len(approach) > 0 and np.all(np.isin(approach @ [1, n], pairs_w @ [1, n]))
+    i, j = pairs_w[:, 0], pairs_w[:, 1] - n // 2
+    assert np.allclose(miss_w, dist[:, i, j].min(axis=0), atol=0.1)
+    assert np.allclose(t_w, t_dense[dist[:, i, j].argmin(axis=0)], atol=0.1)
+
+    print("✓ k-d tree screen matches the all-pairs search, refined approaches the dense search")
+    return True
+
+def test_dense_cube_events():
+    """Test that sampled pairs of dense cubes keep the expected number of events"""
+    print("\nTesting collision events of sampled dense cubes...")
+
+    import contextlib
+    import io
+    import numpy as np
+    from main_mc import Simulation
+    from test_simulation import _make_config
+
+    with tempfile.TemporaryDirectory() as ic_dir:
+        cfg = _make_config(ic_dir, n_sats=400, n_time=2)
+    # A train of large objects within one or two cubes, two sampled pairs per cube
+    mat_sats = cfg['mat_sats']
+    mat_sats[:, 0] = 1 + 550 / 6378.137
+    mat_sats[:, 1:6] = [1e-3, 0.9, 1.0, 0.0, 0.0]
+    mat_sats[:, 5] = np.random.RandomState(5).uniform(0, 0.003, len(mat_sats))
+    mat_sats[:, 8] *= 3000
+    cfg['max_pairs_per_cube'] = 2
+
+    # Also on shifted grids and sub-step samples, whose cubes differ from
+    # the cubes of the end-of-step positions
+    for n_grids, n_samples in [(1, 1), (3, 2)]:
+        cfg['n_collision_grids'] = n_grids
+        cfg['n_collision_samples'] = n_samples
+        n_coll = []
+        n_expected = []
+        for seed in range(8):
+            with contextlib.redirect_stdout(io.StringIO()):
+                sim = Simulation(cfg, seed)
+                sim.step()
+            n_coll.append(sim.state.count_coll[1])
+            n_expected.append(sim.state.expected_coll[1])
+
+        # Far more events than sampled pairs, as many as expected (the expected
+        # count is not truncated per weighted pair)
+        assert np.mean(n_expected) > 8
+        assert abs(np.mean(n_coll) - np.mean(n_expected)) < 0.25 * np.mean(n_expected)
+
+    print("✓ Dense cubes give", np.mean(n_coll), "collisions per step for", np.mean(n_expected), "expected")
+    return True
+
+def main():
+    """Run all tests"""
+    print("MOCAT-MC Python Conversion - Collision Test")
+    print("=" * 50)
+
+    tests = [
+        test_cube_pairs,
+        test_pair_sampling,
+        test_shifted_grids,
+        test_altitude_bands,
+        test_substep_screening,
+        test_expected_collisions,
+        test_dense_cube_events,
+        test_conjunction_screen
+    ]
+
+    passed = sum(1 for test in tests if test())
+
+    print(f"\n==================================================")
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    main()
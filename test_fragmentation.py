@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Fragmentation tests for MOCAT-MC Python conversion
+Checks the batched breakup model and its vectorized helpers
+"""
+
+import sys
+
+sys.path.append('supporting_functions')
+
+def _make_parents():
+    """Two explosion/collision parents and partners: [mass, radius, r, v, objectclass]"""
+    import numpy as np
+
+    p1_in = np.array([[1500, 2.0, 7000, 0, 0, 0, 7.5, 0, 5],
+                      [500, 1.0, 0, 7000, 0, -7.5, 0, 0, 1]], dtype=float)
+    p2_in = np.array([[500, 1.0, 7000, 0, 0, 0, 0, 7.5, 1],
+                      [5, 0.1, 0, 7000, 0, 0, -7.5, 0.1, 10]], dtype=float)
+    return p1_in, p2_in
+
+def test_vectorized_helpers():
+    """Test func_Am on scalars and rv2coe_vec on a known orbit"""
+    print("Testing vectorized func_Am / rv2coe_vec...")
+
+    import numpy as np
+    from func_Am import func_Am
+    from rv2coe_vec import rv2coe_vec
+
+    rng = np.random.RandomState(0)
+    Am = func_Am(0.5, 5, rng)  # scalar diameter (remnants)
+    assert Am.shape == (1,) and Am[0] > 0
+    Am = func_Am(np.logspace(-1, 0, 50), np.resize([1, 5], 50), rng)
+    assert Am.shape == (50,) and np.all(np.isfinite(Am))
+
+    mu = 398600.4418
+    r = np.array([[7000, 0, 0], [0, 8000, 0]])
+    v = np.array([[0, np.sqrt(mu / 7000), 0], [0, 0, 1.1 * np.sqrt(mu / 8000)]])
+    p, a, e, i, omega, argp, nu, m, _, _, _ = rv2coe_vec(r, v, mu)
+    assert abs(a[0] - 7000) < 1e-6 and e[0] < 1e-10 and i[0] < 1e-10
+    assert a[1] > 8000 and abs(i[1] - np.pi / 2) < 1e-12 and abs(nu[1]) < 1e-12
+
+    print("✓ func_Am accepts scalars, rv2coe_vec recovers known orbits")
+    return True
+
+def test_batched_fragmentation():
+    """Test offsets, IDs and mass budgets of the batch breakup model"""
+    print("\nTesting batched fragmentation...")
+
+    import numpy as np
+    from frag_SBM_batch import frag_col_SBM_batch, frag_exp_SBM_batch
+    from frag_col_SBM_vec import frag_col_SBM_vec
+    from frag_exp_SBM_vec import frag_exp_SBM_vec
+    from getidx import idx_mass, idx_objectclass, idx_ID
+
+    p1_in, p2_in = _make_parents()
+    param = {'max_frag': np.inf, 'mu': 398600.4418, 'req': 6378.137, 'maxID': 100}
+    rng = np.random.RandomState(1)
+
+    debris, offsets = frag_exp_SBM_batch(0.0, p1_in, param, rng)
+    assert offsets[0] == 0 and offsets[-1] == len(debris) and len(offsets) == 3
+    assert np.array_equal(debris[:, idx_ID], np.arange(101, 101 + len(debris)))
+    assert param['maxID'] == 100 + len(debris)
+    for k in range(2):
+        assert debris[offsets[k]:offsets[k + 1], idx_mass].sum() <= p1_in[k, 0] * (1 + 1e-12)
+    assert np.all(debris[:, idx_objectclass] == 2)
+
+    maxID = param['maxID']
+    debris, offsets = frag_col_SBM_batch(0.0, p1_in, p2_in, param, rng)
+    assert len(offsets) == 3 and offsets[-1] == len(debris) > 0
+    assert param['maxID'] == maxID + len(debris)
+    assert len(np.unique(debris[:, idx_ID])) == len(debris)
+    # Catastrophic collisions: debris mass bounded by the total mass
+    assert debris[:offsets[1], idx_mass].sum() <= (p1_in[0, 0] + p2_in[0, 0]) * (1 + 1e-12)
+
+    # The single-event wrappers number debris after maxID but leave it alone
+    maxID = param['maxID']
+    debris1, debris2 = frag_col_SBM_vec(0.0, p2_in[0], p1_in[0], param, rng)
+    assert len(debris1) > 0 and len(debris2) > 0 and param['maxID'] == maxID
+    assert np.array_equal(np.concatenate((debris1, debris2))[:, idx_ID],
+                          np.arange(maxID + 1, maxID + 1 + len(debris1) + len(debris2)))
+    debris1 = frag_exp_SBM_vec(0.0, p1_in[0], param, rng)
+    assert param['maxID'] == maxID and debris1[0, idx_ID] == maxID + 1
+
+    print("✓ Batch debris blocks are consistent per event")
+    return True
+
+def main():
+    """Run all tests"""
+    print("MOCAT-MC Python Conversion - Fragmentation Test")
+    print("=" * 50)
+
+    tests = [
+        test_vectorized_helpers,
+        test_batched_fragmentation
+    ]
+
+    passed = sum(1 for test in tests if test())
+
+    print(f"\n==================================================")
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Population storage tests for MOCAT-MC Python conversion
+Checks that the capacity-managed store matches np.delete / np.vstack semantics
+"""
+
+import sys
+
+sys.path.append('supporting_functions')
+
+def _make_matsats(n_sats, first_ID=1):
+    """Build a mat_sats matrix with valid flag/class/ID columns"""
+    import numpy as np
+    from getidx import idx_error, idx_controlled, idx_constel, idx_objectclass, idx_ID
+
+    mat_sats = np.random.RandomState(first_ID).random_sample((n_sats, 24))
+    for idx in (idx_error, idx_controlled, idx_constel):
+        mat_sats[:, idx] = np.round(mat_sats[:, idx])
+    mat_sats[:, idx_objectclass] = np.arange(n_sats) % 12 + 1
+    mat_sats[:, idx_ID] = np.arange(first_ID, first_ID + n_sats)
+    return mat_sats
+
+def test_column_conversion():
+    """Test the typed columns round-trip with the legacy matrix"""
+    print("Testing mat_sats <-> column conversion...")
+
+    import numpy as np
+    from getidx import idx_a, idx_r
+    from population_store import matsats_to_columns, columns_to_matsats, PopulationStore
+
+    mat_sats = _make_matsats(20)
+    cols = matsats_to_columns(mat_sats)
+    assert cols['controlled'].dtype == np.int8
+    assert cols['objectclass'].dtype == np.int32
+    assert cols['ID'].dtype == np.int64
+    assert cols['oe'].shape == (20, 6) and np.array_equal(cols['oe'][:, 0], mat_sats[:, idx_a])
+    assert np.array_equal(cols['r'], mat_sats[:, idx_r])
+    assert np.array_equal(columns_to_matsats(cols), mat_sats)
+
+    pop = PopulationStore(mat_sats)
+    pop['oe'][3, 0] = 42.0  # field views are zero-copy
+    assert pop.to_matrix()[3, idx_a] == 42.0
+    assert pop.nbytes_per_row() < 24 * 8
+
+    print("✓ Typed columns convert losslessly to and from mat_sats")
+    return True
+
+def test_remove_append_order():
+    """Test that tombstoning and appending preserve population order"""
+    print("Testing population store removal/insertion order...")
+
+    import numpy as np
+    from population_store import PopulationStore
+
+    mat_sats = _make_matsats(10)
+    pop = PopulationStore(mat_sats, capacity=12)
+    reference = mat_sats.copy()
+
+    pop.remove([2, 5, 5])
+    reference = np.delete(reference, [2, 5], axis=0)
+    assert len(pop) == 8
+    assert np.array_equal(pop.to_matrix(), reference)
+
+    new_rows = _make_matsats(7, first_ID=100)
+    pop.append(new_rows)
+    reference = np.vstack([reference, new_rows])
+    assert pop.capacity >= 17, f"Store did not grow: capacity {pop.capacity}"
+    assert np.array_equal(pop.to_matrix(), reference)
+
+    rows = pop.live_rows()
+    pop.remove(rows[[0, 9]])
+    reference = np.delete(reference, [0, 9], axis=0)
+    assert np.array_equal(pop.to_matrix(), reference)
+
+    remap = pop.compact()
+    assert pop.n_dead == 0 and pop.n_slots == len(reference)
+    assert remap[0] == -1 and remap[1] == 0 and remap[2] == -1 and remap[3] == 1
+    assert np.array_equal(pop.to_matrix(), reference)
+
+    print("✓ Population store matches np.delete / np.vstack")
+    return True
+
+def test_lazy_compaction():
+    """Test that compaction only happens past the tombstone threshold"""
+    print("\nTesting lazy compaction...")
+
+    import numpy as np
+    from population_store import PopulationStore
+
+    pop = PopulationStore(np.zeros((100, 24)), compact_ratio=0.25)
+    pop.remove(np.arange(10))
+    assert pop.maybe_compact() is None
+    assert pop.n_slots == 100 and pop.n_dead == 10
+
+    pop.remove(np.arange(10, 30))
+    assert pop.maybe_compact() is not None
+    assert pop.n_slots == 70 and pop.n_dead == 0
+
+    print("✓ Compaction deferred until 25% of slots are tombstones")
+    return True
+
+def main():
+    """Run all tests"""
+    print("MOCAT-MC Python Conversion - Population Store Test")
+    print("=" * 50)
+
+    tests = [
+        test_column_conversion,
+        test_remove_append_order,
+        test_lazy_compaction
+    ]
+
+    passed = sum(1 for test in tests if test())
+
+    print(f"\n==================================================")
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Propagation tests for MOCAT-MC Python conversion
+Checks the vectorized element conversion kernels
+"""
+
+import sys
+
+sys.path.append('supporting_functions')
+
+PARAM = {'mu': 398600.4418, 'req': 6378.137, 'j2': 1.08262668e-3}
+
+def _random_oe(n, seed=0):
+    """Elements [a,ecco,inclo,nodeo,argpo,mo] with a in km"""
+    import numpy as np
+
+    rng = np.random.RandomState(seed)
+    return np.column_stack([PARAM['req'] + rng.uniform(300, 2000, n), rng.uniform(0, 0.3, n),
+                            rng.uniform(0, np.pi, n), rng.uniform(0, 2 * np.pi, (n, 3))])
+
+def test_oe2rv_kernel():
+    """Test oe2rv_vec against rv2coe_vec, with output buffers and float32"""
+    print("Testing oe2rv_vec kernel...")
+
+    import numpy as np
+    from oe2rv_vec import oe2rv_vec
+    from rv2coe_vec import rv2coe_vec
+
+    oe = _random_oe(1000)
+    r, v = oe2rv_vec(oe, PARAM['mu'])
+    _, a, e, i, omega, argp, _, m, _, _, _ = rv2coe_vec(r, v, PARAM['mu'])
+    assert np.allclose(a, oe[:, 0], rtol=1e-10) and np.allclose(e, oe[:, 1], atol=1e-10)
+    assert np.allclose(i, oe[:, 2], atol=1e-10)
+    for x, ref in [(omega, oe[:, 3]), (argp, oe[:, 4]), (m, oe[:, 5])]:
+        assert np.allclose(np.angle(np.exp(1j * (x - ref))), 0, atol=1e-8)
+
+    r_buf = np.full((1000, 3), np.nan)
+    v_buf = np.full((1000, 3), np.nan)
+    r_out, v_out = oe2rv_vec(oe, PARAM['mu'], out=(r_buf, v_buf))
+    assert r_out is r_buf and v_out is v_buf and np.array_equal(r_buf, r)
+
+    r32, v32 = oe2rv_vec(oe, PARAM['mu'], dtype=np.float32)
+    assert r32.dtype == np.float32 and np.allclose(r32, r, atol=1e-2) and np.allclose(v32, v, atol=1e-5)
+
+    print("✓ oe2rv_vec round-trips and writes into caller buffers")
+    return True
+
+def test_kepler_solver():
+    """Test the shared Kepler solver on elliptic, circular and hyperbolic orbits"""
+    print("\nTesting Kepler solver...")
+
+    import numpy as np
+    from new_analytic_propagator.kepler_solve import kepler_solve, numba
+
+    rng = np.random.RandomState(1)
+    M = np.concatenate([rng.uniform(-20, 20, 5000), rng.uniform(-10, 10, 100)])
+    e = np.concatenate([rng.uniform(0, 0.99, 5000), rng.uniform(1.01, 3, 100)])
+    e[:10] = 0
+
+    E = kepler_solve(M, e, use_numba=False)
+    ell = e < 1
+    assert np.all((E[ell] >= 0) & (E[ell] < 2 * np.pi))
+    assert np.allclose(E[ell] - e[ell] * np.sin(E[ell]), np.mod(M[ell], 2 * np.pi), rtol=0, atol=1e-12)
+    assert np.allclose(e[~ell] * np.sinh(E[~ell]) - E[~ell], M[~ell], rtol=0, atol=1e-12)
+
+    out = np.empty((2, len(M) // 2))
+    assert kepler_solve(M.reshape(2, -1), e.reshape(2, -1), out=out, use_numba=False) is out
+    assert np.array_equal(out.ravel(), E)
+    if numba is not None:
+        assert np.allclose(kepler_solve(M, e, use_numba=True), E, rtol=0, atol=1e-12)
+
+    print("✓ Kepler solver converges on all orbit types")
+    return True
+
+def test_density_profile():
+    """Test the per-epoch JB2008 profile against the 2-D table interpolation"""
+    print("\nTesting density profile cache...")
+
+    import numpy as np
+    from new_analytic_propagator.density_profile import DensityProfile
+    from new_analytic_propagator.lininterp2_vec_v2 import lininterp2_vec_v2
+
+    rng = np.random.RandomState(2)
+    alt = np.arange(200, 2000, 50.0)
+    times = 2458910.5 + 30.5 * np.arange(24)
+    dens_value = np.exp(-alt / 60)[:, None] * rng.uniform(0.5, 2, (len(alt), len(times)))
+    dens_times2, alt2 = np.meshgrid(times, alt)
+    dens = DensityProfile(alt2, dens_times2, dens_value)
+
+    h = rng.uniform(alt[0], alt[-1] - 1e-6, 10000)
+    jd = times[3] + 10
+    reference = lininterp2_vec_v2(alt, times, dens_value, h, jd)
+    assert np.allclose(dens.density(h, jd), reference, rtol=1e-12, atol=0)
+    profile = dens.profile
+    assert dens.at(jd) is profile  # cached until the epoch changes
+
+    # Out of range altitudes and epochs take the nearest table values
+    assert np.allclose(dens.density([50, 3000], jd), [profile[0], profile[-1]])
+    assert np.allclose(dens.density(alt, times[-1] + 100), dens_value[:, -1])
+
+    print("✓ Density profile matches the table interpolation")
+    return True
+
+def test_density_store():
+    """Test the memory-mapped JB2008 store against the shipped CSV"""
+    print("\nTesting JB2008 density store...")
+
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from pathlib import Path
+    from jb2008_store import JB2008_ALT, JB2008_CSV, load_jb2008_store, jb2008_param
+    from new_analytic_propagator.density_profile import DensityProfile
+
+    csv = pd.read_csv(JB2008_CSV, float_precision='round_trip')
+    with tempfile.TemporaryDirectory() as d:
+        store_file = Path(d) / 'jb2008.npy'
+        table = load_jb2008_store(JB2008_CSV, store_file)
+        assert isinstance(table, np.memmap) and load_jb2008_store(JB2008_CSV, store_file) is table
+        assert np.array_equal(table['year'], csv['year']) and np.array_equal(table['month'], csv['month'])
+        assert table['jd'][0] == 2458909.5  # 2020-03-01
+        assert np.all(np.diff(table['jd']) >= 28)
+
+        param = jb2008_param(table)
+        assert param['dens_value'].shape == (len(JB2008_ALT), len(csv))
+        assert np.array_equal(param['dens_value'], csv.iloc[:, 2:].values.T)
+        dens = DensityProfile(param['alt'], param['dens_times'], param['dens_value'])
+        assert dens.uniform and np.allclose(dens.density(JB2008_ALT, table['jd'][5]), csv.iloc[5, 2:])
+        del table, param, dens
+
+        # A table with other altitude levels is rejected
+        bad_csv = Path(d) / 'jb2008_bad.csv'
+        csv.iloc[:3, :-1].to_csv(bad_csv, index=False)
+        try:
+            load_jb2008_store(bad_csv)
+            assert False, "a CSV with 35 altitude levels must be rejected"
+        except ValueError:
+            pass
+
+    # A missing table warns about the static fallback instead of printing
+    import warnings
+    import fillin_atmosphere
+    load_store = fillin_atmosphere.load_jb2008_store
+    fillin_atmosphere.load_jb2008_store = lambda csv_file: load_jb2008_store(Path(d) / 'missing.csv')
+    try:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            cfg = fillin_atmosphere.initJB2008_store({})
+    finally:
+        fillin_atmosphere.load_jb2008_store = load_store
+    assert np.size(cfg['param']['dens_value']) == 0
+    assert any('static' in str(w.message) and w.category is RuntimeWarning for w in caught)
+
+    print("✓ Density store maps the CSV table with its JD axis")
+    return True
+
+def test_mean_osc_batch():
+    """Test the batch mean/osculating conversions: round trip, buffers, batch map"""
+    print("\nTesting mean/osculating batch conversion...")
+
+    import numpy as np
+    from new_analytic_propagator.mean2osc_m_vec import mean2osc_m_vec
+    from new_analytic_propagator.osc2mean_m_vec import osc2mean_m_vec
+    from new_analytic_propagator.osc2mean_vec import osc2mean_vec
+    from new_analytic_propagator.mean_osculating_map import mean_osculating_map
+
+    mean_oe = _random_oe(2000, seed=3)
+    mean_oe[:, 1] = np.random.RandomState(3).uniform(0, 0.02, len(mean_oe))  # both branches of osc2mean
+    osc_oe, _, _ = mean2osc_m_vec(mean_oe, PARAM)
+    assert np.median(np.abs(osc_oe[:, 0] - mean_oe[:, 0])) > 1  # J2 short-period terms of a few km
+
+    out = np.empty_like(osc_oe)
+    back, _, _ = osc2mean_m_vec(osc_oe, PARAM, out=out)
+    assert back is out
+    assert np.median(np.abs(back[:, 0] - mean_oe[:, 0])) < 0.1
+    assert np.allclose(np.angle(np.exp(1j * (back[:, 2:4] - mean_oe[:, 2:4]))), 0, atol=1e-3)
+
+    # Objects leave the iteration once converged: same result as fixed iterations
+    osc_nu = osc_oe.copy()
+    osc_nu[:, 5] = mean_oe[:, 5]
+    assert np.allclose(osc2mean_vec(osc_nu, PARAM), osc2mean_vec(osc_nu, PARAM, tol=0), rtol=1e-11, atol=1e-11)
+
+    batch = mean_osculating_map(mean_oe[:5], 1, PARAM)
+    assert np.allclose(batch, [mean_osculating_map(row, 1, PARAM) for row in mean_oe[:5]])
+
+    print("✓ Mean/osculating batch conversion round-trips")
+    return True
+
+def test_decay_schedule():
+    """Test that no object decays before the step it is filed under"""
+    print("\nTesting decay schedule...")
+
+    import numpy as np
+    from decay_schedule import DecaySchedule
+    from jb2008_store import load_jb2008_store, jb2008_param
+    from prop_mit_vec import prop_mit_vec_cols
+
+    rng = np.random.RandomState(4)
+    n_sats = 3000
+    oe = _random_oe(n_sats, seed=4)
+    oe[:, 0] = 1 + rng.uniform(160, 700, n_sats) / PARAM['req']
+    oe[:, 1] = rng.uniform(0, 0.03, n_sats)
+    bstar = 10 ** rng.uniform(-5, -1, n_sats)
+    controlled = np.zeros(n_sats)
+    live = np.ones(n_sats, dtype=bool)
+
+    param = dict(PARAM, density_profile='JB2008', jd=2458849.5, **jb2008_param(load_jb2008_store()))
+    tsince = np.arange(0, 400 * 1440, 5 * 1440.0)
+    schedule = DecaySchedule(tsince, param)
+    schedule.add(np.arange(n_sats), oe, bstar, controlled, 0)
+
+    n_checked = 0
+    for n in range(1, len(tsince)):
+        param['jd'] = 2458849.5 + tsince[n] / 1440
+        _, errors, _, _ = prop_mit_vec_cols(oe, bstar, controlled, 60 * (tsince[n] - tsince[n - 1]), param,
+                                            out=(oe, np.zeros(n_sats), np.zeros((n_sats, 3)), np.zeros((n_sats, 3))),
+                                            rv_rows=[])
+        due = schedule.pop_due(n, live)
+        decayed = np.flatnonzero(live & (errors == 1))
+        assert np.all(np.isin(decayed, due))
+        live[decayed] = False
+        schedule.add(due[live[due]], oe, bstar, controlled, n)
+        n_checked += len(due)
+
+    assert 0.2 < np.mean(~live) < 0.9
+    assert n_checked < 0.2 * n_sats * (len(tsince) - 1)
+
+    print("✓ Decay schedule checks", n_checked, "objects instead of", n_sats * (len(tsince) - 1))
+    return True
+
+def test_sgp4_vec():
+    """Test the vectorized SGP4/SDP4 against the Vallado reference on the TLE catalog"""
+    print("\nTesting vectorized SGP4...")
+
+    import numpy as np
+    from sgp4_vec import getgravc_vec, read_tle_file, sgp4init_vec, sgp4_vec
+    from prop_sgp4_vec import prop_sgp4_vec_cols
+
+    # Verification case 00005 at epoch (tcppver.out)
+    ver = sgp4init_vec(read_tle_file('supporting_functions/tle_public/vallado/SGP4-VER.TLE'))
+    r, v, err = sgp4_vec(ver, 0.0)
+    assert ver['satnum'][0] == 5 and err[0] == 0
+    assert np.allclose(r[0], [7022.46529266, -1400.08296755, 0.03995155], rtol=0, atol=1e-6)
+    assert np.allclose(v[0], [1.893841015, 6.405893759, 4.534807250], rtol=0, atol=1e-9)
+
+    # Catalog tiled to 45k objects, each at its own time since epoch
+    catalog_file = 'supporting_functions/tle_public/sgp4/SGP4/DemoData/2009211.TLE'
+    catalog = {name: np.tile(col, 3) for name, col in read_tle_file(catalog_file).items()}
+    n_sats = len(catalog['satnum'])
+    sgp4init_vec(catalog)
+    assert n_sats > 30000 and np.any(catalog['irez'] == 1) and np.any(catalog['irez'] == 2)
+    tsince = np.random.RandomState(5).uniform(-2880, 10080, n_sats)
+    r, v, err = sgp4_vec(catalog, tsince)
+
+    try:
+        from sgp4.api import Satrec
+    except ImportError:
+        Satrec = None
+    if Satrec is not None:
+        with open(catalog_file) as f:
+            lines = f.read().splitlines()
+        lines1 = [line for line in lines if line.startswith('1 ')] * 3
+        lines2 = [line for line in lines if line.startswith('2 ')] * 3
+        r_ref = np.zeros((n_sats, 3))
+        err_ref = np.zeros(n_sats, dtype=int)
+        for k, (line1, line2) in enumerate(zip(lines1, lines2)):
+            sat = Satrec.twoline2rv(line1, line2)
+            err_ref[k], r_ref[k], _ = sat.sgp4(sat.jdsatepoch, sat.jdsatepochF + tsince[k] / 1440)
+        ok = err_ref == 0
+        assert np.array_equal(err, err_ref) and np.allclose(r[ok], r_ref[ok], rtol=0, atol=1e-5)
+
+    # Per-step re-epoching reproduces one long propagation without drag
+    near = np.flatnonzero((err == 0) & ~catalog['deep'])[:2000]
+    table = {name: catalog[name][near] for name in ('ecco', 'inclo', 'nodeo', 'argpo', 'mo', 'no_kozai')}
+    table.update(epoch=np.full(len(near), 21759.0), bstar=np.zeros(len(near)))
+    sgp4init_vec(table)
+    radius = getgravc_vec()['radiusearthkm']
+    oe = np.column_stack([table['am'] * radius / PARAM['req'], table['em'], table['im'],
+                          table['Om'], table['om'], table['mm']])
+    r_ref, _, _ = sgp4_vec(table, 5 * 1440.0)
+    param = dict(PARAM)
+    for day in range(1, 6):
+        param['jd'] = 2433281.5 + 21759.0 + day
+        oe, errors, r, _ = prop_sgp4_vec_cols(oe, table['bstar'], np.zeros(len(near)), 86400, param)
+    assert not np.any(errors) and np.allclose(r, r_ref, rtol=0, atol=1e-6)
+
+    print("✓ Vectorized SGP4 matches the reference for", n_sats, "objects")
+    return True
+
+def main():
+    """Run all tests"""
+    print("MOCAT-MC Python Conversion - Propagation Test")
+    print("=" * 50)
+
+    tests = [
+        test_oe2rv_kernel,
+        test_kepler_solver,
+        test_density_profile,
+        test_density_store,
+        test_mean_osc_batch,
+        test_decay_schedule,
+        test_sgp4_vec
+    ]
+
+    passed = sum(1 for test in tests if test())
+
+    print(f"\n==================================================")
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    main()
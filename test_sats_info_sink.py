@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Output sink tests for MOCAT-MC Python conversion
+Checks streamed sats_info against the in-memory record of main_mc
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append('supporting_functions')
+sys.path.append('Examples/Quick_Start')
+
+def test_npy_shard_sink():
+    """Test shard writing, memory-mapped reading and truncation"""
+    print("Testing npy shard sink...")
+
+    import numpy as np
+    from sats_info_sink import NpyShardSink, SatsInfoReader
+
+    rng = np.random.RandomState(0)
+    steps = [(rng.randint(1, 12, n).astype(np.int8), rng.random_sample(n), rng.randint(0, 2, n))
+             for n in (5, 0, 7, 3, 6)]
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        sink = NpyShardSink(out_dir, flush_steps=2)
+        for n, (objclass, a, controlled) in enumerate(steps):
+            sink.write(n, objclass, a, controlled)
+        assert len(sink._buffer) == 1  # two full shards written, one step buffered
+        sink.write_matsats(4, np.ones((2, 24)))
+        sink.close()
+
+        reader = SatsInfoReader(out_dir)
+        assert list(reader.steps) == [0, 1, 2, 3, 4]
+        objclass, a, controlled = reader.step(2)
+        assert isinstance(a, np.memmap) and a.dtype == np.float32
+        assert np.array_equal(objclass, steps[2][0])
+        assert np.array_equal(a, steps[2][1].astype(np.float32))
+        assert len(reader[1][0]) == 0
+        assert reader.matsats_steps() == [4]
+
+        sink = NpyShardSink(out_dir, flush_steps=2)
+        sink.truncate(2)
+        del reader, objclass, a, controlled
+        reader = SatsInfoReader(out_dir)
+        assert list(reader.steps) == [0, 1, 2]
+        assert np.array_equal(reader.step(2)[2], steps[2][2])
+        assert reader.matsats_steps() == []
+
+    print("✓ Shards round-trip through the memory-mapped reader")
+    return True
+
+def test_simulation_sink():
+    """Test that a streamed run records the same sats_info as the in-memory run"""
+    print("\nTesting main_mc with an npy output sink...")
+
+    import numpy as np
+    from main_mc import Simulation
+    from sats_info_sink import SatsInfoReader
+    from test_simulation import _make_config
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cfg = _make_config(tmp_dir)
+        reference = Simulation(cfg, 4)
+        reference.run()
+
+        cfg['output_sink'] = 'npy'
+        cfg['saveMSnTimesteps'] = 5
+        cfg['output_flush_steps'] = 3
+        cfg['output_path'] = str(Path(tmp_dir) / 'sats_info')
+        cfg['filename_save'] = str(Path(tmp_dir) / 'checkpoint.npz')
+        cfg['n_save_checkpoint'] = 4
+        sim = Simulation(cfg, 4)
+        for _ in range(10):
+            sim.step()
+        # Interrupted after step 10: resume from the step 8 checkpoint
+        sim = Simulation(cfg, 4, resume_from=cfg['filename_save'])
+        sim.run()
+        assert sim.state.sats_info is None
+
+        reader = SatsInfoReader(cfg['output_path'])
+        assert list(reader.steps) == list(range(cfg['n_time']))
+        for n in range(cfg['n_time']):
+            assert all(np.array_equal(x, y) for x, y in zip(reader.step(n), reference.state.sats_info[n]))
+        assert reader.matsats_steps() == [0, 5, 10]
+        shards = [np.load(fn) for fn in Path(cfg['output_path']).glob('sats_info_*_index.npy')]
+        assert len(shards) >= 4 and max(len(index) for index in shards) == 3
+        assert len(reader.matsats(10)) == reference.state.numObjects[10]
+
+    print("✓ Streamed sats_info match the in-memory record across a resume")
+    return True
+
+def main():
+    """Run all tests"""
+    print("MOCAT-MC Python Conversion - Output Sink Test")
+    print("=" * 50)
+
+    tests = [
+        test_npy_shard_sink,
+        test_simulation_sink
+    ]
+
+    passed = sum(1 for test in tests if test())
+
+    print(f"\n==================================================")
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Simulation tests for MOCAT-MC Python conversion
+Runs short main_mc scenarios on a synthetic initial population
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append('supporting_functions')
+sys.path.append('Examples/Quick_Start')
+
+def _make_config(ic_dir, n_sats=300, n_time=12, seed=1):
+    """Write a synthetic 2020.mat initial population and build its config"""
+    import numpy as np
+    import scipy.io as sio
+    from getidx import idx_a, idx_ecco, idx_inclo, idx_nodeo, idx_mo, idx_bstar
+    from getidx import idx_mass, idx_radius, idx_launch_date, idx_objectclass, idx_ID
+    from setup_MCconfig import setup_MCconfig
+
+    rng = np.random.RandomState(0)
+    mat_sats = np.zeros((n_sats, 24))
+    mat_sats[:, idx_a] = 1 + rng.uniform(300, 1500, n_sats) / 6378.137
+    mat_sats[:, idx_ecco] = rng.uniform(0, 0.02, n_sats)
+    mat_sats[:, idx_inclo] = rng.uniform(0, np.pi, n_sats)
+    mat_sats[:, idx_nodeo:idx_mo + 1] = rng.uniform(0, 2 * np.pi, (n_sats, 3))
+    mat_sats[:, idx_bstar] = rng.uniform(1e-5, 1e-3, n_sats)
+    objclass = rng.choice([1, 5, 10], n_sats)
+    mat_sats[:, idx_mass] = np.where(objclass == 1, 500, np.where(objclass == 5, 1500, 5))
+    mat_sats[:, idx_radius] = np.where(objclass == 1, 1.0, np.where(objclass == 5, 2.0, 0.1))
+    mat_sats[:, idx_launch_date] = rng.uniform(2451545, 2458849, n_sats)
+    mat_sats[:, idx_objectclass] = objclass
+    mat_sats[:, idx_ID] = np.arange(1, n_sats + 1)
+
+    ICfile = str(Path(ic_dir) / '2020.mat')
+    sio.savemat(ICfile, {'mat_sats': mat_sats})
+
+    cfg = setup_MCconfig(seed, ICfile)
+    cfg['n_time'] = n_time
+    cfg['tsince'] = cfg['tsince'][:n_time]
+    cfg['CUBE_RES'] = 2
+    return cfg
+
+def test_simulation_state():
+    """Test that Simulation steps match main_mc and leave the config untouched"""
+    print("Testing Simulation state handling...")
+
+    import numpy as np
+    from main_mc import main_mc, Simulation
+
+    with tempfile.TemporaryDirectory() as ic_dir:
+        cfg = _make_config(ic_dir)
+    mat_sats0 = cfg['mat_sats'].copy()
+    maxID0 = cfg['param'].get('maxID')
+
+    reference = main_mc(cfg, 3)
+    assert np.array_equal(cfg['mat_sats'], mat_sats0)
+    assert cfg['param'].get('maxID') == maxID0
+    assert len(cfg['launchMC_step']) == 0 and not isinstance(cfg['launchMC_step'], dict)
+
+    sim = Simulation(cfg, 3)
+    n_steps = 0
+    while not sim.done:
+        sim.step()
+        n_steps += 1
+    assert n_steps == cfg['n_time'] - 1
+    result = sim.results()
+    assert result[:4] == reference[:4]
+    for a, b in zip(result[4:], reference[4:]):
+        assert np.array_equal(a, b)
+
+    print("✓ Stepwise Simulation reproduces main_mc without mutating the config")
+    return True
+
+def test_concurrent_simulations():
+    """Test that simulations running on threads do not share state"""
+    print("\nTesting concurrent simulations...")
+
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+    from main_mc import Simulation
+
+    with tempfile.TemporaryDirectory() as ic_dir:
+        cfg = _make_config(ic_dir)
+
+    seeds = [1, 2, 3, 4]
+    sequential = [Simulation(cfg, seed).run() for seed in seeds]
+    with ThreadPoolExecutor(max_workers=len(seeds)) as pool:
+        concurrent = list(pool.map(lambda seed: Simulation(cfg, seed).run(), seeds))
+
+    for a, b in zip(sequential, concurrent):
+        assert a[:4] == b[:4]
+        assert all(np.array_equal(x, y) for x, y in zip(a[4:], b[4:]))
+
+    print("✓ Threaded runs match sequential runs seed by seed")
+    return True
+
+def test_checkpoint_resume():
+    """Test that resuming from a checkpoint continues the run bit-identically"""
+    print("\nTesting checkpoint / resume...")
+
+    import numpy as np
+    from main_mc import Simulation
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cfg = _make_config(tmp_dir)
+        cfg['filename_save'] = str(Path(tmp_dir) / 'checkpoint.npz')
+
+        full = Simulation(cfg, 2)
+        reference = full.run()
+
+        cfg['n_save_checkpoint'] = 4
+        interrupted = Simulation(cfg, 2)
+        for _ in range(9):
+            interrupted.step()
+        assert Path(cfg['filename_save']).exists()
+        assert not list(Path(tmp_dir).glob('*.tmp'))
+
+        resumed = Simulation(cfg, 2, resume_from=cfg['filename_save'])
+        assert resumed.state.n == 8
+        result = resumed.run()
+
+        assert result[:4] == reference[:4]
+        assert all(np.array_equal(x, y) for x, y in zip(result[4:], reference[4:]))
+        assert np.array_equal(resumed.mat_sats, full.mat_sats)
+        assert resumed.state.param['maxID'] == full.state.param['maxID']
+        assert np.array_equal(resumed.state.rng.get_state()[1], full.state.rng.get_state()[1])
+        assert all(np.array_equal(a, b) for a, b in zip(resumed.state.sats_info[5], full.state.sats_info[5]))
+
+    print("✓ Resumed run matches the uninterrupted run")
+    return True
+
+def test_lazy_state():
+    """Test that lazy r/v materialization leaves the run unchanged"""
+    print("\nTesting lazy state materialization...")
+
+    import numpy as np
+    from main_mc import Simulation
+
+    with tempfile.TemporaryDirectory() as ic_dir:
+        cfg = _make_config(ic_dir)
+    cfg['mat_sats'][0, 0] = 1 + 30000 / 6378.137  # isolated orbit, never a cube candidate
+
+    full = Simulation(cfg, 4)
+    reference = full.run()
+
+    cfg['lazy_state'] = True
+    lazy = Simulation(cfg, 4)
+    lazy.step()
+    assert lazy.state.rv_stale[0] and not lazy.state.rv_stale[1:].all()
+    result = lazy.run()
+
+    assert result[:4] == reference[:4]
+    assert all(np.array_equal(x, y) for x, y in zip(result[4:], reference[4:]))
+    assert np.allclose(lazy.mat_sats, full.mat_sats, rtol=1e-12, atol=1e-9)
+    assert not lazy.state.rv_stale.any()
+
+    # Without the altitude bands, objects out of reach of the cube test
+    # are still left stale
+    cfg['altitude_prefilter'] = False
+    cfg['lazy_state'] = False
+    cfg['mat_sats'][0, 0] = 1 + 2 * cfg['collision_alt_limit'] / 6378.137
+    reference = Simulation(cfg, 4).run()
+    cfg['lazy_state'] = True
+    lazy = Simulation(cfg, 4)
+    lazy.step()
+    assert lazy.state.rv_stale[0] and not lazy.state.rv_stale[1:].all()
+    result = lazy.run()
+    assert result[:4] == reference[:4]
+    assert all(np.array_equal(x, y) for x, y in zip(result[4:], reference[4:]))
+
+    print("✓ Lazy run matches the full run, r/v computed on demand")
+    return True
+
+def test_ensemble_runner():
+    """Test the process-pool ensemble against sequential runs"""
+    print("\nTesting parallel ensemble runner...")
+
+    import numpy as np
+    from main_mc import Simulation
+    from ensemble_mc import run_ensemble, share_config, attach_config, seed_filename
+
+    with tempfile.TemporaryDirectory() as ic_dir:
+        cfg = _make_config(ic_dir)
+
+    # Shared configuration round-trip
+    cfg_stub, specs, blocks = share_config(cfg)
+    try:
+        assert 'mat_sats' not in cfg_stub
+        attached = []
+        shared = attach_config(cfg_stub, specs, attached)
+        assert np.array_equal(shared['mat_sats'], cfg['mat_sats'])
+        assert not shared['mat_sats'].flags.writeable
+        # Broadcast density grids are shared with their broadcast axes collapsed
+        assert np.array_equal(shared['param']['alt'], cfg['param']['alt'])
+        assert specs[('param', 'alt')][2] == (cfg['param']['alt'].shape[0], 1)
+        del shared
+        for shm in attached:
+            shm.close()
+
+        # Another program attaching the blocks must not unlink them on exit
+        import pickle
+        import subprocess
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            spec_file = Path(tmp_dir) / 'specs.pkl'
+            spec_file.write_bytes(pickle.dumps((cfg_stub, specs)))
+            attach = ("import pickle, sys; sys.path.append('Examples/Quick_Start'); "
+                      "from ensemble_mc import attach_config; blocks = []; "
+                      f"attach_config(*pickle.loads(open({str(spec_file)!r}, 'rb').read()), blocks); "
+                      "[shm.close() for shm in blocks]")
+            child = subprocess.run([sys.executable, '-c', attach], capture_output=True, text=True)
+        assert child.returncode == 0 and 'leaked' not in child.stderr, child.stderr
+        attached = []
+        shared = attach_config(cfg_stub, specs, attached)
+        assert np.array_equal(shared['mat_sats'], cfg['mat_sats'])
+        del shared
+        for shm in attached:
+            shm.close()
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    assert seed_filename('TLEIC_year2020_rand1.npz', 7) == 'TLEIC_year2020_rand7.npz'
+
+    seeds = [5, 6, 7]
+    results = dict(run_ensemble(cfg, seeds, max_workers=2))
+    assert sorted(results) == seeds
+    for seed in seeds:
+        reference = Simulation(cfg, seed).run()
+        assert results[seed][:4] == reference[:4]
+        assert all(np.array_equal(x, y) for x, y in zip(results[seed][4:], reference[4:]))
+
+    print("✓ Ensemble results match sequential runs for every seed")
+    return True
+
+def test_decay_removal():
+    """Test that scheduled decay removals match a full error scan over a multi-year run"""
+    print("\nTesting scheduled decay removal...")
+
+    import numpy as np
+    from main_mc import Simulation
+
+    with tempfile.TemporaryDirectory() as ic_dir:
+        cfg = _make_config(ic_dir, n_sats=300, n_time=220)
+    assert cfg['density_profile'].lower() == 'jb2008'
+    rng = np.random.RandomState(2)
+    cfg['mat_sats'][:, 0] = 1 + rng.uniform(200, 700, len(cfg['mat_sats'])) / 6378.137
+
+    cfg['decay_schedule'] = False
+    reference = Simulation(cfg, 8)
+    cfg['decay_schedule'] = True
+    sim = Simulation(cfg, 8)
+
+    # Only the due slots are checked; every decay must be among them
+    n_checked = []
+    pop_due = sim.decay.pop_due
+    def counted_pop_due(n, live):
+        due = pop_due(n, live)
+        n_checked.append(len(due))
+        return due
+    sim.decay.pop_due = counted_pop_due
+
+    n_live = 0
+    while not sim.done:
+        sim.step()
+        reference.step()
+        assert sim.state.num_deorbited == reference.state.num_deorbited
+        assert np.array_equal(sim.state.pop.live, reference.state.pop.live)
+        n_live += sim.state.pop.live.sum()
+    assert sim.state.num_deorbited > 0.1 * len(cfg['mat_sats'])
+    assert sum(n_checked) < 0.2 * n_live
+
+    print("✓ Decay schedule removes the same objects as a full scan over",
+          round(sim.tsince[-1] / cfg['YEAR2MIN'], 1), "years, checking", sum(n_checked), "of", n_live)
+    return True
+
+def main():
+    """Run all tests"""
+    print("MOCAT-MC Python Conversion - Simulation Test")
+    print("=" * 50)
+
+    tests = [
+        test_simulation_state,
+        test_concurrent_simulations,
+        test_checkpoint_resume,
+        test_lazy_state,
+        test_decay_removal,
+        test_ensemble_runner
+    ]
+
+    passed = sum(1 for test in tests if test())
+
+    print(f"\n==================================================")
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+if __name__ == "__main__":
+    main()